@@ -2,24 +2,12 @@ import json
 from datetime import date, datetime, timedelta
 
 from chalice import Chalice, ConvertToMiddleware, Cron
-from chalicelib import (
-    agg_speed_tables,
-    alerts,
-    bluebikes,
-    constants,
-    daily_speeds,
-    delays,
-    gtfs,
-    landing,
-    predictions,
-    ridership,
-    service_ridership_dashboard,
-    speed_restrictions,
-    trip_metrics,
-    weather,
-)
 from datadog_lambda.wrapper import datadog_lambda_wrapper
 
+# chalicelib modules are imported inside each handler rather than here, so a Lambda only loads
+# what its own job needs on cold start (e.g. the alerts job never imports pandas or SQLAlchemy).
+# benchmarks/cold_start.py measures the import cost of each handler.
+
 app = Chalice(app_name="ingestor")
 
 app.register_middleware(ConvertToMiddleware(datadog_lambda_wrapper))
@@ -30,6 +18,8 @@ app.register_middleware(ConvertToMiddleware(datadog_lambda_wrapper))
 # Runs every 15 minutes from either 4 AM -> 1:55AM or 5 AM -> 2:55 AM depending on DST
 @app.schedule(Cron("0/15", "0-6,9-23", "*", "*", "?", "*"))
 def store_current_alerts(event):
+    from chalicelib import alerts
+
     alerts.save_v3_alerts()
 
 
@@ -47,18 +37,24 @@ def store_current_alerts(event):
 # STORE BLUEBIKES FEED
 @app.schedule(Cron("0/5", "*", "*", "*", "?", "*"))
 def bb_store_station_status(event):
+    from chalicelib import bluebikes
+
     bluebikes.store_station_status()
 
 
 # 10am UTC -> 6am EST
 @app.schedule(Cron(0, 10, "*", "*", "?", "*"))
 def bb_store_station_info(event):
+    from chalicelib import bluebikes
+
     bluebikes.store_station_info()
 
 
 # 6am UTC -> 2am EDT
 @app.schedule(Cron(0, 6, "*", "*", "?", "*"))
 def bb_calc_daily_stats(event):
+    from chalicelib import bluebikes
+
     yesterday = date.today() - timedelta(days=1)
     bluebikes.calc_daily_stats(yesterday)
 
@@ -66,6 +62,8 @@ def bb_calc_daily_stats(event):
 # Runs every 30 minutes from either 4 AM -> 1:55AM or 5 AM -> 2:55 AM depending on DST
 @app.schedule(Cron("0/30", "0-6,9-23", "*", "*", "?", "*"))
 def update_delivered_trip_metrics(event):
+    from chalicelib import daily_speeds
+
     today = datetime.now()
     """ Update yesterdays entry until 4/5 am (9 AM UTC)"""
     if today.hour < 9:
@@ -77,6 +75,8 @@ def update_delivered_trip_metrics(event):
 # Update weekly and monthly tables. At 2/3 AM EST and also after we have updated yesterday's data.
 @app.schedule(Cron(10, "7,12", "*", "*", "?", "*"))
 def update_agg_trip_metrics(event):
+    from chalicelib import agg_speed_tables
+
     agg_speed_tables.update_tables("weekly")
     agg_speed_tables.update_tables("monthly")
 
@@ -85,6 +85,8 @@ def update_agg_trip_metrics(event):
 # The MBTA cleans up their data the next day (we suspect sometime after 4 AM). Update yesterday's data after this (and 2 days ago to be safe).
 @app.schedule(Cron(0, 12, "*", "*", "?", "*"))
 def update_delivered_trip_metrics_yesterday(event):
+    from chalicelib import daily_speeds
+
     today = datetime.now()
     yesterday = (today - timedelta(days=1)).date()
     two_days_ago = (today - timedelta(days=2)).date()
@@ -95,24 +97,32 @@ def update_delivered_trip_metrics_yesterday(event):
 # 7:10am UTC -> 2:10/3:10am ET every day
 @app.schedule(Cron(10, 7, "*", "*", "?", "*"))
 def update_ridership(event):
+    from chalicelib import ridership
+
     ridership.ingest_ridership_data()
 
 
 # 7:20am UTC -> 2:20/3:20am ET every weekday
 @app.schedule(Cron(20, 7, "?", "*", "MON-FRI", "*"))
 def update_speed_restrictions(event):
+    from chalicelib import speed_restrictions
+
     speed_restrictions.update_speed_restrictions(max_lookback_months=2)
 
 
 # 7:30am UTC -> 2:30/3:30am ET every day
 @app.schedule(Cron(30, 7, "*", "*", "?", "*"))
 def update_time_predictions(event):
+    from chalicelib import predictions
+
     predictions.update_predictions()
 
 
 # 8:00am UTC -> 3:00/4:00am ET and 11:00pm UTC -> 7:00/6:00pm ET every day
 @app.schedule(Cron(0, "8,23", "*", "*", "?", "*"))
 def update_gtfs(event):
+    from chalicelib import gtfs
+
     today = datetime.now()
     three_days_ago = (today - timedelta(days=3)).date()
     gtfs.ingest_gtfs_feeds_to_dynamo_and_s3(date_range=(three_days_ago, today.date()))
@@ -121,6 +131,8 @@ def update_gtfs(event):
 # 4:40am UTC -> 2:40/3:40am ET every day
 @app.schedule(Cron(40, 7, "*", "*", "?", "*"))
 def update_trip_metrics(event):
+    from chalicelib import trip_metrics
+
     trip_metrics.ingest_recent_trip_metrics(lookback_days=7)
 
 
@@ -129,6 +141,8 @@ def update_trip_metrics(event):
 # Runs 15 minutes after the daily update
 @app.schedule(Cron(45, 8, "?", "*", "MON,TUE", "*"))
 def update_weekly_alert_delays(event):
+    from chalicelib import delays
+
     today = datetime.now()
     one_week_ago = (today - timedelta(days=15)).date()
     delays.update_weekly_from_daily(one_week_ago, today.date())
@@ -137,6 +151,8 @@ def update_weekly_alert_delays(event):
 # for daily delay uploads
 @app.schedule(Cron(30, 8, "*", "*", "?", "*"))
 def update_daily_alert_delays(event):
+    from chalicelib import delays
+
     today = datetime.now()
     yesterday = (today - timedelta(days=1)).date()
     delays.update_table(yesterday, today.date())
@@ -145,6 +161,8 @@ def update_daily_alert_delays(event):
 # Manually triggered lambda for populating daily trip metric tables. Only needs to be ran once.
 @app.lambda_function()
 def populate_delivered_trip_metrics(params, context):
+    from chalicelib import constants, daily_speeds
+
     start_date = datetime.strptime("2016-01-15", constants.DATE_FORMAT_BACKEND)
     end_date = datetime.now()
     for route in constants.ALL_ROUTES:
@@ -154,6 +172,8 @@ def populate_delivered_trip_metrics(params, context):
 # Manually triggered lambda for populating monthly or weekly tables. Only needs to be ran once.
 @app.lambda_function()
 def populate_agg_delivered_trip_metrics(params, context):
+    from chalicelib import agg_speed_tables, constants
+
     for line in constants.LINES:
         print(f"Populating monthly and weekly aggregate trip metrics for {line}")
         agg_speed_tables.populate_table(line, "monthly")
@@ -165,8 +185,10 @@ def populate_agg_delivered_trip_metrics(params, context):
 # No need to run on weekends
 @app.schedule(Cron(0, 9, "?", "*", "MON-FRI", "*"))
 def store_landing_data(event):
+    from chalicelib import constants, landing
+
     print(
-        f"Uploading ridership and trip metric data for landing page from {constants.NINETY_DAYS_AGO_STRING} to {constants.ONE_WEEK_AGO_STRING}"
+        f"Uploading ridership and trip metric data for landing page from {constants.ninety_days_ago_string()} to {constants.one_week_ago_string()}"
     )
     trip_metrics_data = landing.get_trip_metrics_data()
     ridership_data = landing.get_ridership_data()
@@ -177,6 +199,8 @@ def store_landing_data(event):
 # 9:00 UTC -> 4:30/5:30am ET every day (after GTFS and ridership have been ingested)
 @app.schedule(Cron(30, 9, "*", "*", "?", "*"))
 def update_service_ridership_dashboard(event):
+    from chalicelib import service_ridership_dashboard
+
     service_ridership_dashboard.create_service_ridership_dash_json()
 
 
@@ -185,11 +209,23 @@ def update_service_ridership_dashboard(event):
 # Every hour at :05 — fetch latest Boston hourly weather and merge into today's S3 file.
 @app.schedule(Cron(5, "*", "*", "*", "?", "*"))
 def store_hourly_weather(event):
+    from chalicelib import weather
+
     weather.ingest_hourly_weather()
 
 
+# 5:15 UTC -> 12:15/1:15am ET every day (after the last hourly weather run of the previous day)
+@app.schedule(Cron(15, 5, "*", "*", "?", "*"))
+def update_weather_archive(event):
+    from chalicelib import weather
+
+    weather.update_weather_archive()
+
+
 # Manually triggered lambda for backfilling historical weather from Open-Meteo's archive API.
-# Payload: {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+# Payload: {"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD", "dry_run": false}
 @app.lambda_function()
 def backfill_weather(params, context):
-    weather.backfill_weather(params["start_date"], params["end_date"])
+    from chalicelib import weather
+
+    weather.backfill_weather(params["start_date"], params["end_date"], dry_run=params.get("dry_run", False))
@@ -0,0 +1,96 @@
+"""Measure the import (cold start) cost of each Lambda handler in app.py.
+
+Each handler is measured in fresh interpreters: first `import app`, then the chalicelib modules the handler
+imports in its body. Run from the ingestor directory:
+
+    uv run python -m benchmarks.cold_start [--runs 5] [--handler store_current_alerts]
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+# Heavy third-party packages worth flagging when a handler pulls them in.
+HEAVY_MODULES = ["pandas", "numpy", "sqlalchemy", "mbta_gtfs_sqlite", "geopy", "openpyxl"]
+
+MEASURE_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+import app
+app_done = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+handler_done = time.perf_counter()
+print(json.dumps({{
+    "app": app_done - start,
+    "handler": handler_done - app_done,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def get_handler_imports(app_path: Path = APP_PATH) -> dict[str, list[str]]:
+    """Map each decorated handler in app.py to the chalicelib modules it imports."""
+    tree = ast.parse(app_path.read_text())
+    handlers = {}
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or not node.decorator_list:
+            continue
+        modules = []
+        for child in ast.walk(node):
+            if isinstance(child, ast.ImportFrom) and child.module == "chalicelib":
+                modules.extend(f"chalicelib.{alias.name}" for alias in child.names)
+            elif isinstance(child, ast.ImportFrom) and child.module and child.module.startswith("chalicelib."):
+                modules.append(child.module)
+        handlers[node.name] = modules
+    return handlers
+
+
+def measure_handler(modules: list[str], runs: int) -> dict:
+    script = MEASURE_SCRIPT.format(modules=modules, heavy=HEAVY_MODULES)
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=APP_PATH.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        "app_ms": statistics.median(s["app"] for s in samples) * 1000,
+        "handler_ms": statistics.median(s["handler"] for s in samples) * 1000,
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per handler (median is reported)")
+    parser.add_argument("--handler", action="append", help="only measure these handlers")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    handlers = get_handler_imports()
+    if args.handler:
+        handlers = {name: modules for name, modules in handlers.items() if name in args.handler}
+
+    results = {name: measure_handler(modules, args.runs) for name, modules in handlers.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'handler':<42} {'app (ms)':>9} {'handler (ms)':>13}  heavy imports")
+    for name, result in sorted(results.items(), key=lambda item: item[1]["handler_ms"]):
+        print(f"{name:<42} {result['app_ms']:>9.0f} {result['handler_ms']:>13.0f}  {', '.join(result['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""In-memory stand-ins for S3, DynamoDB and HTTP, so pipelines can be benchmarked without a network.
+
+`offline(...)` patches them in for the duration of a block:
+
+- S3: `s3.get_client()` returns a FakeS3Client that keeps objects in a dict.
+- DynamoDB: `dynamo.get_resource()` and `boto3.resource("dynamodb")` return a FakeDynamo holding items per table,
+  answering both Table.query (boto3 conditions) and the client query paginator the dashboard loader uses.
+- HTTP: `requests.get` is answered from a RecordedHttp cassette of URL -> response body. Unrecorded URLs raise.
+
+Any other boto3 client or resource raises, so nothing reaches AWS by accident.
+"""
+
+import io
+import json
+import re
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlencode
+from unittest import mock
+
+import requests
+from boto3.dynamodb.conditions import And, Between, Equals
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from chalicelib import dynamo, s3
+
+
+class FakeS3Client:
+    """The subset of the S3 client used by chalicelib.s3."""
+
+    def __init__(self, objects: dict[tuple[str, str], bytes] | None = None):
+        self.objects = dict(objects or {})
+        self._multipart: dict[str, list[bytes]] = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        data = self.objects[(Bucket, Key)]
+        return {"Body": StreamingBody(io.BytesIO(data), len(data)), "ContentLength": len(data)}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+
+    def copy_object(self, CopySource, Bucket, Key, **kwargs):
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.objects[(Bucket, Key)] = Fileobj.read()
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._multipart[Key] = []
+        return {"UploadId": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._multipart[UploadId].append(Body)
+        return {"ETag": str(PartNumber)}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.objects[(Bucket, Key)] = b"".join(self._multipart.pop(UploadId))
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._multipart.pop(UploadId, None)
+        return {}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2", operation
+        return self
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        if not Delimiter:
+            return [{"Contents": [{"Key": key} for key in keys]}]
+        contents, prefixes = [], []
+        for key in keys:
+            rest = key[len(Prefix) :]
+            if Delimiter in rest:
+                prefix = Prefix + rest[: rest.index(Delimiter) + 1]
+                if prefix not in prefixes:
+                    prefixes.append(prefix)
+            else:
+                contents.append({"Key": key})
+        return [{"Contents": contents, "CommonPrefixes": [{"Prefix": prefix} for prefix in prefixes]}]
+
+
+def _get_predicate(condition):
+    """Compile the boto3 key conditions used by chalicelib (=, BETWEEN and AND) into a test of an item."""
+    values = condition.get_expression()["values"]
+    if isinstance(condition, And):
+        predicates = [_get_predicate(value) for value in values]
+        return lambda item: all(predicate(item) for predicate in predicates)
+    if isinstance(condition, Equals):
+        name, value = values[0].name, values[1]
+        return lambda item: item.get(name) == value
+    if isinstance(condition, Between):
+        name, low, high = values[0].name, values[1], values[2]
+        return lambda item: name in item and low <= item[name] <= high
+    raise NotImplementedError(type(condition).__name__)
+
+
+class FakeTable:
+    def __init__(self, items: list[dict]):
+        self.items = items
+
+    def query(self, KeyConditionExpression, **kwargs):
+        predicate = _get_predicate(KeyConditionExpression)
+        return {"Items": [item for item in self.items if predicate(item)]}
+
+    def put_item(self, Item):
+        self.items.append(Item)
+
+    @contextmanager
+    def batch_writer(self):
+        yield self
+
+
+class FakeDynamoClient:
+    """The query paginator of the DynamoDB client, for "#partition = :partition AND #date BETWEEN :start AND :end".
+
+    Items are serialized and indexed by partition on a table's first query (so that cost isn't timed on every
+    query), and tables aren't expected to change after that. Values shared between items, like fixtures' repeated
+    byHour dicts, are serialized once and stay shared, which keeps large tables small in memory.
+    """
+
+    def __init__(self, tables: dict[str, list[dict]]):
+        self._tables = tables
+        self._indexes: dict[tuple[str, str], dict[str, list[tuple[str, dict]]]] = {}
+
+    def get_paginator(self, operation):
+        assert operation == "query", operation
+        return self
+
+    def _get_index(self, table_name: str, partition_key: str):
+        if (table_name, partition_key) not in self._indexes:
+            serializer = TypeSerializer()
+            serialized_values: dict = {}
+
+            def serialize(value):
+                # Containers by identity (the tables keep them alive), everything else by value
+                memo_key = id(value) if isinstance(value, (dict, list)) else (type(value), value)
+                if memo_key not in serialized_values:
+                    serialized_values[memo_key] = serializer.serialize(value)
+                return serialized_values[memo_key]
+
+            index: dict[str, list[tuple[str, dict]]] = {}
+            for item in self._tables.get(table_name, []):
+                serialized = {key: serialize(value) for key, value in item.items()}
+                index.setdefault(item[partition_key], []).append((item["date"], serialized))
+            self._indexes[(table_name, partition_key)] = index
+        return self._indexes[(table_name, partition_key)]
+
+    def paginate(self, TableName, KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        assert re.fullmatch(r"#partition = :partition AND #date BETWEEN :start AND :end", KeyConditionExpression)
+        index = self._get_index(TableName, ExpressionAttributeNames["#partition"])
+        partition = ExpressionAttributeValues[":partition"]["S"]
+        start, end = ExpressionAttributeValues[":start"]["S"], ExpressionAttributeValues[":end"]["S"]
+        return [{"Items": [item for day, item in index.get(partition, []) if start <= day <= end]}]
+
+
+class FakeDynamo:
+    """A DynamoDB resource holding plain items (as boto3 resources return them) per table."""
+
+    def __init__(self, tables: dict[str, list[dict]] | None = None):
+        self.tables = {name: list(items) for name, items in (tables or {}).items()}
+        self.meta = mock.Mock(client=FakeDynamoClient(self.tables))
+
+    def Table(self, name):
+        return FakeTable(self.tables.setdefault(name, []))
+
+
+class RecordedResponse:
+    def __init__(self, url: str, content: bytes, status_code: int = 200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode("utf8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for {self.url}", response=self)
+
+
+class RecordedHttp:
+    """Answers requests.get from a cassette of full URL (query string included) -> response body."""
+
+    def __init__(self, cassette: dict[str, bytes]):
+        self.cassette = cassette
+        self.requested: list[str] = []
+
+    def get(self, url, params=None, **kwargs):
+        if params:
+            url = f"{url}?{urlencode(params, doseq=True)}"
+        if url not in self.cassette:
+            raise requests.exceptions.ConnectionError(f"Not recorded, and benchmarks run offline: {url}")
+        self.requested.append(url)
+        return RecordedResponse(url, self.cassette[url])
+
+
+def _no_aws(service_name, *args, **kwargs):
+    raise RuntimeError(f"Benchmarks run offline, but something asked for a boto3 {service_name} client")
+
+
+@contextmanager
+def offline(
+    s3_client: FakeS3Client | None = None, dynamodb: FakeDynamo | None = None, http: RecordedHttp | None = None
+):
+    """Patch the fakes in for the duration of the block.
+
+    Args:
+        s3_client: S3 objects to serve. Defaults to an empty bucket.
+        dynamodb: DynamoDB tables to serve. Defaults to empty tables.
+        http: Recorded HTTP responses. Defaults to none, so every request raises.
+
+    Yields:
+        (s3_client, dynamodb, http), for inspecting what the pipeline wrote or requested.
+    """
+    s3_client = s3_client or FakeS3Client()
+    dynamodb = dynamodb or FakeDynamo()
+    http = http or RecordedHttp({})
+
+    def resource(service_name, *args, **kwargs):
+        return dynamodb if service_name == "dynamodb" else _no_aws(service_name)
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(s3, "get_client", lambda: s3_client))
+        stack.enter_context(mock.patch.object(dynamo, "get_resource", lambda: dynamodb))
+        stack.enter_context(mock.patch("boto3.resource", resource))
+        stack.enter_context(mock.patch("boto3.client", _no_aws))
+        stack.enter_context(mock.patch("requests.get", http.get))
+        yield s3_client, dynamodb, http
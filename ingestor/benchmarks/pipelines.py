@@ -0,0 +1,325 @@
+"""Benchmark the ingestion pipelines end to end, offline, against a stored baseline.
+
+Each case runs one pipeline's real code on inputs from benchmarks/synthetic, with S3, DynamoDB and HTTP answered
+in memory by benchmarks/offline.py, so only our own parsing, pandas and serialization work is timed. Cases report
+the median wall time of several runs and the peak memory traced during one more, and fail if peak memory is more
+than --tolerance above benchmarks/baseline.json. Traced memory is about the same on any machine, but wall time is
+not, so the change in seconds is printed for information and never fails a run. Run from the ingestor directory:
+
+    uv run python -m benchmarks.pipelines [--case dashboard] [--runs 3] [--tolerance 0.25] [--update-baseline]
+
+To see how cases scale, pass --scale (multiplies station, route and per-day counts) and --history (multiplies the
+length of date ranges), each as many times as needed; every combination is run, and --output writes the results
+as CSV for charting. Results at other sizes get their own baseline entries:
+
+    uv run python -m benchmarks.pipelines --case bluebikes --scale 1 --scale 2 --scale 10 --output bluebikes.csv
+
+The GTFS case uses a synthetic feed unless --feed points at a real one (e.g. from the local feed archive).
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+from unittest import mock
+
+from mbta_gtfs_sqlite.models import CalendarService
+from mbta_gtfs_sqlite.session import create_sqlalchemy_session
+from sqlalchemy import func
+
+from benchmarks import synthetic
+from benchmarks.offline import FakeDynamo, FakeS3Client, RecordedHttp, offline
+from chalicelib import bluebikes, constants
+from chalicelib.agg_speed_tables import actual_trips_by_line
+from chalicelib.delays import process as delays
+from chalicelib.gtfs.ingest import ingest_feed_to_dynamo
+from chalicelib.ridership.process import get_ridership_by_route_id
+from chalicelib.service_ridership_dashboard import ingest as dashboard
+from chalicelib.service_ridership_dashboard.config import START_DATE as DASHBOARD_START_DATE
+from chalicelib.trip_metrics import ingest as trip_metrics
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Date ranges of the inputs at --history 1, fixed so every run (and the baseline) sees the same inputs. Longer
+# histories start earlier.
+GTFS_START = date(2025, 3, 1)
+GTFS_DAYS = 14
+RECENT_START = date(2025, 3, 1)
+RECENT_END = date(2025, 5, 29)
+SPEEDS_START = date(2022, 1, 1)
+SPEEDS_END = date(2025, 6, 30)
+RIDERSHIP_START = date(2022, 1, 1)
+RIDERSHIP_END = date(2025, 6, 30)
+BLUEBIKES_DAY = date(2025, 6, 2)
+DASHBOARD_END = date(2025, 6, 30)
+# Enough lines of each kind to exercise every part of the dashboard, with few enough buses to keep it in memory
+DASHBOARD_BUS_ROUTES = 5
+ALERTS_PER_DAY = 4
+SUBWAY_STATIONS_PER_LINE = 12
+CR_TRAINS_PER_LINE = 20
+
+
+@dataclass(frozen=True)
+class Size:
+    """How much bigger than at --scale 1 and --history 1 to make a case's inputs."""
+
+    scale: float = 1.0
+    history: float = 1.0
+
+    def count(self, count: int) -> int:
+        return max(1, round(count * self.scale))
+
+    def start_date(self, start_date: date, end_date: date) -> date:
+        """Start of a date range ending on end_date, history times as long as start_date to end_date."""
+        return end_date - (end_date - start_date) * self.history
+
+    def baseline_key(self, name: str) -> str:
+        return name if self == Size() else f"{name}@scale={self.scale:g},history={self.history:g}"
+
+
+# Setup builds a case's inputs (untimed) in a directory of its own, and returns the function that runs it
+Setup = Callable[[str, argparse.Namespace, Size], Callable[[], object]]
+CASES: dict[str, Setup] = {}
+
+
+def case(name: str):
+    def register(setup: Setup) -> Setup:
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+@case("gtfs")
+def setup_gtfs(workdir, args, size):
+    """Scheduled service totals for two weeks of a feed, written to a DynamoDB table. Scales bus routes."""
+    days = round(GTFS_DAYS * size.history)
+    if args.feed:
+        session = create_sqlalchemy_session(args.feed)
+        start_date = session.query(func.min(CalendarService.start_date)).scalar()
+        end_date = start_date + timedelta(days=days - 1)
+    else:
+        start_date, end_date = GTFS_START, GTFS_START + timedelta(days=days - 1)
+        session = synthetic.build_gtfs_feed(
+            f"{workdir}/feed.db", start_date, end_date, size.count(synthetic.BUS_ROUTES)
+        )
+
+    def run():
+        with offline() as (_, dynamodb, _):
+            ingest_feed_to_dynamo(dynamodb, session, start_date, end_date)
+
+    return run
+
+
+@case("delays")
+def setup_delays(workdir, args, size):
+    """A quarter of alerts for every line, parsed into daily delay totals by type. Scales alerts per day."""
+    requests = delays.generate_requests(size.start_date(RECENT_START, RECENT_END), RECENT_END)
+    http = RecordedHttp(synthetic.build_alerts_cassette(requests, alerts_per_day=size.count(ALERTS_PER_DAY)))
+
+    def run():
+        with offline(http=http):
+            delays.process_requests(requests)
+
+    return run
+
+
+@case("trip_metrics")
+def setup_trip_metrics(workdir, args, size):
+    """A quarter of travel times for every route, pivoted into DeliveredTripMetricsExtended rows. History only."""
+    start_date = size.start_date(RECENT_START, RECENT_END)
+    http = RecordedHttp(
+        synthetic.build_agg_travel_times_cassette(trip_metrics.generate_requests(start_date, RECENT_END))
+    )
+
+    def run():
+        with offline(http=http):
+            trip_metrics.ingest_trip_metrics(start_date, RECENT_END)
+
+    return run
+
+
+@case("agg_speed_tables")
+def setup_agg_speed_tables(workdir, args, size):
+    """Weekly and monthly speed tables for every line, from a few years of DeliveredTripMetrics. History only."""
+    start_date = size.start_date(SPEEDS_START, SPEEDS_END)
+    dynamodb = FakeDynamo({"DeliveredTripMetrics": synthetic.build_delivered_trip_metrics(start_date, SPEEDS_END)})
+    params = {"start_date": start_date.isoformat(), "end_date": SPEEDS_END.isoformat()}
+
+    def run():
+        with offline(dynamodb=dynamodb):
+            for line in constants.LINES:
+                for agg in ("weekly", "monthly"):
+                    actual_trips_by_line({**params, "line": line, "agg": agg})
+
+    return run
+
+
+@case("ridership")
+def setup_ridership(workdir, args, size):
+    """Weekly ridership by route from every source's file. Scales bus routes, subway stations and CR trains."""
+    paths = synthetic.build_ridership_files(
+        workdir,
+        size.start_date(RIDERSHIP_START, RIDERSHIP_END),
+        RIDERSHIP_END,
+        bus_routes=size.count(synthetic.BUS_ROUTES),
+        stations_per_line=size.count(SUBWAY_STATIONS_PER_LINE),
+        trains_per_line=size.count(CR_TRAINS_PER_LINE),
+    )
+
+    def run():
+        get_ridership_by_route_id(paths["subway"], paths["bus"], paths["cr"], paths["ferry"], paths["ride"])
+
+    return run
+
+
+@case("bluebikes")
+def setup_bluebikes(workdir, args, size):
+    """A day of BlueBikes rideability, from station info and every 5-minute status snapshot. Scales stations."""
+    day = synthetic.build_bluebikes_day(BLUEBIKES_DAY, stations=size.count(synthetic.gbfs.STATIONS))
+    objects = {(bluebikes.BUCKET, key): data for key, data in day.items()}
+
+    def run():
+        with offline(s3_client=FakeS3Client(objects)):
+            bluebikes.calc_daily_stats(BLUEBIKES_DAY)
+
+    return run
+
+
+@case("dashboard")
+def setup_dashboard(workdir, args, size):
+    """The service and ridership dashboard from scratch (with an empty line cache). Scales bus routes."""
+    start_date = size.start_date(DASHBOARD_START_DATE, DASHBOARD_END)
+    bus_routes = size.count(DASHBOARD_BUS_ROUTES)
+    feed_index = synthetic.build_feed_index(bus_routes)
+    dynamodb = FakeDynamo(synthetic.build_dashboard_tables(start_date, DASHBOARD_END, bus_routes))
+
+    def run():
+        with (
+            offline(dynamodb=dynamodb),
+            mock.patch("chalicelib.service_ridership_dashboard.gtfs.get_latest_feed_index", lambda: feed_index),
+        ):
+            dashboard.create_service_ridership_dash_json(start_date, DASHBOARD_END, write_to_s3=True)
+
+    return run
+
+
+@case("dashboard_nightly")
+def setup_dashboard_nightly(workdir, args, size):
+    """The dashboard the night after a run earlier in the same week, with that run's line cache. Scales bus routes."""
+    # DASHBOARD_END is a Monday, so this is a Sunday night after a run on the Saturday, in the same week
+    end_date = DASHBOARD_END - timedelta(days=1)
+    start_date = size.start_date(DASHBOARD_START_DATE, end_date)
+    bus_routes = size.count(DASHBOARD_BUS_ROUTES)
+    feed_index = synthetic.build_feed_index(bus_routes)
+    dynamodb = FakeDynamo(synthetic.build_dashboard_tables(start_date, end_date, bus_routes))
+    patch_feed_index = mock.patch(
+        "chalicelib.service_ridership_dashboard.gtfs.get_latest_feed_index", lambda: feed_index
+    )
+    with (
+        offline(dynamodb=dynamodb) as (s3_client, _, _),
+        patch_feed_index,
+        contextlib.redirect_stdout(io.StringIO()),
+        contextlib.redirect_stderr(io.StringIO()),
+    ):
+        dashboard.create_service_ridership_dash_json(start_date, end_date - timedelta(days=1), write_to_s3=True)
+    previous_night = s3_client.objects
+
+    def run():
+        with offline(FakeS3Client(previous_night), dynamodb=dynamodb), patch_feed_index:
+            dashboard.create_service_ridership_dash_json(start_date, end_date, write_to_s3=True)
+
+    return run
+
+
+def measure(run: Callable[[], object], runs: int) -> dict:
+    """Median wall time of runs, and the peak memory traced during a separate run (tracing slows it down).
+
+    Both follow an untimed warm-up run, which takes the lazy imports and one-off setup of the fakes (like indexing
+    DynamoDB tables for queries) out of the measurements.
+    """
+    # The pipelines print (and the dashboard loader draws) their progress, which would drown out the results
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        run()
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            durations.append(time.perf_counter() - start)
+    return {"seconds": round(statistics.median(durations), 4), "peak_mb": round(peak / 2**20, 1)}
+
+
+def compare(result: dict, baseline: dict | None, tolerance: float) -> tuple[str, bool]:
+    """How a result compares to its baseline, and whether its peak memory grew by more than the tolerance.
+
+    Wall time depends on the machine, so its change is reported but doesn't count as a regression.
+    """
+    if baseline is None:
+        return "no baseline", False
+    changes = {metric: result[metric] / baseline[metric] - 1 for metric in ("seconds", "peak_mb") if baseline[metric]}
+    regressed = changes.get("peak_mb", 0) > tolerance
+    return ", ".join(f"{metric} {change:+.0%}" for metric, change in changes.items()), regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", choices=list(CASES), help="Run only these cases (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scale", type=float, action="append", help="Multiply counts by this (repeatable)")
+    parser.add_argument("--history", type=float, action="append", help="Multiply date ranges by this (repeatable)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth in peak memory, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the results to this CSV file")
+    parser.add_argument("--feed", help="Path to a GTFS SQLite feed to use instead of the synthetic one")
+    args = parser.parse_args()
+
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    sizes = [Size(scale, history) for scale, history in itertools.product(args.scale or [1], args.history or [1])]
+    results = {}
+    rows = []
+    regressions = []
+    print(f"{'case':<18}{'scale':>7}{'history':>9}{'median':>10}{'peak':>12}  vs. baseline")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, size in itertools.product(args.case or CASES, sizes):
+            key = size.baseline_key(name)
+            result = measure(CASES[name](tempfile.mkdtemp(dir=workdir), args, size), args.runs)
+            results[key] = result
+            rows.append({"case": name, "scale": size.scale, "history": size.history, **result})
+            comparison, regressed = compare(result, baselines.get(key), args.tolerance)
+            if regressed:
+                regressions.append(key)
+            print(
+                f"{name:<18}{size.scale:>7g}{size.history:>9g}{result['seconds']:>9.3f}s{result['peak_mb']:>9.1f} MB"
+                + f"  {comparison}"
+                + ("  REGRESSED" if regressed else "")
+            )
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps({**baselines, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Updated {BASELINE_PATH.name}")
+    elif regressions:
+        sys.exit(f"Peak memory grew by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
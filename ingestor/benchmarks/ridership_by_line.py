@@ -0,0 +1,72 @@
+"""Benchmark rolling route-level ridership up to lines with get_ridership_by_line_id.
+
+Generates weekly entries for the subway, commuter rail, ferry and RIDE routes and a configurable number of bus
+routes over several years. Run from the ingestor directory:
+
+    uv run python -m benchmarks.ridership_by_line [--bus-routes 170] [--years 8] [--runs 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from chalicelib.ridership.ingest import get_ridership_by_line_id
+
+
+def make_ridership_by_route_id(bus_routes: int, years: int, seed: int = 0) -> dict:
+    """Weekly entries per route, with ints for subway/bus and floats for CR/ferry/RIDE like process.py emits."""
+    rng = random.Random(seed)
+    weeks = pd.date_range("2016-01-04", periods=years * 52, freq="7D").strftime("%Y-%m-%d").tolist()
+
+    def entries(as_float: bool):
+        return [
+            {"date": week, "count": float(rng.randint(0, 20_000)) if as_float else rng.randint(0, 20_000)}
+            for week in weeks
+        ]
+
+    by_route_id = {route_id: entries(False) for route_id in ["Red", "Orange", "Blue", "Green", "Mattapan"]}
+    by_route_id.update({f"CR-{line}": entries(True) for line in ["Lowell", "Fitchburg", "Worcester", "Providence"]})
+    by_route_id.update({f"Boat-{route}": entries(True) for route in ["F1", "F4", "EastBoston", "Lynn"]})
+    by_route_id.update({str(route): entries(False) for route in range(1, bus_routes + 1)})
+    by_route_id["RIDE"] = entries(True)
+    return by_route_id
+
+
+def make_routes_by_line_id(bus_routes: int) -> dict:
+    route = lambda route_id: SimpleNamespace(route_id=route_id)  # noqa: E731
+    routes_by_line_id = {
+        "line-Red": [route("Red")],
+        "line-Green": [route(f"Green-{branch}") for branch in "BCDE"],
+        "line-Mattapan": [route("Mattapan")],
+        "line-commuter-rail": [route(f"CR-{line}") for line in ["Lowell", "Fitchburg", "Worcester", "Providence"]],
+    }
+    routes_by_line_id.update({f"line-{route_id}": [route(str(route_id))] for route_id in range(1, bus_routes + 1)})
+    return routes_by_line_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bus-routes", type=int, default=170)
+    parser.add_argument("--years", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    ridership_by_route_id = make_ridership_by_route_id(args.bus_routes, args.years)
+    routes_by_line_id = make_routes_by_line_id(args.bus_routes)
+    total = sum(len(entries) for entries in ridership_by_route_id.values())
+    print(f"{total:,} route-week entries, {len(ridership_by_route_id)} routes")
+
+    durations = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        get_ridership_by_line_id(ridership_by_route_id, routes_by_line_id)
+        durations.append(time.perf_counter() - start)
+    print(f"get_ridership_by_line_id: {statistics.median(durations):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the weekly peak-day ridership kernel on a synthetic dataset.
+
+Generates daily counts for every route over several years (the shape of the full bus history, the largest
+ridership input), then times weekly_peak_averages and group_entries_by_route separately. Run from the
+ingestor directory:
+
+    uv run python -m benchmarks.ridership_weekly [--routes 170] [--years 8] [--runs 3]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from chalicelib.ridership.process import group_entries_by_route, unofficial_labels_map, weekly_peak_averages
+
+
+def make_daily_ridership(routes: int, years: int, seed: int = 0) -> pd.DataFrame:
+    """One row per route per day, starting on a Monday, with a few missing counts."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2016-01-04", periods=years * 365, freq="D")
+    route_names = [str(route) for route in range(1, routes + 1)]
+    counts = rng.integers(0, 20_000, size=len(days) * routes).astype(float)
+    counts[rng.random(counts.size) < 0.001] = np.nan
+    return pd.DataFrame(
+        {
+            "date": np.repeat(days.values, routes),
+            "route": np.tile(route_names, len(days)),
+            "count": counts,
+        }
+    )
+
+
+def time_runs(fn, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=170)
+    parser.add_argument("--years", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_daily_ridership(args.routes, args.years)
+    print(f"{len(df):,} daily rows, {args.routes} routes, {args.years} years")
+
+    averages = weekly_peak_averages(df, "date", "route", "count")
+    aggregate = time_runs(lambda: weekly_peak_averages(df, "date", "route", "count"), args.runs)
+    emit = time_runs(
+        lambda: group_entries_by_route(
+            averages,
+            "date",
+            "route",
+            "count",
+            route_id_for=lambda route: unofficial_labels_map.get(route) or route,
+            missing_counts_as_zero=True,
+        ),
+        args.runs,
+    )
+    print(f"weekly_peak_averages:   {aggregate:.3f}s ({len(averages):,} route-weeks)")
+    print(f"group_entries_by_route: {emit:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Synthetic inputs for the ingesters, in the shapes the real sources produce, at any size.
+
+Each builder is deterministic for a given seed and takes its sizes as arguments. The defaults are about today's
+production scale: BlueBikes stations, bus routes, subway stations and commuter rail trains, and alerts per day.
+History length is set by the date range. Builders exist for:
+
+- gbfs: BlueBikes GBFS feeds, and days of them stored in S3 the way bluebikes.py stores them
+- ridership: ridership CSV and XLSX files in each source's schema
+- data_dashboard: alert and aggregate travel time responses, and DeliveredTripMetrics items
+- gtfs: compact GTFS SQLite feeds, and the route/line index of a feed
+- dashboard: the ScheduledServiceDaily and Ridership tables the dashboard is built from
+
+See benchmarks/pipelines.py for running the ingesters on them at several scales.
+"""
+
+from .dashboard import build_dashboard_tables
+from .data_dashboard import build_agg_travel_times_cassette, build_alerts_cassette, build_delivered_trip_metrics
+from .gbfs import build_bluebikes_day, build_station_information, build_station_status, generate_stations
+from .gtfs import BUS_ROUTES, build_feed_index, build_gtfs_feed, get_route_specs
+from .ridership import build_ridership_files
+
+__all__ = [
+    "BUS_ROUTES",
+    "build_agg_travel_times_cassette",
+    "build_alerts_cassette",
+    "build_bluebikes_day",
+    "build_dashboard_tables",
+    "build_delivered_trip_metrics",
+    "build_feed_index",
+    "build_gtfs_feed",
+    "build_ridership_files",
+    "build_station_information",
+    "build_station_status",
+    "generate_stations",
+    "get_route_specs",
+]
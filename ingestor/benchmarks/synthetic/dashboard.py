@@ -0,0 +1,71 @@
+"""The DynamoDB tables the service and ridership dashboard is built from."""
+
+import random
+from datetime import date
+
+import pandas as pd
+
+from .gtfs import BUS_ROUTES, SERVICE_DAYS, get_route_specs
+
+
+def build_dashboard_tables(
+    start_date: date,
+    end_date: date,
+    bus_routes: int = BUS_ROUTES,
+    seed: int = 0,
+) -> dict[str, list[dict]]:
+    """ScheduledServiceDaily rows for every route and day, and weekly Ridership rows for every line.
+
+    Routes are those of build_gtfs_feed. Each runs one hourly pattern per day type, cut by a fifth partway through
+    the range. Rows share their byHour dicts the way repeated values are in practice, which keeps long histories
+    small in memory.
+
+    Args:
+        start_date: First day of the tables.
+        end_date: Last day of the tables.
+        bus_routes: Number of bus routes, on top of the fixed rapid transit, commuter rail and ferry routes.
+        seed: Seed for the patterns, cuts and ridership counts.
+
+    Returns:
+        Items by table name, as boto3 resources return them.
+    """
+    rng = random.Random(seed)
+    specs = get_route_specs(bus_routes)
+    days = pd.date_range(start_date, end_date)
+    scheduled = []
+    for spec in specs:
+        patterns = {}
+        for day_type, (share, _) in SERVICE_DAYS.items():
+            by_hour = [0] * 24
+            for _ in range(round(spec.weekday_trips * share) * 2):
+                by_hour[(5 + rng.randrange(20)) % 24] += 1
+            patterns[day_type] = ({"totals": by_hour}, {"totals": [round(count * 0.8) for count in by_hour]})
+        cut_date = days[rng.randrange(len(days))]
+        for day in days:
+            day_type = "weekday" if day.weekday() < 5 else "saturday" if day.weekday() == 5 else "sunday"
+            by_hour = patterns[day_type][1 if day >= cut_date else 0]
+            count = sum(by_hour["totals"])
+            scheduled.append(
+                {
+                    "routeId": spec.route_id,
+                    "lineId": spec.line_id,
+                    "date": day.strftime("%Y-%m-%d"),
+                    "timestamp": int(day.timestamp()),
+                    "count": count,
+                    "serviceMinutes": count * 40,
+                    "hasServiceExceptions": False,
+                    "byHour": by_hour,
+                }
+            )
+    weeks = pd.date_range(start_date, end_date, freq="W-MON")
+    ridership = [
+        {
+            "lineId": line_id,
+            "date": week.strftime("%Y-%m-%d"),
+            "timestamp": int(week.timestamp()),
+            "count": rng.randrange(100, 50_000),
+        }
+        for line_id in sorted({spec.line_id for spec in specs})
+        for week in weeks
+    ]
+    return {"ScheduledServiceDaily": scheduled, "Ridership": ridership}
@@ -0,0 +1,150 @@
+"""Data-dashboard responses (alerts and aggregate travel times), and the daily speeds derived from them.
+
+Responses are returned as cassettes of request URL -> body, built for the same requests the ingesters generate,
+so benchmarks.offline.RecordedHttp can answer them.
+"""
+
+import json
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import pandas as pd
+
+from chalicelib import constants
+from chalicelib.delays.types import AlertsRequest
+from chalicelib.trip_metrics.types import AggTravelTimesRequest
+
+ALERT_TEMPLATES = [
+    "{line} Line: Delays of about {minutes} minutes due to a disabled train near Park Street.",
+    "{line} Line: Delays of up to {minutes} minutes due to a signal problem at Downtown Crossing.",
+    "{line} Line: Delays of about {minutes} minutes due to a medical emergency on board a train.",
+    "Train {train} is operating {minutes} minutes late due to a switch problem.",
+    "Train {train} is operating {low}-{minutes} minutes behind schedule due to police activity.",
+    "{line} Line: Service is running normally after an earlier mechanical issue.",
+    "Elevator unavailable at Harvard due to maintenance.",
+]
+
+
+def get_alerts_url(request: AlertsRequest) -> str:
+    """The URL delays.process_single_day requests."""
+    return constants.DD_URL_ALERTS.format(
+        date=request.date.strftime(constants.DATE_FORMAT_BACKEND),
+        parameters=urlencode({"route": request.route}, doseq=True),
+    )
+
+
+def build_alerts_cassette(requests: list[AlertsRequest], alerts_per_day: int = 4, seed: int = 0) -> dict[str, bytes]:
+    """A day of alerts for each request: a mix of delay and non-delay alerts, and some days with none.
+
+    Args:
+        requests: Requests from delays.process.generate_requests.
+        alerts_per_day: Average number of alerts on a line each day.
+        seed: Seed for the alerts.
+
+    Returns:
+        Response bodies by URL.
+    """
+    rng = random.Random(seed)
+    cassette = {}
+    for request in requests:
+        alerts = []
+        for _ in range(rng.randint(0, 2 * alerts_per_day)):
+            valid_from = datetime.combine(request.date, datetime.min.time()) + timedelta(minutes=rng.randrange(1200))
+            minutes = rng.randrange(5, 45)
+            text = rng.choice(ALERT_TEMPLATES).format(
+                line=request.route, train=rng.randrange(100, 900), minutes=minutes, low=max(minutes - 10, 1)
+            )
+            alerts.append(
+                {
+                    "valid_from": valid_from.isoformat(),
+                    "valid_to": (valid_from + timedelta(minutes=rng.randrange(10, 120))).isoformat(),
+                    "text": text,
+                }
+            )
+        cassette[get_alerts_url(request)] = json.dumps(alerts).encode("utf8")
+    return cassette
+
+
+def get_agg_travel_times_url(request: AggTravelTimesRequest) -> str:
+    """The URL trip_metrics.request_agg_travel_time requests."""
+    params = {
+        "from_stop": request.stop_pair[0],
+        "to_stop": request.stop_pair[1],
+        "start_date": request.start_date.strftime(constants.DATE_FORMAT_BACKEND),
+        "end_date": request.end_date.strftime(constants.DATE_FORMAT_BACKEND),
+    }
+    return constants.DD_URL_AGG_TT.format(parameters=urlencode(params, doseq=True))
+
+
+def build_agg_travel_times_cassette(requests: list[AggTravelTimesRequest], seed: int = 0) -> dict[str, bytes]:
+    """Aggregate travel times for every day of each request, for all four peak periods.
+
+    Args:
+        requests: Requests from trip_metrics.ingest.generate_requests.
+        seed: Seed for the travel times.
+
+    Returns:
+        Response bodies by URL.
+    """
+    rng = random.Random(seed)
+    cassette = {}
+    for request in requests:
+        entries = []
+        for service_date in pd.date_range(request.start_date, request.end_date).strftime("%Y-%m-%d"):
+            for peak in ("all", "off_peak", "am_peak", "pm_peak"):
+                median = rng.randrange(900, 2400)
+                entries.append(
+                    {
+                        "25%": median - rng.randrange(30, 120),
+                        "50%": median,
+                        "75%": median + rng.randrange(30, 120),
+                        "count": rng.randrange(20, 200),
+                        "max": median + rng.randrange(300, 900),
+                        "mean": median + rng.random() * 60,
+                        "min": median - rng.randrange(120, 300),
+                        "std": rng.random() * 200,
+                        "peak": peak,
+                        "service_date": service_date,
+                    }
+                )
+        cassette[get_agg_travel_times_url(request)] = json.dumps(entries).encode("utf8")
+    return cassette
+
+
+def build_delivered_trip_metrics(start_date: date, end_date: date, seed: int = 0) -> list[dict]:
+    """DeliveredTripMetrics items, as daily_speeds writes them, for every rapid transit route and day.
+
+    About 1% of days have no valid speed, so they only have a count, like format_tt_objects' invalid entries.
+
+    Args:
+        start_date: First day of items.
+        end_date: Last day of items.
+        seed: Seed for the speeds and counts.
+
+    Returns:
+        Items as boto3 resources return them.
+    """
+    rng = random.Random(seed)
+    items = []
+    for line, routes in constants.LINE_TO_ROUTE_MAP.items():
+        for route in routes:
+            length = Decimal(str(round(rng.uniform(5, 15), 2)))
+            for day in pd.date_range(start_date, end_date).strftime("%Y-%m-%d"):
+                count = Decimal(rng.randrange(80, 200))
+                item = {"route": route, "line": line, "date": day, "count": count}
+                if rng.random() > 0.01:
+                    mean = Decimal(str(round(rng.uniform(1200, 2400), 1)))
+                    item.update(
+                        {
+                            "median": mean - 30,
+                            "mean": mean,
+                            "miles_covered": count * length,
+                            "track_mileage": length,
+                            "total_time": mean * count,
+                            "avg_car_age": Decimal(str(round(rng.uniform(5, 40), 1))),
+                        }
+                    )
+                items.append(item)
+    return items
@@ -0,0 +1,132 @@
+"""BlueBikes GBFS feeds, and days of them as bluebikes.py stores them in S3."""
+
+import csv
+import datetime
+import io
+import random
+
+import pandas as pd
+
+from chalicelib import bluebikes
+
+# About today's number of BlueBikes stations
+STATIONS = 450
+# store_station_status runs every 5 minutes
+SNAPSHOTS_PER_DAY = 288
+REGIONS = {10: "Boston", 11: "Cambridge", 12: "Somerville", 13: "Brookline"}
+
+
+def generate_stations(count: int = STATIONS, seed: int = 0) -> list[dict]:
+    """Station information entries, scattered around Boston densely enough that most have neighbors within 400m.
+
+    The area grows with the count, so station density (and neighbors per station) stays about the same.
+    """
+    rng = random.Random(seed)
+    spread = 0.05 * (count / STATIONS) ** 0.5
+    return [
+        {
+            "station_id": f"station-{index}",
+            "external_id": f"external-{index}",
+            "name": f"Station {index}",
+            "short_name": f"A{index:05}",
+            "lat": round(42.36 + rng.uniform(-spread, spread), 6),
+            "lon": round(-71.08 + rng.uniform(-1.4 * spread, 1.4 * spread), 6),
+            "region_id": rng.choice(list(REGIONS)),
+            "capacity": rng.randrange(11, 40),
+            "has_kiosk": True,
+            "station_type": "classic",
+        }
+        for index in range(count)
+    ]
+
+
+def _feed(last_updated: int, data: dict) -> dict:
+    return {"last_updated": last_updated, "ttl": 5, "version": "2.3", "data": data}
+
+
+def build_station_information(stations: list[dict], last_updated: int) -> dict:
+    """The station_information.json feed."""
+    return _feed(last_updated, {"stations": stations})
+
+
+def build_system_regions(last_updated: int) -> dict:
+    """The system_regions.json feed."""
+    return _feed(last_updated, {"regions": [{"region_id": key, "name": name} for key, name in REGIONS.items()]})
+
+
+def build_station_status(
+    stations: list[dict], last_updated: int, rng: random.Random, uninstalled: frozenset = frozenset()
+) -> dict:
+    """The station_status.json feed at one moment, with a random number of each station's docks holding bikes."""
+    statuses = []
+    for station in stations:
+        installed = int(station["station_id"] not in uninstalled)
+        bikes = rng.randrange(station["capacity"] + 1)
+        ebikes = rng.randrange(bikes + 1)
+        statuses.append(
+            {
+                "station_id": station["station_id"],
+                "num_bikes_available": bikes,
+                "num_ebikes_available": ebikes,
+                "num_bikes_disabled": 0,
+                "num_docks_available": station["capacity"] - bikes,
+                "num_docks_disabled": 0,
+                "is_installed": installed,
+                "is_renting": installed,
+                "is_returning": installed,
+                "last_reported": last_updated - rng.randrange(300),
+            }
+        )
+    return _feed(last_updated, {"stations": statuses})
+
+
+def _station_status_csv(feed: dict) -> bytes:
+    """A station_status feed flattened to CSV the way store_station_status does it."""
+    stations = [{**station, "datetimepulled": feed["last_updated"]} for station in feed["data"]["stations"]]
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=list(stations[0]), extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(stations)
+    return text.getvalue().encode("utf-8")
+
+
+def _station_info_csv(information: dict, regions: dict) -> bytes:
+    """Station information joined with regions the way store_station_info does it."""
+    station_df = pd.DataFrame(information["data"]["stations"])
+    region_df = pd.DataFrame(regions["data"]["regions"])
+    return station_df.merge(region_df, on="region_id", how="left").to_csv(index=False).encode("utf-8")
+
+
+def build_bluebikes_day(
+    day: datetime.date,
+    stations: int = STATIONS,
+    snapshots: int = SNAPSHOTS_PER_DAY,
+    seed: int = 0,
+) -> dict[str, bytes]:
+    """S3 objects (key -> CSV) for a day of BlueBikes: station information and a day of status snapshots.
+
+    About 1% of stations are uninstalled all day.
+
+    Args:
+        day: The day, in Boston.
+        stations: Number of stations.
+        snapshots: Status snapshots, evenly spaced over the day.
+        seed: Seed for the stations and their statuses.
+
+    Returns:
+        Objects by key, as calc_daily_stats reads them from bluebikes.BUCKET.
+    """
+    rng = random.Random(seed)
+    station_info = generate_stations(stations, seed)
+    uninstalled = frozenset(rng.sample([station["station_id"] for station in station_info], max(1, stations // 100)))
+    midnight = int(bluebikes.TZ.localize(datetime.datetime.combine(day, datetime.time())).timestamp())
+
+    information = build_station_information(station_info, midnight + 6 * 3600)
+    objects = {
+        bluebikes.get_station_info_key(day): _station_info_csv(information, build_system_regions(midnight + 6 * 3600))
+    }
+    for snapshot in range(snapshots):
+        timestamp = midnight + snapshot * (24 * 3600 // snapshots)
+        feed = build_station_status(station_info, timestamp, rng, uninstalled)
+        objects[bluebikes.get_station_status_key(day, timestamp)] = _station_status_csv(feed)
+    return objects
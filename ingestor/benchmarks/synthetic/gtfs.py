@@ -0,0 +1,172 @@
+"""Compact GTFS SQLite feeds, and the route/line index the dashboard reads from a feed."""
+
+import enum
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from mbta_gtfs_sqlite.models import (
+    CalendarAttribute,
+    CalendarService,
+    CalendarServiceException,
+    CalendarServiceExceptionType,
+    Line,
+    Route,
+    RouteType,
+    ServiceDayAvailability,
+    Trip,
+)
+from mbta_gtfs_sqlite.session import create_sqlalchemy_session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from chalicelib.gtfs.feed_cache import FeedIndex
+
+# About today's number of MBTA bus routes
+BUS_ROUTES = 170
+
+CR_LINES = ["Fairmount", "Fitchburg", "Worcester", "Franklin", "Greenbush", "Haverhill", "Kingston", "Lowell"]
+CR_LINES += ["NewBedford", "Needham", "Newburyport", "Providence"]
+FERRY_ROUTES = ["F1", "F4", "EastBoston"]
+
+# Share of weekday service run by each of a route's three services, and the days (Monday first) it runs on
+SERVICE_DAYS = {"weekday": (1.0, "1111100"), "saturday": (0.7, "0000010"), "sunday": (0.5, "0000001")}
+DAY_COLUMNS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+@dataclass(frozen=True)
+class RouteSpec:
+    route_id: str
+    line_id: str
+    route_type: RouteType
+    # Weekday trips in each direction
+    weekday_trips: int
+
+
+def get_route_specs(bus_routes: int = BUS_ROUTES) -> list[RouteSpec]:
+    """Rapid transit, commuter rail and ferry routes as the MBTA runs them, and bus_routes numbered bus routes."""
+    specs = [
+        RouteSpec("Red", "line-Red", RouteType.METRO, 180),
+        RouteSpec("Orange", "line-Orange", RouteType.METRO, 170),
+        RouteSpec("Blue", "line-Blue", RouteType.METRO, 160),
+        RouteSpec("Mattapan", "line-Mattapan", RouteType.TRAM, 90),
+        *(RouteSpec(f"Green-{branch}", "line-Green", RouteType.TRAM, 120) for branch in "BCDE"),
+        *(RouteSpec(f"CR-{line}", f"line-{line}", RouteType.RAIL, 20) for line in CR_LINES),
+        *(RouteSpec(f"Boat-{route}", f"line-Boat-{route}", RouteType.FERRY, 12) for route in FERRY_ROUTES),
+    ]
+    specs.extend(RouteSpec(str(route), f"line-{route}", RouteType.BUS, 60) for route in range(1, bus_routes + 1))
+    return specs
+
+
+def _model_row(model, **values) -> dict:
+    """Column values for an insert, with the required columns the ingesters don't read filled in."""
+    for column in model.__table__.columns:
+        if column.primary_key or column.key in values or column.nullable:
+            continue
+        python_type = column.type.python_type
+        if column.key == "feed_info_id":
+            values[column.key] = 1
+        elif issubclass(python_type, enum.Enum):
+            values[column.key] = next(iter(python_type))
+        else:
+            values[column.key] = python_type()
+    return values
+
+
+def build_gtfs_feed(
+    path: str,
+    start_date: date,
+    end_date: date,
+    bus_routes: int = BUS_ROUTES,
+    service_scale: float = 1.0,
+    seed: int = 0,
+) -> Session:
+    """Write a compact GTFS SQLite feed covering start_date to end_date, and open a session on it.
+
+    Every route has weekday, Saturday and Sunday services with trips spread from 5 AM to 1 AM. On the feed's first
+    Monday, weekday service is removed and Sunday service added, like a holiday.
+
+    Args:
+        path: Where to write the SQLite file.
+        start_date: First day of service.
+        end_date: Last day of service.
+        bus_routes: Number of bus routes, on top of the fixed rapid transit, commuter rail and ferry routes.
+        service_scale: Multiplies every route's trips.
+        seed: Seed for the trip times.
+
+    Returns:
+        A session on the feed, as ingest_feed_to_dynamo takes it.
+    """
+    rng = random.Random(seed)
+    session = create_sqlalchemy_session(path)
+    specs = get_route_specs(bus_routes)
+    first_monday = start_date + timedelta(days=-start_date.weekday() % 7)
+
+    lines = sorted({spec.line_id for spec in specs})
+    session.execute(
+        insert(Line),
+        [_model_row(Line, line_id=line_id, line_short_name="", line_long_name=line_id[5:]) for line_id in lines],
+    )
+    session.execute(
+        insert(Route),
+        [_model_row(Route, route_id=spec.route_id, line_id=spec.line_id, route_type=spec.route_type) for spec in specs],
+    )
+    services, attributes, exceptions, trips = [], [], [], []
+    for spec in specs:
+        for service_name, (share, days) in SERVICE_DAYS.items():
+            service_id = f"{spec.route_id}-{service_name}"
+            availability = {
+                column: ServiceDayAvailability.AVAILABLE if flag == "1" else ServiceDayAvailability.NOT_AVAILABLE
+                for column, flag in zip(DAY_COLUMNS, days)
+            }
+            services.append(
+                _model_row(
+                    CalendarService, service_id=service_id, start_date=start_date, end_date=end_date, **availability
+                )
+            )
+            attributes.append(_model_row(CalendarAttribute, service_id=service_id))
+            if service_name != "saturday":
+                exception_type = (
+                    CalendarServiceExceptionType.REMOVED
+                    if service_name == "weekday"
+                    else CalendarServiceExceptionType.ADDED
+                )
+                exceptions.append(
+                    _model_row(
+                        CalendarServiceException,
+                        service_id=service_id,
+                        date=first_monday,
+                        exception_type=exception_type,
+                    )
+                )
+            for direction in ("0", "1"):
+                for index in range(round(spec.weekday_trips * share * service_scale)):
+                    start_time = 5 * 3600 + rng.randrange(20 * 3600)
+                    trips.append(
+                        _model_row(
+                            Trip,
+                            route_id=spec.route_id,
+                            service_id=service_id,
+                            trip_id=f"{service_id}-{direction}-{index}",
+                            direction_id=direction,
+                            start_time=start_time,
+                            end_time=start_time + rng.randrange(15 * 60, 90 * 60),
+                            stop_count=rng.randrange(5, 30),
+                        )
+                    )
+    for model, rows in ((CalendarService, services), (CalendarAttribute, attributes), (Trip, trips)):
+        session.execute(insert(model), rows)
+    session.execute(insert(CalendarServiceException), exceptions)
+    session.commit()
+    return session
+
+
+def build_feed_index(bus_routes: int = BUS_ROUTES) -> FeedIndex:
+    """The index of a feed from build_gtfs_feed, as the dashboard reads it."""
+    specs = get_route_specs(bus_routes)
+    lines = [
+        Line(line_id=line_id, line_short_name="", line_long_name=line_id[5:])
+        for line_id in sorted({spec.line_id for spec in specs})
+    ]
+    routes = [Route(route_id=spec.route_id, line_id=spec.line_id, route_type=spec.route_type) for spec in specs]
+    return FeedIndex(feed_key="synthetic", routes=routes, lines=lines, shuttle_stops=[])
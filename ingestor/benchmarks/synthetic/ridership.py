@@ -0,0 +1,105 @@
+"""Ridership files in each source's schema (see chalicelib.ridership.config)."""
+
+import csv
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+from .gtfs import BUS_ROUTES
+
+SUBWAY_LINES = ["Red Line", "Orange Line", "Blue Line", "Green Line", "Mattapan", "SL1", "SL2", "SL4", "SL5"]
+CR_LINES = ["Fitchburg", "Needham", "Greenbush", "Fairmount", "Providence/Stoughton", "Lowell", "Haverhill"]
+FERRY_ROUTES = ["F1", "F2H", "F4", "F5", "F6", "F7"]
+
+
+def _write_csv(path: str, fieldnames: list[str], rows) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+
+def build_ridership_files(
+    directory: str,
+    start_date: date,
+    end_date: date,
+    bus_routes: int = BUS_ROUTES,
+    stations_per_line: int = 12,
+    trains_per_line: int = 20,
+    seed: int = 0,
+) -> dict[str, str]:
+    """Write one ridership file per source and return their paths by source.
+
+    - subway: daily gated station validations, one row per station per line per day
+    - bus: the "Weekly by Route" sheet of the bus workbook
+    - cr: estimated boardings per train
+    - ferry: passengers per departure, 16 departures per route per day
+    - ride: completed RIDE trips per day
+
+    Args:
+        directory: Where to write the files.
+        start_date: First day of ridership.
+        end_date: Last day of ridership.
+        bus_routes: Number of bus routes in the bus workbook.
+        stations_per_line: Stations per subway line, each a row per day.
+        trains_per_line: Commuter rail trains per line, each a row per day.
+        seed: Seed for the counts.
+
+    Returns:
+        Paths by source, in the order get_ridership_by_route_id takes them.
+    """
+    rng = random.Random(seed)
+    days = pd.date_range(start_date, end_date)
+    day_strings = days.strftime("%Y-%m-%d").tolist()
+    paths = {
+        "subway": f"{directory}/subway.csv",
+        "bus": f"{directory}/bus.xlsx",
+        "cr": f"{directory}/cr.csv",
+        "ferry": f"{directory}/ferry.csv",
+        "ride": f"{directory}/ride.csv",
+    }
+
+    _write_csv(
+        paths["subway"],
+        ["servicedate", "route_or_line", "stop_name", "validations"],
+        (
+            (day, line, f"Station {station}", rng.randrange(0, 8000))
+            for day in day_strings
+            for line in SUBWAY_LINES
+            for station in range(stations_per_line)
+        ),
+    )
+    _write_csv(
+        paths["cr"],
+        ["servicedate", "line", "train", "estimated_boardings"],
+        (
+            (day, line, train, rng.randrange(0, 400))
+            for day in day_strings
+            for line in CR_LINES
+            for train in range(trains_per_line)
+        ),
+    )
+    _write_csv(
+        paths["ferry"],
+        ["actual_departure", "route_id", "pax_on"],
+        (
+            ((day + timedelta(minutes=6 * 60 + 40 * trip)).strftime("%Y-%m-%d %H:%M:%S"), route, rng.randrange(0, 150))
+            for day in days
+            for route in FERRY_ROUTES
+            for trip in range(16)
+        ),
+    )
+    _write_csv(paths["ride"], ["Date", "Completed_Trips"], ((day, rng.randrange(3000, 7000)) for day in day_strings))
+
+    weeks = pd.date_range(start_date, end_date, freq="W-MON")
+    bus = pd.DataFrame(
+        {
+            "WeekStartDay": weeks.repeat(bus_routes),
+            "Route": list(range(1, bus_routes + 1)) * len(weeks),
+            "TotalRiders": [rng.randrange(0, 20_000) for _ in range(len(weeks) * bus_routes)],
+        }
+    )
+    with pd.ExcelWriter(paths["bus"], engine="openpyxl") as writer:
+        bus.to_excel(writer, sheet_name="Weekly by Route", index=False)
+    return paths
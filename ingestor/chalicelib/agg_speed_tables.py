@@ -5,16 +5,13 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Literal
 
-import boto3
 import numpy as np
 import pandas as pd
 from boto3.dynamodb.conditions import Key
 from chalice import BadRequestError
 from dynamodb_json import json_util as ddb_json
 
-from . import constants, dynamo
-
-dynamodb = boto3.resource("dynamodb")
+from . import constants, dynamo, instrumentation
 
 
 @dataclass
@@ -35,6 +32,7 @@ class TripsByLineParams:
     agg: Range
 
 
+@instrumentation.instrumented()
 def populate_table(line: Line, range: Range, start_date: str = "2016-01-01"):
     """Populate weekly or monthly aggregate speed table for a given line. Ran manually as a lambda in AWS console"""
     print(f"Populating {range} table")
@@ -56,32 +54,34 @@ def update_tables(range: Range):
     """Update weekly and monthly speed tables"""
     table = constants.TABLE_MAP[range]
     yesterday = datetime.now() - timedelta(days=1)
-    for line in constants.LINES:
-        start = table["update_start"]
-        start_string = datetime.strftime(start, constants.DATE_FORMAT_BACKEND)
-        end_string = datetime.strftime(yesterday, constants.DATE_FORMAT_BACKEND)
-        print(f"Updating {line} for {range} for week of {start_string} to {end_string}")
-        try:
-            trips = actual_trips_by_line(
-                {
-                    "start_date": start_string,
-                    "end_date": end_string,
-                    "line": line,
-                    "agg": range,
-                }
-            )
-            dynamo.dynamo_batch_write(json.loads(json.dumps(trips), parse_float=Decimal), table["table_name"])
-            print("Done")
-        except Exception as e:
-            print(e)
+    with instrumentation.stage("agg_speed_tables.update_tables", range=range):
+        for line in constants.LINES:
+            start = table["update_start"]()
+            start_string = datetime.strftime(start, constants.DATE_FORMAT_BACKEND)
+            end_string = datetime.strftime(yesterday, constants.DATE_FORMAT_BACKEND)
+            print(f"Updating {line} for {range} for week of {start_string} to {end_string}")
+            try:
+                trips = actual_trips_by_line(
+                    {
+                        "start_date": start_string,
+                        "end_date": end_string,
+                        "line": line,
+                        "agg": range,
+                    }
+                )
+                dynamo.dynamo_batch_write(json.loads(json.dumps(trips), parse_float=Decimal), table["table_name"])
+                print("Done")
+            except Exception as e:
+                print(e)
 
 
 def query_daily_trips_on_route(table_name: str, route: str, start_date: str, end_date: str):
-    table = dynamodb.Table(table_name)
+    table = dynamo.get_resource().Table(table_name)
     response = table.query(KeyConditionExpression=Key("route").eq(route) & Key("date").between(start_date, end_date))
     return ddb_json.loads(response["Items"])
 
 
+@instrumentation.instrumented()
 def query_daily_trips_on_line(table_name: str, line: Line, start_date: str, end_date: str):
     route_keys = constants.LINE_TO_ROUTE_MAP[line]
     with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
@@ -109,6 +109,7 @@ def actual_trips_by_line(params: TripsByLineParams):
     return aggregate_actual_trips(actual_trips, params["agg"], params["start_date"])
 
 
+@instrumentation.instrumented()
 def aggregate_actual_trips(actual_trips, agg: Range, start_date: str):
     """Aggregate trips into lines and optionally week/month"""
     flat_data = [entry for sublist in actual_trips for entry in sublist]
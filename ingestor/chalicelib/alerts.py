@@ -3,7 +3,7 @@ import json
 import requests
 from botocore.exceptions import ClientError
 
-from chalicelib import s3
+from chalicelib import instrumentation, s3
 from chalicelib.date_utils import get_current_service_date
 
 BUCKET = "tm-mbta-performance"
@@ -13,14 +13,16 @@ def key(day):
     return f"Alerts/v3/{str(day)}.json.gz"
 
 
+@instrumentation.instrumented()
 def save_v3_alerts():
-    r_s = requests.get("https://api-v3.mbta.com/alerts")
-    alerts = r_s.json()
+    with instrumentation.stage("alerts.fetch") as stage:
+        r_s = requests.get("https://api-v3.mbta.com/alerts")
+        alerts = r_s.json()
+        stage.record(items=len(alerts["data"]), bytes=len(r_s.content))
 
     service_date = get_current_service_date()
     try:
-        current_alerts = s3.download(BUCKET, key(service_date), encoding="utf8", compressed=True)
-        all_alerts = json.loads(current_alerts)
+        all_alerts = s3.download_json(BUCKET, key(service_date), compressed=True)
     except ClientError as ex:
         if ex.response["Error"]["Code"] != "NoSuchKey":
             raise
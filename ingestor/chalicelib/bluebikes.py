@@ -2,13 +2,13 @@ import datetime
 import json
 import sys
 
-import numpy as np
-import pandas as pd
 import pytz
 import requests
-from geopy import distance
 
-from chalicelib import s3
+from chalicelib import instrumentation, s3
+
+# numpy, pandas and geopy are imported inside the daily stats functions that use them,
+# so the every-5-minute station status job doesn't load them on cold start.
 
 BUCKET = "tm-bluebikes"
 TZ = pytz.timezone("US/Eastern")
@@ -31,6 +31,7 @@ def get_station_status():
     return datajson
 
 
+@instrumentation.instrumented()
 def store_station_status():
     datajson = get_station_status()
 
@@ -39,13 +40,16 @@ def store_station_status():
     if not stations:
         print("No stations found in the response.")
         return
-    df = pd.DataFrame.from_records(stations)
-    df["datetimepulled"] = timestamp
+    fieldnames = []
+    for station in stations:
+        station["datetimepulled"] = timestamp
+        fieldnames.extend(field for field in station if field not in fieldnames)
 
     date = datetime.datetime.fromtimestamp(timestamp, TZ).date()
     key = get_station_status_key(date, timestamp)
 
-    s3.upload_df_as_csv(BUCKET, key, df)
+    instrumentation.record(items=len(stations))
+    s3.upload_rows_as_csv(BUCKET, key, stations, fieldnames)
 
 
 ##################
@@ -54,7 +58,10 @@ def get_station_info_key(date):
     return f"station_info/{date}/station_info.csv"
 
 
+@instrumentation.instrumented()
 def store_station_info():
+    import pandas as pd
+
     # get station info
     resp = requests.get("https://gbfs.bluebikes.com/gbfs/en/station_information.json")
 
@@ -80,6 +87,8 @@ def store_station_info():
 # Neighbor stations and ridability calculated daily
 ##################
 def get_distance(df, lat, lon, n_lat, n_lon):
+    from geopy import distance
+
     loc = (df[lat], df[lon])
     n_loc = (df[n_lat], df[n_lon])
     dist = distance.distance(loc, n_loc).km
@@ -91,6 +100,8 @@ def haversine(lat, lon, n_lat, n_lon):
     Distance function impl. from StackOverflow compatible with numpy arrays.
     Distances are slightly different than geopy, so perhaps we use 405 meters as cutoff to be kind?
     """
+    import numpy as np
+
     radius = 6371.0
     d_lat = np.radians(lat - n_lat)
     d_lon = np.radians(lon - n_lon)
@@ -104,7 +115,10 @@ def get_neighbor_key(date):
     return f"station_info/{date}/station_neighbors.csv"
 
 
+@instrumentation.instrumented()
 def calc_neighbors(date, exclude=[]):
+    import pandas as pd
+
     # get station info
     df = s3.download_csv_as_df(BUCKET, get_station_info_key(date))
 
@@ -140,16 +154,25 @@ def get_rideability_key(date):
     return f"rideability/{date}/rideability.csv"
 
 
+@instrumentation.instrumented()
 def gather_single_day_data(single_day):
+    import pandas as pd
+
     keys = s3.ls(BUCKET, f"station_status/{single_day}")
-    dfs = [s3.download_csv_as_df(BUCKET, key) for key in keys]
-    df = pd.concat(dfs)
+    # A day is 288 small snapshots, downloaded concurrently but concatenated in key (time) order
+    dfs_by_key = dict(s3.get_many(BUCKET, keys, read=s3.download_csv_as_df))
+    df = pd.concat([dfs_by_key[key] for key in keys])
+    instrumentation.record(items=len(keys))
 
     return df
 
 
 # TODO: edge case with valet
+@instrumentation.instrumented()
 def calc_daily_stats(day):
+    import numpy as np
+    import pandas as pd
+
     df = gather_single_day_data(day)
 
     # find uninstalled stations to exclude from neighbor calculation
@@ -316,10 +316,19 @@ DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATE_FORMAT_BACKEND = "%Y-%m-%d"
 GLX_EXTENSION_DATE = datetime.strptime("2023-03-19", DATE_FORMAT_BACKEND).date()
 CR_MIDDLEBOROUGH_DISCONTINUED = datetime.strptime("2025-03-24", DATE_FORMAT_BACKEND).date()
-TODAY = datetime.now().date()
 
-ONE_WEEK_AGO_STRING = (TODAY - timedelta(weeks=1)).strftime(DATE_FORMAT_BACKEND)
-NINETY_DAYS_AGO_STRING = (TODAY - timedelta(days=90)).strftime(DATE_FORMAT_BACKEND)
+
+# These are functions rather than import-time constants so warm Lambda containers don't serve stale dates.
+def today() -> date:
+    return datetime.now().date()
+
+
+def one_week_ago_string() -> str:
+    return (today() - timedelta(weeks=1)).strftime(DATE_FORMAT_BACKEND)
+
+
+def ninety_days_ago_string() -> str:
+    return (today() - timedelta(days=90)).strftime(DATE_FORMAT_BACKEND)
 
 
 DD_URL_AGG_TT = "https://dashboard-api.labs.transitmatters.org/api/aggregate/traveltimes?{parameters}"
@@ -351,12 +360,12 @@ TABLE_MAP = {
     "weekly": {
         "table_name": "DeliveredTripMetricsWeekly",
         "start_date": datetime.strptime("2016-01-11T08:00:00", DATE_FORMAT),  # Start on first Monday with data.
-        "update_start": get_weekly_table_update_start(),
+        "update_start": get_weekly_table_update_start,
     },
     "monthly": {
         "table_name": "DeliveredTripMetricsMonthly",
         "start_date": datetime.strptime("2016-01-01T08:00:00", DATE_FORMAT),  # Start on 1st of first month with data.
-        "update_start": get_monthly_table_update_start(),
+        "update_start": get_monthly_table_update_start,
     },
 }
 
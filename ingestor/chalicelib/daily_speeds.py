@@ -5,7 +5,7 @@ from urllib.parse import urlencode
 
 import requests
 
-from . import constants, dynamo
+from . import constants, dynamo, instrumentation
 from .car_ages import get_avg_car_age_for_line
 
 
@@ -35,27 +35,30 @@ def get_agg_tt_api_requests(stops, current_date: date, delta: timedelta):
 def send_requests(api_requests):
     """Send API requests to Datadashboard backend."""
     speed_object = {}
-    for request in api_requests:
-        response = requests.get(request)
-        try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError:
-            print(response.content.decode("utf-8"))
-            raise
-        data = json.loads(response.content.decode("utf-8"), parse_float=Decimal, parse_int=Decimal)
-        for item in data:
-            if item["service_date"] in speed_object:
-                speed_object[item["service_date"]]["median"] += item["50%"]
-                speed_object[item["service_date"]]["mean"] += item["mean"]
-                speed_object[item["service_date"]]["count"] += item["count"] / 2
-                speed_object[item["service_date"]]["entries"] += 1
-            else:
-                speed_object[item["service_date"]] = {
-                    "median": item["50%"] if item["50%"] else 0,
-                    "count": item["count"] / 2 if item["count"] else 0,
-                    "mean": item["mean"] if item["mean"] else 0,
-                    "entries": 1,
-                }
+    with instrumentation.stage("daily_speeds.send_requests") as stage:
+        for request in api_requests:
+            with stage.timed("fetch"):
+                response = requests.get(request)
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                print(response.content.decode("utf-8"))
+                raise
+            stage.record(items=1, bytes=len(response.content))
+            data = json.loads(response.content.decode("utf-8"), parse_float=Decimal, parse_int=Decimal)
+            for item in data:
+                if item["service_date"] in speed_object:
+                    speed_object[item["service_date"]]["median"] += item["50%"]
+                    speed_object[item["service_date"]]["mean"] += item["mean"]
+                    speed_object[item["service_date"]]["count"] += item["count"] / 2
+                    speed_object[item["service_date"]]["entries"] += 1
+                else:
+                    speed_object[item["service_date"]] = {
+                        "median": item["50%"] if item["50%"] else 0,
+                        "count": item["count"] / 2 if item["count"] else 0,
+                        "mean": item["mean"] if item["mean"] else 0,
+                        "entries": 1,
+                    }
     return speed_object
 
 
@@ -99,6 +102,7 @@ def get_date_range_strings(start_date: date, end_date: date):
     return date_range
 
 
+@instrumentation.instrumented()
 def populate_daily_table(start_date: datetime, end_date: datetime, line: str, route: str | None):
     """Populate DeliveredTripMetrics table. Calculates median TTs and trip counts for all days between start and end dates."""
     print(f"populating DeliveredTripMetrics for Line/Route: {line}/{route if route else '(no-route)'}")
@@ -129,6 +133,7 @@ def populate_daily_table(start_date: datetime, end_date: datetime, line: str, ro
         print("Done")
 
 
+@instrumentation.instrumented()
 def update_daily_table(date: date, routes: list[tuple[str, str | None]] | None = None):
     """Update DailySpeed table"""
     speed_objects = []
@@ -137,10 +142,12 @@ def update_daily_table(date: date, routes: list[tuple[str, str | None]] | None =
     # Compute avg_car_age once per line (shared across routes like red-a/red-b)
     lines_in_scope = set(r[0] for r in routes)
     car_ages: dict[str, Decimal | None] = {}
-    for line in lines_in_scope:
-        car_ages[line] = get_avg_car_age_for_line(date, line)
-        if car_ages[line] is not None:
-            print(f"Avg car age for {line} on {date}: {car_ages[line]} years")
+    with instrumentation.stage("daily_speeds.car_ages") as stage:
+        stage.record(items=len(lines_in_scope))
+        for line in lines_in_scope:
+            car_ages[line] = get_avg_car_age_for_line(date, line)
+            if car_ages[line] is not None:
+                print(f"Avg car age for {line} on {date}: {car_ages[line]} years")
 
     for route in routes:
         line = route[0]
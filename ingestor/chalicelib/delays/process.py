@@ -9,7 +9,7 @@ import pandas as pd
 import requests
 from boto3.dynamodb.conditions import Key
 
-from .. import constants, dynamo
+from .. import constants, dynamo, instrumentation
 from .aggregate import group_daily_data, group_weekly_data
 from .types import Alert, AlertsRequest
 
@@ -140,23 +140,26 @@ def process_requests(requests: List[AlertsRequest], lines=constants.ALL_LINES):
     for line in lines:
         all_data[line] = []
 
-    for request in requests:
-        data = process_single_day(request)
-        # Initializing at 0 regardless of condition
-        total_delay = 0
-        delay_by_type = constants.DELAY_BY_TYPE.copy()
-
-        if data is not None and len(data) != 0:
-            total_delay, delay_by_type = process_delay_time(data)
-        # We should always append zero records just in case
-        all_data[request.route].append(
-            {
-                "date": request.date.isoformat(),
-                "line": request.route,
-                "total_delay_time": total_delay,
-                "delay_by_type": delay_by_type,
-            }
-        )
+    with instrumentation.stage("delays.process_requests") as stage:
+        for request in requests:
+            with stage.timed("fetch"):
+                data = process_single_day(request)
+            # Initializing at 0 regardless of condition
+            total_delay = 0
+            delay_by_type = constants.DELAY_BY_TYPE.copy()
+
+            if data is not None and len(data) != 0:
+                total_delay, delay_by_type = process_delay_time(data)
+            # We should always append zero records just in case
+            all_data[request.route].append(
+                {
+                    "date": request.date.isoformat(),
+                    "line": request.route,
+                    "total_delay_time": total_delay,
+                    "delay_by_type": delay_by_type,
+                }
+            )
+        stage.record(items=len(requests))
 
     df_data = {}
     for line in lines:
@@ -212,6 +215,7 @@ def aggregate_commuter_rail_df(df_data: dict[str, pd.DataFrame]) -> pd.DataFrame
     return cr_combined
 
 
+@instrumentation.instrumented()
 def update_weekly_from_daily(start_date: date, end_date: date, lines=constants.ALL_LINES):
     """
     Update weekly table by aggregating daily data from DynamoDB.
@@ -241,6 +245,7 @@ def update_weekly_from_daily(start_date: date, end_date: date, lines=constants.A
     dynamo.dynamo_batch_write(json.loads(json.dumps(weekly_data, default=int), parse_float=Decimal), WEEKLY_TABLE_NAME)
 
 
+@instrumentation.instrumented()
 def update_table(start_date: date, end_date: date, lines=constants.ALL_LINES):
     """
     Update the table with rapid transit data
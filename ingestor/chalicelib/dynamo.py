@@ -1,20 +1,29 @@
+from functools import cache
+
 import boto3
 
-dynamodb = boto3.resource("dynamodb")
+from . import instrumentation
+
+
+@cache
+def get_resource():
+    """Shared DynamoDB resource, created on first use rather than at import."""
+    return boto3.resource("dynamodb")
 
 
 def dynamo_batch_write(speed_objects, table_name):
     """Write objects to dynamo tables. Splitting up oversize batches is configured automatically."""
-    table = dynamodb.Table(table_name)
+    table = get_resource().Table(table_name)
     if len(speed_objects) == 0:
         return
-    with table.batch_writer() as batch:
+    with instrumentation.stage("dynamo.batch_write", table=table_name) as stage, table.batch_writer() as batch:
         for item in speed_objects:
             batch.put_item(Item=item)
+        stage.record(items=len(speed_objects))
 
 
 def query_dynamo(params, table):
     """Send query to dynamo."""
-    table = dynamodb.Table(table)
+    table = get_resource().Table(table)
     response = table.query(**params)
     return response["Items"]
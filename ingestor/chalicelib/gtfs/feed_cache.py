@@ -0,0 +1,178 @@
+"""Shared access to the latest GTFS feed for jobs that only read a few of its tables.
+
+Feeds are downloaded into a fixed directory in /tmp, so a warm Lambda container (or a local run) doesn't download
+the same feed twice, and the archive, sessions and indexes are cached for the life of the process. Only the feeds
+this process has used are kept there: any other feed is deleted as soon as a new one is used, so /tmp doesn't fill
+up with superseded feeds.
+
+Jobs that only need routes, lines and shuttle stops can read a feed's index instead: a small JSON file that the GTFS
+ingestion publishes next to the feed's SQLite files in S3.
+"""
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from enum import Enum
+from functools import cache
+from tempfile import gettempdir
+from typing import List
+
+import boto3
+from botocore.exceptions import ClientError
+from mbta_gtfs_sqlite import GtfsFeed, MbtaGtfsArchive
+from mbta_gtfs_sqlite.models import Line, Route, Stop
+from sqlalchemy.orm import Session
+
+from .. import s3
+
+GTFS_BUCKET = "tm-gtfs"
+LOCAL_ARCHIVE_PATH = os.path.join(gettempdir(), "gtfs-feeds")
+INDEX_FILE = "index.json.gz"
+# Bump when the index layout changes, so stale indexes are rebuilt instead of misread
+INDEX_VERSION = 1
+
+# Base model columns that only make sense inside the feed's database
+DATABASE_ONLY_COLUMNS = {"id", "feed_info_id"}
+
+
+@dataclass
+class FeedIndex:
+    """Routes, lines and shuttle stops of one feed, as detached model instances."""
+
+    feed_key: str
+    routes: List[Route]
+    lines: List[Line]
+    shuttle_stops: List[Stop]
+
+
+INDEX_MODELS = {"routes": Route, "lines": Line, "shuttle_stops": Stop}
+
+# Feeds this process has used, and which are kept in LOCAL_ARCHIVE_PATH
+_used_feed_keys: set[str] = set()
+
+
+def _use_feed(feed_key: str) -> None:
+    """Record that a feed is in use, and delete any feed in LOCAL_ARCHIVE_PATH this process hasn't used."""
+    if feed_key in _used_feed_keys:
+        return
+    _used_feed_keys.add(feed_key)
+    if not os.path.isdir(LOCAL_ARCHIVE_PATH):
+        return
+    for name in os.listdir(LOCAL_ARCHIVE_PATH):
+        if name not in _used_feed_keys:
+            print(f"[{name}] Removing unused feed from {LOCAL_ARCHIVE_PATH}")
+            shutil.rmtree(os.path.join(LOCAL_ARCHIVE_PATH, name), ignore_errors=True)
+
+
+@cache
+def get_archive() -> MbtaGtfsArchive:
+    return MbtaGtfsArchive(
+        local_archive_path=LOCAL_ARCHIVE_PATH,
+        s3_bucket=boto3.resource("s3").Bucket(GTFS_BUCKET),
+    )
+
+
+def get_latest_feed() -> GtfsFeed:
+    return get_archive().get_latest_feed()
+
+
+@cache
+def get_session(feed_key: str, compact: bool = True) -> Session:
+    """Open a session on a feed, downloading (or building) it only if it isn't in /tmp already."""
+    _use_feed(feed_key)
+    feed = get_archive().get_feed_by_key(feed_key)
+    feed.use_compact_only(compact)
+    feed.download_or_build()
+    return feed.create_sqlite_session(compact=compact)
+
+
+def get_session_for_latest_feed(compact: bool = True) -> Session:
+    return get_session(get_latest_feed().key, compact)
+
+
+def get_shuttle_stops(session: Session) -> List[Stop]:
+    return session.query(Stop).filter(Stop.platform_name.contains("Shuttle")).all()
+
+
+def _row_to_json(row) -> dict:
+    values = {}
+    for column in row.__table__.columns:
+        if column.key in DATABASE_ONLY_COLUMNS:
+            continue
+        value = getattr(row, column.key)
+        values[column.key] = value.value if isinstance(value, Enum) else value
+    return values
+
+
+def _row_from_json(model, values: dict):
+    kwargs = {}
+    for column in model.__table__.columns:
+        if column.key not in values:
+            continue
+        value = values[column.key]
+        enum_class = getattr(column.type, "enum_class", None)
+        kwargs[column.key] = enum_class(value) if enum_class and value is not None else value
+    return model(**kwargs)
+
+
+def build_feed_index(session: Session) -> dict:
+    """Extract the index of a feed from its (compact) database, as JSON-ready dicts."""
+    return {
+        "version": INDEX_VERSION,
+        "routes": [_row_to_json(route) for route in session.query(Route).all()],
+        "lines": [_row_to_json(line) for line in session.query(Line).all()],
+        "shuttle_stops": [_row_to_json(stop) for stop in get_shuttle_stops(session)],
+    }
+
+
+def publish_feed_index(feed: GtfsFeed, session: Session) -> None:
+    """Upload a feed's index next to its SQLite files in S3."""
+    index = build_feed_index(session)
+    s3.upload(GTFS_BUCKET, f"{feed.key}/{INDEX_FILE}", json.dumps(index).encode("utf8"), compress=True)
+
+
+def _download_feed_index(feed_key: str) -> dict | None:
+    try:
+        index = json.loads(s3.download(GTFS_BUCKET, f"{feed_key}/{INDEX_FILE}", compressed=True))
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+@cache
+def get_feed_index(feed_key: str) -> FeedIndex:
+    """Load a feed's index from /tmp, then S3, and only build it from the feed's database if neither has it.
+
+    Args:
+        feed_key: Key of the feed in the archive.
+
+    Returns:
+        FeedIndex of the feed.
+    """
+    _use_feed(feed_key)
+    local_path = os.path.join(LOCAL_ARCHIVE_PATH, feed_key, "index.json")
+    index = None
+    if os.path.exists(local_path):
+        with open(local_path) as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            index = None
+    if index is None:
+        index = _download_feed_index(feed_key)
+        if index is None:
+            print(f"[{feed_key}] No published index, building it from the feed")
+            index = build_feed_index(get_session(feed_key, compact=True))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "w") as f:
+            json.dump(index, f)
+    return FeedIndex(
+        feed_key=feed_key,
+        **{name: [_row_from_json(model, values) for values in index[name]] for name, model in INDEX_MODELS.items()},
+    )
+
+
+def get_latest_feed_index() -> FeedIndex:
+    return get_feed_index(get_latest_feed().key)
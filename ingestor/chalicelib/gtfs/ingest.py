@@ -12,6 +12,7 @@ from mbta_gtfs_sqlite.models import (
     Route,
 )
 
+from .. import instrumentation
 from .utils import (
     bucket_by,
     bucket_trips_by_hour,
@@ -22,8 +23,10 @@ from .utils import (
     get_total_service_minutes,
 )
 from .models import SessionModels, RouteDateTotals
+from .feed_cache import publish_feed_index
 
 
+@instrumentation.instrumented()
 def load_session_models(session: Session) -> SessionModels:
     """Query all GTFS models from a SQLAlchemy session and index them into dicts keyed by ID.
 
@@ -132,21 +135,24 @@ def ingest_feed_to_dynamo(
     """
     ScheduledServiceDaily = dynamodb.Table("ScheduledServiceDaily")
     models = load_session_models(session)
-    for today in date_range(start_date, end_date):
-        totals = create_route_date_totals(today, models)
-        with ScheduledServiceDaily.batch_writer() as batch:
-            for total in totals:
-                item = {
-                    "date": total.date.isoformat(),
-                    "timestamp": int(total.timestamp),
-                    "routeId": total.route_id,
-                    "lineId": total.line_id,
-                    "count": total.count,
-                    "serviceMinutes": total.service_minutes,
-                    "hasServiceExceptions": total.has_service_exceptions,
-                    "byHour": {"totals": total.by_hour},
-                }
-                batch.put_item(Item=item)
+    with instrumentation.stage("gtfs.route_date_totals") as stage:
+        for today in date_range(start_date, end_date):
+            with stage.timed("compute"):
+                totals = create_route_date_totals(today, models)
+            with stage.timed("write"), ScheduledServiceDaily.batch_writer() as batch:
+                for total in totals:
+                    item = {
+                        "date": total.date.isoformat(),
+                        "timestamp": int(total.timestamp),
+                        "routeId": total.route_id,
+                        "lineId": total.line_id,
+                        "count": total.count,
+                        "serviceMinutes": total.service_minutes,
+                        "hasServiceExceptions": total.has_service_exceptions,
+                        "byHour": {"totals": total.by_hour},
+                    }
+                    batch.put_item(Item=item)
+            stage.record(items=len(totals))
 
 
 def ingest_feeds(
@@ -172,26 +178,27 @@ def ingest_feeds(
     for feed in feeds:
         feed.use_compact_only()
         try:
-            if force_rebuild_feeds:
-                print(f"[{feed.key}] Forcing rebuild locally")
-                feed.build_locally()
-                print(f"[{feed.key}] Uploading to S3")
-                feed.upload_to_s3()
-            else:
-                exists_locally = feed.exists_locally()
-                exists_remotely = feed.exists_remotely()
-                if exists_locally:
-                    print(f"[{feed.key}] Exists locally")
-                elif exists_remotely:
-                    print(f"[{feed.key}] Downloading from S3")
-                    feed.use_compact_only()
-                    feed.download_from_s3()
-                else:
-                    print(f"[{feed.key}] Building locally")
+            with instrumentation.stage("gtfs.prepare_feed"):
+                if force_rebuild_feeds:
+                    print(f"[{feed.key}] Forcing rebuild locally")
                     feed.build_locally()
-                if not exists_remotely:
                     print(f"[{feed.key}] Uploading to S3")
                     feed.upload_to_s3()
+                else:
+                    exists_locally = feed.exists_locally()
+                    exists_remotely = feed.exists_remotely()
+                    if exists_locally:
+                        print(f"[{feed.key}] Exists locally")
+                    elif exists_remotely:
+                        print(f"[{feed.key}] Downloading from S3")
+                        feed.use_compact_only()
+                        feed.download_from_s3()
+                    else:
+                        print(f"[{feed.key}] Building locally")
+                        feed.build_locally()
+                    if not exists_remotely:
+                        print(f"[{feed.key}] Uploading to S3")
+                        feed.upload_to_s3()
             session = feed.create_sqlite_session(compact=True)
             ingest_feed_to_dynamo(
                 dynamodb,
@@ -202,8 +209,18 @@ def ingest_feeds(
         except Exception as ex:
             print(f"[{feed.key}] Failed to retrieve")
             print(ex)
+            continue
+        # The index is a shortcut for readers, so failing to publish it mustn't hold up the feed's service totals
+        try:
+            print(f"[{feed.key}] Publishing feed index")
+            with instrumentation.stage("gtfs.publish_feed_index"):
+                publish_feed_index(feed, session)
+        except Exception as ex:
+            print(f"[{feed.key}] Failed to publish feed index")
+            print(ex)
 
 
+@instrumentation.instrumented()
 def ingest_gtfs_feeds_to_dynamo_and_s3(
     date_range: Union[None, Tuple[date, date]] = None,
     feed_key: Union[None, str] = None,
@@ -0,0 +1,198 @@
+"""Timing and throughput instrumentation for the ingestion jobs.
+
+Wrap a stage of a job in `stage` (or decorate a function with `instrumented`) to record its duration, along with
+any items, bytes and retries counted into it while it runs:
+
+    with instrumentation.stage("gtfs.write_totals", feed=feed.key) as s:
+        ...
+        s.record(items=len(totals))
+
+Counts can also be recorded from deeper down without passing the stage around: `record` adds to the innermost
+stage running in the current context, and does nothing outside of one. The S3 helpers count the bytes they move
+and the retries botocore made this way.
+
+Parts of a stage that alternate inside a loop (computing a day, then writing it) are timed with `Stage.timed`,
+which adds each pass to a running total per part instead of starting a stage per pass:
+
+    with instrumentation.stage("gtfs.route_date_totals") as s:
+        for today in days:
+            with s.timed("compute"):
+                ...
+            with s.timed("write"):
+                ...
+
+Every finished stage is logged as one JSON line at INFO. In Lambda it is also sent to Datadog, as a span under the
+invocation's trace and as ingestor.stage.* metrics tagged with the stage name. Locally the Datadog backend is a
+no-op, and the log lines are only shown if logging is configured to show them.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache, wraps
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+# The Lambda runtime's root logger only passes WARNING and up, and these lines are the point of the module
+logger.setLevel(logging.INFO)
+
+METRIC_PREFIX = "ingestor.stage"
+COUNTERS = ("items", "bytes", "retries")
+
+_current_stage: ContextVar[Optional["Stage"]] = ContextVar("current_stage", default=None)
+
+
+class Stage:
+    """A running (or finished) stage, and what was counted into it."""
+
+    def __init__(self, name: str, tags: dict[str, str]):
+        self.name = name
+        self.tags = tags
+        self.items = 0
+        self.bytes = 0
+        self.retries = 0
+        self.timings: dict[str, float] = {}
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        # Counts may come from several threads at once (see s3.get_many)
+        self._lock = threading.Lock()
+
+    def record(self, items: int = 0, bytes: int = 0, retries: int = 0) -> None:
+        with self._lock:
+            self.items += items
+            self.bytes += bytes
+            self.retries += retries
+
+    @contextmanager
+    def timed(self, part: str):
+        """Add the duration of a block to this stage's running total for one of its parts."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[part] = self.timings.get(part, 0.0) + elapsed
+
+    def to_json(self) -> dict:
+        return {
+            "stage": self.name,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            **{counter: getattr(self, counter) for counter in COUNTERS},
+            **({"timings_ms": {part: round(t * 1000, 1) for part, t in self.timings.items()}} if self.timings else {}),
+            "status": "error" if self.error else "ok",
+            **({"error": self.error} if self.error else {}),
+            **self.tags,
+        }
+
+
+class NoopBackend:
+    def start(self, stage: Stage):
+        return None
+
+    def finish(self, stage: Stage, span, exc_info) -> None:
+        pass
+
+
+class DatadogBackend:
+    """Spans through ddtrace and metrics through datadog_lambda, both already loaded by app.py's middleware."""
+
+    def start(self, stage: Stage):
+        from ddtrace import tracer
+
+        span = tracer.trace(METRIC_PREFIX, resource=stage.name)
+        span.set_tags(stage.tags)
+        return span
+
+    def finish(self, stage: Stage, span, exc_info) -> None:
+        from datadog_lambda.metric import lambda_metric
+
+        span.set_metrics({counter: getattr(stage, counter) for counter in COUNTERS})
+        span.set_metrics({f"{part}.duration": duration for part, duration in stage.timings.items()})
+        if exc_info:
+            span.set_exc_info(*exc_info)
+        span.finish()
+
+        tags = [f"stage:{stage.name}", f"status:{'error' if stage.error else 'ok'}"]
+        tags.extend(f"{key}:{value}" for key, value in stage.tags.items())
+        lambda_metric(f"{METRIC_PREFIX}.duration", stage.duration, tags=tags)
+        for counter in COUNTERS:
+            value = getattr(stage, counter)
+            if value:
+                lambda_metric(f"{METRIC_PREFIX}.{counter}", value, tags=tags)
+        for part, duration in stage.timings.items():
+            lambda_metric(f"{METRIC_PREFIX}.part_duration", duration, tags=[*tags, f"part:{part}"])
+
+
+@cache
+def get_backend():
+    """Datadog when running in Lambda with tracing enabled (as .chalice/config.json sets it), otherwise a no-op."""
+    in_lambda = "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+    tracing_enabled = os.environ.get("DD_TRACE_ENABLED", "true").lower() == "true"
+    return DatadogBackend() if in_lambda and tracing_enabled else NoopBackend()
+
+
+@contextmanager
+def stage(name: str, **tags):
+    """Time a block as a named stage of a job.
+
+    Args:
+        name: Name of the stage, dotted by module, e.g. "daily_speeds.send_requests".
+        tags: Extra tags for the log line, span and metrics, e.g. line="line-red". Keep them low-cardinality.
+
+    Yields:
+        The Stage, for recording counts into it.
+    """
+    current = Stage(name, {key: str(value) for key, value in tags.items()})
+    backend = get_backend()
+    span = backend.start(current)
+    token = _current_stage.set(current)
+    exc_info = None
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as ex:
+        exc_info = (type(ex), ex, ex.__traceback__)
+        current.error = type(ex).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_stage.reset(token)
+        logger.info(json.dumps(current.to_json()))
+        backend.finish(current, span, exc_info)
+
+
+def instrumented(name: Optional[str] = None, **tags):
+    """Decorator form of stage. The name defaults to the function's module (without chalicelib.) and name."""
+
+    def decorator(fn):
+        stage_name = name or f"{fn.__module__.removeprefix('chalicelib.')}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, **tags):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_stage() -> Optional[Stage]:
+    return _current_stage.get()
+
+
+def record(items: int = 0, bytes: int = 0, retries: int = 0) -> None:
+    """Add counts to the innermost running stage, if there is one."""
+    current = _current_stage.get()
+    if current is not None:
+        current.record(items=items, bytes=bytes, retries=retries)
+
+
+def record_response(response: dict, bytes: int = 0) -> None:
+    """Record the bytes moved by a boto3 call, and the retries botocore made to get its response."""
+    record(bytes=bytes, retries=response.get("ResponseMetadata", {}).get("RetryAttempts", 0))
@@ -1,12 +1,9 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-from boto3.dynamodb.conditions import Key
 from dynamodb_json import json_util as ddb_json
 
-from . import constants, s3
-
-dynamodb = boto3.resource("dynamodb")
+from . import constants, dynamo, instrumentation, s3
 
 BUCKETS = [
     "dashboard.transitmatters.org",
@@ -22,70 +19,113 @@ DISTRIBUTIONS = [
 TRIP_METRICS_KEY_JSON = "static/landing/trip_metrics.json"
 RIDERSHIP_KEY_JSON = "static/landing/ridership.json"
 
+# Every landing query and upload is independent, so they all run at once.
+THREAD_COUNT = 10
 
-def query_landing_trip_metrics_data(line: str):
-    table = dynamodb.Table("DeliveredTripMetricsWeekly")
-    response = table.query(
-        KeyConditionExpression=Key("line").eq(line)
-        & Key("date").between(constants.NINETY_DAYS_AGO_STRING, constants.ONE_WEEK_AGO_STRING)
+# CloudFront is invalidated after each upload, so this only bounds how long browsers keep a copy
+CACHE_CONTROL = "public, max-age=3600"
+
+
+def query_landing_table(table_name: str, partition_key: str, partition_value: str):
+    """Query the last ninety days (up to a week ago) of one partition of a table.
+
+    Uses the DynamoDB client rather than a Table resource, since the landing queries run on many threads at once
+    and boto3 resources aren't thread-safe.
+    """
+    response = dynamo.get_resource().meta.client.query(
+        TableName=table_name,
+        KeyConditionExpression="#partition = :partition AND #date BETWEEN :start AND :end",
+        ExpressionAttributeNames={"#partition": partition_key, "#date": "date"},
+        ExpressionAttributeValues={
+            ":partition": {"S": partition_value},
+            ":start": {"S": constants.ninety_days_ago_string()},
+            ":end": {"S": constants.one_week_ago_string()},
+        },
     )
     return ddb_json.loads(response["Items"])
 
 
-def get_trip_metrics_data():
-    trip_metrics_object = {}
-    for line in constants.LINES:
-        data = query_landing_trip_metrics_data(line)
-        trip_metrics_object[line] = data
-    return trip_metrics_object
+def query_landing_trip_metrics_data(line: str):
+    return query_landing_table("DeliveredTripMetricsWeekly", "line", line)
 
 
-def get_ridership_data():
-    ridership_object = {}
-    for line in constants.LINES:
-        data = query_landing_ridership_data(constants.RIDERSHIP_KEYS[line])
-        ridership_object[line] = data
+def run_query_plan(plan):
+    """Run a {name: (query_fn, arg)} plan concurrently and return {name: result}."""
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        futures = {name: executor.submit(query_fn, arg) for name, (query_fn, arg) in plan.items()}
+        return {name: future.result() for name, future in futures.items()}
 
-    # get data for commuter rail (treated as one line)
-    ridership_object["line-commuter-rail"] = [None] * 11
-    for line in constants.COMMUTER_RAIL_LINES:
-        data = query_landing_ridership_data(constants.commuter_rail_ridership_key(line))
-        for index, week in enumerate(data):
-            if ridership_object["line-commuter-rail"][index] is None:
-                ridership_object["line-commuter-rail"][index] = week
+
+@instrumentation.instrumented()
+def get_trip_metrics_data():
+    plan = {line: (query_landing_trip_metrics_data, line) for line in constants.LINES}
+    return run_query_plan(plan)
+
+
+def merge_commuter_rail_weeks(ridership_by_line):
+    """Sum commuter rail ridership by week across lines (treated as one line), sorted by date."""
+    weeks = {}
+    for data in ridership_by_line:
+        for week in data:
+            if week["date"] not in weeks:
+                weeks[week["date"]] = week
                 continue
-            else:
-                data = {
-                    "lineId": "line-commuter-rail",
-                    "count": ridership_object["line-commuter-rail"][index]["count"] + week["count"],
-                    "timestamp": week["timestamp"],
-                    "date": week["date"],
-                }
-                ridership_object["line-commuter-rail"][index] = data
-    # filter out None values
-    ridership_object["line-commuter-rail"] = [x for x in ridership_object["line-commuter-rail"] if x is not None]
+            weeks[week["date"]] = {
+                "lineId": "line-commuter-rail",
+                "count": weeks[week["date"]]["count"] + week["count"],
+                "timestamp": week["timestamp"],
+                "date": week["date"],
+            }
+    return [weeks[date] for date in sorted(weeks)]
+
 
+@instrumentation.instrumented()
+def get_ridership_data():
+    plan = {line: (query_landing_ridership_data, constants.RIDERSHIP_KEYS[line]) for line in constants.LINES}
+    plan.update(
+        {
+            line: (query_landing_ridership_data, constants.commuter_rail_ridership_key(line))
+            for line in constants.COMMUTER_RAIL_LINES
+        }
+    )
     # Add aggregate bus and ferry ridership
-    ridership_object["line-bus"] = query_landing_ridership_data("line-bus")
-    ridership_object["line-ferry"] = query_landing_ridership_data("line-ferry")
+    plan["line-bus"] = (query_landing_ridership_data, "line-bus")
+    plan["line-ferry"] = (query_landing_ridership_data, "line-ferry")
+    results = run_query_plan(plan)
+
+    ridership_object = {line: results[line] for line in constants.LINES}
+    # get data for commuter rail (treated as one line)
+    ridership_object["line-commuter-rail"] = merge_commuter_rail_weeks(
+        results[line] for line in constants.COMMUTER_RAIL_LINES
+    )
+    ridership_object["line-bus"] = results["line-bus"]
+    ridership_object["line-ferry"] = results["line-ferry"]
 
     return ridership_object
 
 
 def query_landing_ridership_data(line: str):
-    table = dynamodb.Table("Ridership")
-    response = table.query(
-        KeyConditionExpression=Key("lineId").eq(line)
-        & Key("date").between(constants.NINETY_DAYS_AGO_STRING, constants.ONE_WEEK_AGO_STRING)
-    )
-    return ddb_json.loads(response["Items"])
+    return query_landing_table("Ridership", "lineId", line)
 
 
+@instrumentation.instrumented()
 def upload_to_s3(trip_metrics, ridership):
-    for bucket in BUCKETS:
-        print(f"Uploading to {bucket}")
-        s3.upload(bucket, RIDERSHIP_KEY_JSON, ridership, compress=False)
-        s3.upload(bucket, TRIP_METRICS_KEY_JSON, trip_metrics, compress=False)
+    """Upload gzip-encoded JSON to the first bucket, then copy it server-side to the others."""
+    [source_bucket, *copy_buckets] = BUCKETS
+    uploads = [(RIDERSHIP_KEY_JSON, ridership), (TRIP_METRICS_KEY_JSON, trip_metrics)]
+    print(f"Uploading to {', '.join(BUCKETS)}")
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        futures = [
+            executor.submit(s3.upload_gzip, source_bucket, key, body.encode("utf8"), cache_control=CACHE_CONTROL)
+            for key, body in uploads
+        ]
+        for future in futures:
+            future.result()
+        futures = [
+            executor.submit(s3.copy, source_bucket, key, bucket, key) for bucket in copy_buckets for key, _ in uploads
+        ]
+        for future in futures:
+            future.result()
 
 
 def clear_cache():
@@ -95,7 +135,7 @@ def clear_cache():
 
 if __name__ == "__main__":
     print(
-        f"Uploading ridership and trip metric data for landing page from {constants.NINETY_DAYS_AGO_STRING} to {constants.ONE_WEEK_AGO_STRING}"
+        f"Uploading ridership and trip metric data for landing page from {constants.ninety_days_ago_string()} to {constants.one_week_ago_string()}"
     )
     trip_metrics_data = get_trip_metrics_data()
     ridership_data = get_ridership_data()
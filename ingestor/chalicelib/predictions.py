@@ -1,5 +1,7 @@
 import csv
+import hashlib
 import io
+import json
 from dataclasses import dataclass
 from datetime import date, datetime
 from typing import Dict, Iterator, List, Tuple, Union
@@ -7,8 +9,14 @@ from typing import Dict, Iterator, List, Tuple, Union
 import boto3
 import requests
 
+from chalicelib import instrumentation, s3
+
 CSV_URL = "https://massdot.maps.arcgis.com/sharing/rest/content/items/155ab68df00145cabddfb90377201b0e/data"
 
+# Fingerprints of the (week, route) buckets already in TimePredictions, so unchanged buckets aren't rewritten.
+MANIFEST_BUCKET = "tm-mbta-performance"
+MANIFEST_KEY = "TimePredictions/manifest.json.gz"
+
 
 EntryKey = Tuple[date, str]
 
@@ -67,27 +75,44 @@ def parse_prediction_row_to_entry(row: Dict[str, str]) -> Union[None, Prediction
 
 
 def load_prediction_entries() -> Iterator[PredictionAccuracyEntry]:
-    req = requests.get(CSV_URL)
+    with requests.get(CSV_URL, stream=True) as req:
+        req.raise_for_status()
+        req.raw.decode_content = True
+        # Weirdly the csv starts with 3 strange chars (a UTF-8 BOM), which utf-8-sig drops
+        rows = csv.DictReader(io.TextIOWrapper(req.raw, encoding="utf-8-sig", newline=""), delimiter=",")
+
+        for row in rows:
+            entry = parse_prediction_row_to_entry(row)
+            if entry:
+                yield entry
 
-    # Weirdly the csv starts with 3 strange chars
-    rows = csv.DictReader(io.StringIO(req.text), delimiter=",")
 
-    for row in rows:
-        entry = parse_prediction_row_to_entry(row)
-        if entry:
-            yield entry
+def prediction_hash(prediction: List[dict]) -> str:
+    return hashlib.sha1(json.dumps(prediction, sort_keys=True).encode("utf8")).hexdigest()
 
 
-def update_predictions():
+@instrumentation.instrumented()
+def update_predictions(force: bool = False):
+    """Write (week, route) prediction accuracy buckets to Dynamo, skipping buckets unchanged since the last run."""
+    manifest = {} if force else s3.download_manifest(MANIFEST_BUCKET, MANIFEST_KEY, {})
     entries = load_prediction_entries()
     buckets = bucket_entries_by_key(entries)
     dynamodb = boto3.resource("dynamodb")
     TimePredictions = dynamodb.Table("TimePredictions")
+    skipped = 0
     with TimePredictions.batch_writer() as batch:
         for (weekly, route_id), entries in buckets.items():
             prediction = [entry.to_json() for entry in entries]
+            bucket_key = f"{route_id}|{weekly.isoformat()}"
+            bucket_hash = prediction_hash(prediction)
+            if manifest.get(bucket_key) == bucket_hash:
+                skipped += 1
+                continue
             batch.put_item(Item={"routeId": route_id, "week": weekly.isoformat(), "prediction": prediction})
+            manifest[bucket_key] = bucket_hash
+    print(f"Wrote {len(buckets) - skipped} prediction buckets, skipped {skipped} unchanged")
+    s3.upload_manifest(MANIFEST_BUCKET, MANIFEST_KEY, manifest)
 
 
 if __name__ == "__main__":
-    update_predictions()
+    update_predictions(force=True)
@@ -1,6 +1,7 @@
-from tempfile import NamedTemporaryFile
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 import requests
+from .download import DownloadCache, DownloadResult, download_to_cache
 from .sharepoint import SharepointConnection
 from .config import (
     CR_UPDATE_CACHE_URL,
@@ -39,6 +40,61 @@ def ride_update_cache():
     requests.get(THE_RIDE_UPDATE_CACHE_URL)
 
 
+def download_sharepoint_source(source: str, bus_data: bool, cache: DownloadCache) -> DownloadResult:
+    """Find the latest subway or bus file on SharePoint and download it.
+
+    Args:
+        source: Name of the download source.
+        bus_data: Whether to fetch bus data (True) or subway data (False).
+        cache: Cache holding previous downloads and their validators.
+
+    Returns:
+        DownloadResult for the source.
+    """
+    sharepoint = SharepointConnection()
+    file = sharepoint.find_sharepoint_file(bus_data=bus_data)
+    if file is None:
+        return DownloadResult(source, None)
+    return download_to_cache(sharepoint.download_url(file["url"]), source, cache, session=sharepoint.session)
+
+
+def download_ridership_sources(cache: Optional[DownloadCache] = None) -> Dict[str, DownloadResult]:
+    """Download all five ridership sources concurrently.
+
+    Each source streams to disk, and sends ETag/Last-Modified validators from a previous download so an
+    unchanged file isn't transferred again. The ArcGIS Hub cache refreshes are all requested up front, alongside
+    the SharePoint downloads, and the ArcGIS downloads start once every refresh has returned. The whole stage takes
+    as long as the slowest refresh plus the slowest download.
+
+    Args:
+        cache: Cache holding previous downloads and their validators. Defaults to a directory in /tmp.
+
+    Returns:
+        Mapping of source name (subway, bus, cr, ferry, ride) to its DownloadResult.
+    """
+    cache = cache or DownloadCache()
+    update_caches = [cr_update_cache, ferry_update_cache, ride_update_cache]
+    arcgis_downloads = {
+        "cr": (CR_RIDERSHIP_ARCGIS_URL, 15),
+        "ferry": (FERRY_RIDERSHIP_ARCGIS_URL, None),
+        "ride": (THE_RIDE_RIDERSHIP_ARCGIS_URL, None),
+    }
+    with ThreadPoolExecutor(max_workers=len(update_caches) + 2) as executor:
+        futures = {
+            "subway": executor.submit(download_sharepoint_source, "subway", False, cache),
+            "bus": executor.submit(download_sharepoint_source, "bus", True, cache),
+        }
+        for future in [executor.submit(update_cache) for update_cache in update_caches]:
+            future.result()
+        for source, (url, timeout) in arcgis_downloads.items():
+            futures[source] = executor.submit(download_to_cache, url, source, cache, timeout=timeout)
+        results = {source: futures[source].result() for source in ["subway", "bus", "cr", "ferry", "ride"]}
+
+    for result in results.values():
+        print(result.describe())
+    return results
+
+
 def download_latest_ridership_files() -> Tuple[str | None, str | None, str | None, str | None, str | None]:
     """Download the latest ridership files for all transit modes.
 
@@ -49,21 +105,5 @@ def download_latest_ridership_files() -> Tuple[str | None, str | None, str | Non
         Tuple of file paths (subway, bus, commuter rail, ferry, The RIDE),
         where each element may be None if the download failed.
     """
-    sharepoint = SharepointConnection()
-
-    cr_tmp_path = NamedTemporaryFile().name
-    ferry_tmp_path = NamedTemporaryFile().name
-    ride_tmp_path = NamedTemporaryFile().name
-    subway_tmp_path = sharepoint.fetch_sharepoint_file(bus_data=False)
-    bus_tmp_path = sharepoint.fetch_sharepoint_file(bus_data=True)
-
-    with open(cr_tmp_path, "wb") as file:
-        req = requests.get(CR_RIDERSHIP_ARCGIS_URL, timeout=15)
-        file.write(req.content)
-    with open(ferry_tmp_path, "wb") as file:
-        req = requests.get(FERRY_RIDERSHIP_ARCGIS_URL)
-        file.write(req.content)
-    with open(ride_tmp_path, "wb") as file:
-        req = requests.get(THE_RIDE_RIDERSHIP_ARCGIS_URL)
-        file.write(req.content)
-    return subway_tmp_path, bus_tmp_path, cr_tmp_path, ferry_tmp_path, ride_tmp_path
+    results = download_ridership_sources()
+    return tuple(results[source].path for source in ["subway", "bus", "cr", "ferry", "ride"])
@@ -1,4 +1,6 @@
 import re
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
 
 RIDERSHIP_BUS_XLSX_REGEX = re.compile(r"Weekly_Bus_Ridership_by_Route_(\d{4})\.(\d{1,2})\.(\d{1,2})", re.I)
 
@@ -15,3 +17,61 @@ FERRY_RIDERSHIP_ARCGIS_URL = "https://opendata.arcgis.com/api/v3/datasets/ae2164
 THE_RIDE_UPDATE_CACHE_URL = "https://hub.arcgis.com/api/download/v1/items/e93e4e4820ca4719b3c4134ae0865053/csv?redirect=false&layers=0&updateCache=true"
 
 THE_RIDE_RIDERSHIP_ARCGIS_URL = "https://opendata.arcgis.com/api/v3/datasets/e93e4e4820ca4719b3c4134ae0865053_0/downloads/data?format=csv&spatialRefId=4326&where=1%3D1"
+
+
+@dataclass(frozen=True)
+class RidershipCsvSchema:
+    """Columns, dtypes and date parsing for one ridership CSV source.
+
+    Only these columns are read, with fixed dtypes, so pandas doesn't infer object columns for
+    the (many) fields we don't use.
+    """
+
+    date_key: str
+    count_key: str
+    route_key: Optional[str] = None
+    # None lets pandas infer one format from the first value; "mixed" parses each value separately
+    date_format: Optional[str] = None
+    # Unparseable dates become NaT (and are dropped) instead of raising
+    coerce_dates: bool = False
+
+    @property
+    def usecols(self) -> List[str]:
+        return [key for key in (self.date_key, self.route_key, self.count_key) if key]
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        dtypes = {self.count_key: "float64"}
+        if self.route_key:
+            dtypes[self.route_key] = "str"
+        return dtypes
+
+    def weekly(self) -> "RidershipCsvSchema":
+        """Schema of the weekly totals produced by pre_process_csv for this source."""
+        return replace(self, route_key=self.route_key or "Route", date_format=None, coerce_dates=False)
+
+
+RIDERSHIP_CSV_SCHEMAS = {
+    "subway": RidershipCsvSchema(date_key="servicedate", route_key="route_or_line", count_key="validations"),
+    "cr": RidershipCsvSchema(date_key="servicedate", route_key="line", count_key="estimated_boardings"),
+    "ferry": RidershipCsvSchema(
+        date_key="actual_departure",
+        route_key="route_id",
+        count_key="pax_on",
+        date_format="mixed",
+        coerce_dates=True,
+    ),
+    "ride": RidershipCsvSchema(
+        date_key="Date",
+        count_key="Completed_Trips",
+        date_format="mixed",
+        coerce_dates=True,
+    ),
+}
+
+# Columns of the "Weekly by Route" bus sheet, in the current (first three) and older layouts
+BUS_SHEET_COLUMNS = ["WeekStartDay", "Route", "TotalRiders", "route", "date", "count"]
+
+# CSVs bigger than this are read in chunks, parsing dates as each chunk arrives
+CHUNKED_READ_THRESHOLD_BYTES = 256 * 1024 * 1024
+CHUNKED_READ_ROWS = 500_000
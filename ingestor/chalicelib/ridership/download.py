@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from tempfile import gettempdir
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# In Lambda this lives in /tmp, so cached files only survive in warm containers (and across local runs).
+DEFAULT_CACHE_DIR = os.path.join(gettempdir(), "ridership-downloads")
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class DownloadResult:
+    source: str
+    path: Optional[str]
+    bytes: int = 0
+    duration: float = 0.0
+    not_modified: bool = False
+
+    def describe(self) -> str:
+        if self.path is None:
+            status = "failed"
+        elif self.not_modified:
+            status = "not modified, using cached copy"
+        else:
+            status = f"{self.bytes:,} bytes"
+        return f"{self.source}: {status} in {self.duration:.1f}s"
+
+
+class DownloadCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+        """Keep the last download of each source on disk with its ETag/Last-Modified validators.
+
+        Args:
+            cache_dir: Directory to keep downloaded files and validators in.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_path(self, source: str) -> str:
+        return os.path.join(self.cache_dir, source)
+
+    def _validators_path(self, source: str) -> str:
+        return os.path.join(self.cache_dir, f"{source}.validators.json")
+
+    def conditional_headers(self, source: str, url: str) -> dict:
+        """Build If-None-Match/If-Modified-Since headers for a source, if a cached copy of the same URL exists.
+
+        Args:
+            source: Name of the download source.
+            url: URL about to be requested.
+
+        Returns:
+            Dict of request headers, empty if nothing usable is cached.
+        """
+        if not os.path.exists(self.file_path(source)) or not os.path.exists(self._validators_path(source)):
+            return {}
+        with open(self._validators_path(source)) as f:
+            validators = json.load(f)
+        if validators.get("url") != url:
+            return {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def save_validators(self, source: str, url: str, response: requests.Response) -> None:
+        validators = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        with open(self._validators_path(source), "w") as f:
+            json.dump(validators, f)
+
+
+def download_to_cache(
+    url: str,
+    source: str,
+    cache: DownloadCache,
+    session: Optional[requests.Session] = None,
+    timeout: Optional[float] = None,
+) -> DownloadResult:
+    """Stream a URL to the source's cache file in chunks, skipping the body if the server says it's unchanged.
+
+    Args:
+        url: URL to download.
+        source: Name of the download source, used as the cache file name.
+        cache: Cache holding previous downloads and their validators.
+        session: Optional session to make the request with.
+        timeout: Optional request timeout in seconds.
+
+    Returns:
+        DownloadResult with the local path (None on failure), bytes written and duration.
+    """
+    start = time.monotonic()
+    path = cache.file_path(source)
+    headers = cache.conditional_headers(source, url)
+    with (session or requests).get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return DownloadResult(source, path, duration=time.monotonic() - start, not_modified=True)
+        if response.status_code != 200:
+            logger.error(f"Error downloading {source}: Status code {response.status_code}")
+            return DownloadResult(source, None, duration=time.monotonic() - start)
+
+        written = 0
+        partial_path = f"{path}.part"
+        with open(partial_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(partial_path, path)
+        cache.save_validators(source, url, response)
+    return DownloadResult(source, path, bytes=written, duration=time.monotonic() - start)
@@ -1,28 +1,67 @@
-import boto3
-from typing import Dict, List
 from datetime import datetime
+from typing import Dict, List
+
+import boto3
+
+from .. import instrumentation, s3
 
 DYNAMO_TABLE_NAME = "Ridership"
 
+# Counts last written to the Ridership table, as {line_id: {date: count}}, so unchanged items are skipped
+SNAPSHOT_BUCKET = "tm-mbta-performance"
+SNAPSHOT_KEY = "Ridership/snapshot.json.gz"
 
-def ingest_ridership_to_dynamo(entries_by_line_id: Dict[str, List[Dict]]):
-    """Batch write ridership entries to the DynamoDB Ridership table.
+
+def get_changed_entries(
+    entries_by_line_id: Dict[str, List[Dict]],
+    snapshot: Dict[str, Dict[str, int]],
+) -> Dict[str, List[Dict]]:
+    """Filter entries down to those whose (lineId, date) is new or has a different count than in the snapshot."""
+    changed_by_line_id = {}
+    for line_id, entries in entries_by_line_id.items():
+        written_counts = snapshot.get(line_id, {})
+        changed = [entry for entry in entries if written_counts.get(entry["date"]) != int(entry["count"])]
+        if changed:
+            changed_by_line_id[line_id] = changed
+    return changed_by_line_id
+
+
+def ingest_ridership_to_dynamo(entries_by_line_id: Dict[str, List[Dict]], force: bool = False):
+    """Batch write new or changed ridership entries to the DynamoDB Ridership table.
+
+    Entries are compared against the snapshot of what was last written, and only new or changed
+    (lineId, date) items are written, unless force is set.
 
     Args:
         entries_by_line_id: Mapping of line IDs to lists of ridership entry dicts,
             each containing 'date' (YYYY-MM-DD) and 'count' keys.
+        force: Write every entry, and rebuild the snapshot from scratch.
     """
+    snapshot = {} if force else s3.download_manifest(SNAPSHOT_BUCKET, SNAPSHOT_KEY, {})
+    changed_by_line_id = get_changed_entries(entries_by_line_id, snapshot)
+    total = sum(len(entries) for entries in entries_by_line_id.values())
+    changed = sum(len(entries) for entries in changed_by_line_id.values())
+    print(f"Writing {changed} of {total} ridership entries across {len(changed_by_line_id)} lines")
+
     dynamodb = boto3.resource("dynamodb")
     Ridership = dynamodb.Table(DYNAMO_TABLE_NAME)
-    with Ridership.batch_writer() as batch:
-        for line_id, entries in entries_by_line_id.items():
+    with (
+        instrumentation.stage("dynamo.batch_write", table=DYNAMO_TABLE_NAME) as stage,
+        Ridership.batch_writer() as batch,
+    ):
+        stage.record(items=changed)
+        for line_id, entries in changed_by_line_id.items():
+            written_counts = snapshot.setdefault(line_id, {})
             for entry in entries:
-                dt = datetime.strptime(entry["date"], "%Y-%m-%d")
+                dt = datetime.fromisoformat(entry["date"])
+                count = int(entry["count"])
                 batch.put_item(
                     Item={
                         "lineId": line_id,
-                        "count": int(entry["count"]),
+                        "count": count,
                         "date": entry["date"],
                         "timestamp": int(dt.timestamp()),
                     }
                 )
+                written_counts[entry["date"]] = count
+    s3.upload_manifest(SNAPSHOT_BUCKET, SNAPSHOT_KEY, snapshot)
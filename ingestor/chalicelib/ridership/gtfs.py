@@ -1,25 +1,17 @@
-import boto3
 from typing import Dict
-from tempfile import TemporaryDirectory
-from mbta_gtfs_sqlite import MbtaGtfsArchive
+
 from mbta_gtfs_sqlite.models import Route
 
+from ..gtfs.feed_cache import get_latest_feed_index
 from ..gtfs.utils import bucket_by
 
 
 def get_routes_by_line_id() -> Dict[str, Route]:
-    """Fetch GTFS route data from S3 and group routes by their line ID.
+    """Group the latest GTFS feed's routes by their line ID.
+
+    Routes are read from the feed's index, not its SQLite database.
 
     Returns:
         Mapping of line IDs to lists of Route objects from the latest GTFS feed.
     """
-    s3 = boto3.resource("s3")
-    archive = MbtaGtfsArchive(
-        local_archive_path=TemporaryDirectory().name,
-        s3_bucket=s3.Bucket("tm-gtfs"),
-    )
-    feed = archive.get_latest_feed()
-    feed.use_compact_only()
-    feed.download_or_build()
-    session = feed.create_sqlite_session(compact=True)
-    return bucket_by(session.query(Route).all(), lambda r: r.line_id)
+    return bucket_by(get_latest_feed_index().routes, lambda r: r.line_id)
@@ -1,23 +1,59 @@
-from typing import Dict
+from typing import Dict, List
 
+import numpy as np
+import pandas as pd
 from mbta_gtfs_sqlite.models import Route
 
-from ..gtfs.utils import bucket_by
-from .arcgis import cr_update_cache, download_latest_ridership_files, ferry_update_cache, ride_update_cache
+from .. import instrumentation
+from .arcgis import download_latest_ridership_files
 from .dynamo import ingest_ridership_to_dynamo
 from .gtfs import get_routes_by_line_id
 from .process import get_ridership_by_route_id
 
 
+# Route IDs (after format_subway_data's rewrites) that have their own subway line entries
+SUBWAY_ROUTE_IDS = ("Red", "Orange", "Blue", "Green", "Mattapan")
+
+
+def _get_line_ids_by_route_id(
+    ridership_by_route_id: Dict[str, List[Dict]],
+    routes_by_line_id: Dict[str, List[Route]],
+) -> Dict[str, List[str]]:
+    """Map every route_id to the line(s) its ridership counts towards.
+
+    A route can count towards more than one line, e.g. a bus route towards its own GTFS line and
+    towards "line-bus". RIDE isn't mapped, since it gets its own line and isn't summed.
+    """
+    line_ids_by_route_id = {}
+    for line_id, routes in routes_by_line_id.items():
+        for route in routes:
+            line_ids_by_route_id.setdefault(route.route_id, []).append(line_id)
+    if "line-Green" in routes_by_line_id:
+        # Fake this for the green line which is not actually split into branches in the ridership data
+        line_ids_by_route_id.setdefault("Green", []).append("line-Green")
+    for route_id in ridership_by_route_id:
+        if route_id == "RIDE":
+            continue
+        if route_id.startswith("Boat-"):
+            # Aggregate ferry routes (all "Boat-*" route_ids) into "line-ferry"
+            line_ids_by_route_id.setdefault(route_id, []).append("line-ferry")
+        elif not (route_id in SUBWAY_ROUTE_IDS or route_id.startswith("CR-")):
+            # Everything not accounted for by subway/CR/ferry/RIDE is a bus route.
+            # NOTE: GTFS line_ids aren't used for this because GTFS includes bus routes too.
+            line_ids_by_route_id.setdefault(route_id, []).append("line-bus")
+    return line_ids_by_route_id
+
+
 def get_ridership_by_line_id(
-    ridership_by_route_id: Dict[str, Dict],
-    routes_by_line_id: Dict[str, Route],
+    ridership_by_route_id: Dict[str, List[Dict]],
+    routes_by_line_id: Dict[str, List[Route]],
 ):
     """Aggregate ridership data from route-level to line-level.
 
     Sums ridership counts across all routes belonging to each line, grouping
     by date. Handles Green Line branch aggregation and adds The RIDE as a
-    separate line entry.
+    separate line entry. Every route's entries are flattened into one long
+    frame of (line, date, count) rows, and all lines are summed with one groupby.
 
     Args:
         ridership_by_route_id: Mapping of route IDs to lists of ridership
@@ -28,81 +64,71 @@ def get_ridership_by_line_id(
         Mapping of line IDs to sorted lists of ridership entries with
         summed counts per date.
     """
-    by_line_id = {}
-    # Track route_ids that are accounted for by subway/CR/ferry/RIDE
-    # so that "line-bus" captures everything else.
-    # NOTE: We don't consume from the GTFS line_id loop because GTFS includes
-    # bus routes too — we only want to exclude subway, CR, ferry, and RIDE.
-    consumed_route_ids = set()
-
-    for line_id, routes in routes_by_line_id.items():
-        route_entries = [entry for route in routes for entry in ridership_by_route_id.get(route.route_id, [])]
-        if line_id == "line-Green":
-            # Fake this for the green line which is not actually split into branches in the ridership data
-            route_entries += ridership_by_route_id.get("Green", [])
-        entries_by_date = bucket_by(route_entries, lambda entry: entry["date"])
-        summed_entries = [
-            {"date": date, "count": sum(entry["count"] for entry in entries)}
-            for date, entries in entries_by_date.items()
-        ]
-        by_line_id[line_id] = sorted(summed_entries, key=lambda entry: entry["date"])
+    line_ids_by_route_id = _get_line_ids_by_route_id(ridership_by_route_id, routes_by_line_id)
+    # Lines are stored as integer codes into line_ids, one run of rows per (route, line) pair
+    line_ids, run_lines, run_lengths, dates, counts = [], [], [], [], []
+    for route_id, entries in ridership_by_route_id.items():
+        for line_id in line_ids_by_route_id.get(route_id, []):
+            if line_id not in line_ids:
+                line_ids.append(line_id)
+            run_lines.append(line_ids.index(line_id))
+            run_lengths.append(len(entries))
+            dates.extend(entry["date"] for entry in entries)
+            counts.extend(entry["count"] for entry in entries)
+    date_codes, unique_dates = pd.factorize(np.array(dates, dtype=object), sort=True)
+    frame = pd.DataFrame(
+        {
+            "line": np.repeat(np.array(run_lines, dtype="int64"), run_lengths),
+            "date": date_codes,
+            "count": np.array(counts, dtype="float64"),
+            "is_int": [type(count) is int for count in counts],
+        }
+    )
+    sums = (
+        frame.groupby(["line", "date"], sort=True).agg(count=("count", "sum"), is_int=("is_int", "all")).reset_index()
+    )
+
+    summed_by_line_id = {}
+    for line, date, count, is_int in zip(
+        sums["line"].tolist(),
+        unique_dates[sums["date"].to_numpy()].tolist(),
+        sums["count"].tolist(),
+        sums["is_int"].tolist(),
+    ):
+        # Sums of ints are exact as floats, so they're emitted as ints again like sum() would
+        summed_by_line_id.setdefault(line_ids[line], []).append(
+            {"date": date, "count": int(count) if is_int else count}
+        )
 
+    by_line_id = {line_id: summed_by_line_id.get(line_id, []) for line_id in routes_by_line_id}
     # Add RIDE data as a separate line since it doesn't have traditional line_id
     if "RIDE" in ridership_by_route_id:
         by_line_id["line-RIDE"] = sorted(ridership_by_route_id["RIDE"], key=lambda entry: entry["date"])
-        consumed_route_ids.add("RIDE")
-
-    # Aggregate ferry routes (all "Boat-*" route_ids) into "line-ferry"
-    ferry_entries = []
-    for route_id, entries in ridership_by_route_id.items():
-        if route_id.startswith("Boat-"):
-            ferry_entries.extend(entries)
-            consumed_route_ids.add(route_id)
-    if ferry_entries:
-        entries_by_date = bucket_by(ferry_entries, lambda entry: entry["date"])
-        by_line_id["line-ferry"] = sorted(
-            [{"date": date, "count": sum(e["count"] for e in entries)} for date, entries in entries_by_date.items()],
-            key=lambda entry: entry["date"],
-        )
-
-    # Mark subway and CR route_ids as consumed (these have their own line entries above)
-    # Subway route_ids from format_subway_data use unofficial_labels_map to rewrite names
-    # (e.g. "Red Line" -> "Red", "SL1" -> "741") and include Mattapan.
-    # CR route_ids are prefixed with "CR-".
-    for route_id in ridership_by_route_id:
-        if route_id in ("Red", "Orange", "Blue", "Green", "Mattapan") or route_id.startswith("CR-"):
-            consumed_route_ids.add(route_id)
-
-    # Aggregate all remaining unconsumed routes into "line-bus"
-    bus_entries = []
-    for route_id, entries in ridership_by_route_id.items():
-        if route_id not in consumed_route_ids:
-            bus_entries.extend(entries)
-    if bus_entries:
-        entries_by_date = bucket_by(bus_entries, lambda entry: entry["date"])
-        by_line_id["line-bus"] = sorted(
-            [{"date": date, "count": sum(e["count"] for e in entries)} for date, entries in entries_by_date.items()],
-            key=lambda entry: entry["date"],
-        )
-
+    for line_id in ("line-ferry", "line-bus"):
+        if line_id in summed_by_line_id:
+            by_line_id[line_id] = summed_by_line_id[line_id]
     return by_line_id
 
 
-def ingest_ridership_data():
+@instrumentation.instrumented()
+def ingest_ridership_data(force: bool = False):
     """Run the full ridership ingestion pipeline.
 
     Downloads the latest ridership files for all transit modes, processes
-    and aggregates them by line ID, and writes the results to DynamoDB.
+    and aggregates them by line ID, and writes new or changed entries to DynamoDB.
+
+    Args:
+        force: Write every entry to DynamoDB, not just the ones that changed since the last run.
     """
     routes = get_routes_by_line_id()
-    cr_update_cache()
-    ferry_update_cache()
-    ride_update_cache()
-    subway_file, bus_file, cr_file, ferry_file, ride_file = download_latest_ridership_files()
-    ridership_by_route_id = get_ridership_by_route_id(subway_file, bus_file, cr_file, ferry_file, ride_file)
-    ridership_by_line_id = get_ridership_by_line_id(ridership_by_route_id, routes)
-    ingest_ridership_to_dynamo(ridership_by_line_id)
+    with instrumentation.stage("ridership.download"):
+        subway_file, bus_file, cr_file, ferry_file, ride_file = download_latest_ridership_files()
+    with instrumentation.stage("ridership.process") as stage:
+        ridership_by_route_id = get_ridership_by_route_id(subway_file, bus_file, cr_file, ferry_file, ride_file)
+        ridership_by_line_id = get_ridership_by_line_id(ridership_by_route_id, routes)
+        stage.record(items=sum(len(entries) for entries in ridership_by_line_id.values()))
+    ingest_ridership_to_dynamo(ridership_by_line_id, force=force)
 
 
 if __name__ == "__main__":
-    ingest_ridership_data()
+    ingest_ridership_data(force=True)
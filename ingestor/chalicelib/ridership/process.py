@@ -1,10 +1,17 @@
-from tempfile import NamedTemporaryFile
-from typing import Dict, Union
+import os
+from typing import IO, Callable, Dict, List, Union
 
-import numpy as np
 import pandas as pd
 from pandas.tseries.holiday import USFederalHolidayCalendar
 
+from .config import (
+    BUS_SHEET_COLUMNS,
+    CHUNKED_READ_ROWS,
+    CHUNKED_READ_THRESHOLD_BYTES,
+    RIDERSHIP_CSV_SCHEMAS,
+    RidershipCsvSchema,
+)
+
 unofficial_labels_map = {
     "SL1": "741",
     "SL2": "742",
@@ -56,181 +63,214 @@ unofficial_ferry_labels_map = {
     "Winthrop/Quincy Ferry": "Boat-F8",
 }
 
+# A ridership input: a path to a CSV, an open CSV file, or a frame that has already been read
+RidershipSource = Union[str, os.PathLike, IO, pd.DataFrame]
+
+
+def _parse_dates(df: pd.DataFrame, schema: RidershipCsvSchema) -> pd.DataFrame:
+    df[schema.date_key] = pd.to_datetime(
+        df[schema.date_key],
+        format=schema.date_format,
+        errors="coerce" if schema.coerce_dates else "raise",
+    )
+    return df
+
+
+def _should_read_in_chunks(source: RidershipSource) -> bool:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source) > CHUNKED_READ_THRESHOLD_BYTES
+    # Open files (e.g. streamed downloads) can be any size
+    return True
+
+
+def read_ridership_csv(source: RidershipSource, schema: RidershipCsvSchema) -> pd.DataFrame:
+    """Read only a source's schema columns, with fixed dtypes and parsed dates.
+
+    Files over CHUNKED_READ_THRESHOLD_BYTES, and open files, are read in chunks so that only one
+    chunk of raw date strings is in memory at a time. Frames are passed through, parsing the date
+    column only if it hasn't been already.
+
+    Args:
+        source: Path to the input CSV file, an open CSV file, or a DataFrame.
+        schema: Columns, dtypes and date parsing for the source.
+
+    Returns:
+        DataFrame with the schema's columns, the date column as datetime64.
+    """
+    if isinstance(source, pd.DataFrame):
+        df = source[schema.usecols]
+        if pd.api.types.is_datetime64_any_dtype(df[schema.date_key]):
+            return df
+        return _parse_dates(df.astype(schema.dtypes), schema)
+    read_kwargs = {"usecols": schema.usecols, "dtype": schema.dtypes}
+    if _should_read_in_chunks(source):
+        chunks = pd.read_csv(source, chunksize=CHUNKED_READ_ROWS, **read_kwargs)
+        return pd.concat((_parse_dates(chunk, schema) for chunk in chunks), ignore_index=True)
+    return _parse_dates(pd.read_csv(source, **read_kwargs), schema)
+
 
 def pre_process_csv(
-    path_to_csv_file: str,
-    date_key: str,
-    route_key: str | None,
-    count_key: str,
+    source: RidershipSource,
+    schema: RidershipCsvSchema,
     route_name: str | None = None,
-):
-    """Pre-process a CSV file by aggregating daily ridership into weekly totals.
+) -> pd.DataFrame:
+    """Pre-process daily ridership by aggregating it into weekly totals.
 
-    Reads the CSV, groups records by ISO year, week, and route, sums the count
-    values, and writes the result to a temporary CSV file.
+    Reads the source, groups records by ISO year, week, and route, and sums the
+    count values.
 
     Args:
-        path_to_csv_file: Path to the input CSV file.
-        date_key: Column name containing date values.
-        route_key: Column name containing route identifiers. If None and
-            route_name is provided, a 'Route' column is added with route_name.
-        count_key: Column name containing ridership counts.
-        route_name: Constant route name to assign when route_key is None.
+        source: Path to the input CSV file, an open CSV file, or a DataFrame.
+        schema: Columns, dtypes and date parsing for the source. If it has no
+            route_key and route_name is provided, a 'Route' column is added with route_name.
+        route_name: Constant route name to assign when the schema has no route_key.
 
     Returns:
-        Path to a temporary CSV file containing the weekly aggregated data.
+        DataFrame of weekly totals with the columns of schema.weekly(), ready to pass to
+        format_ridership_csv.
     """
-    if route_key is None and route_name is not None:
-        route_key = "Route"
-        df = pd.read_csv(path_to_csv_file, usecols=[date_key, count_key])
-        df[route_key] = route_name
-    else:
-        df = pd.read_csv(path_to_csv_file, usecols=[date_key, route_key, count_key])
+    date_key, count_key = schema.date_key, schema.count_key
+    route_key = schema.weekly().route_key
+    df = read_ridership_csv(source, schema)
+    if schema.route_key is None and route_name is not None:
+        df = df.assign(**{route_key: route_name})
 
-    df[date_key] = pd.to_datetime(df[date_key], format="mixed", errors="coerce")
     df = df.dropna(subset=[date_key])
-    df["Year"] = df[date_key].dt.year
-    df["Week"] = df[date_key].dt.isocalendar().week
-    df[date_key] = df[date_key].dt.strftime("%Y-%m-%d")
+    df = df.assign(Year=df[date_key].dt.year, Week=df[date_key].dt.isocalendar().week)
 
     grouped_df = df.groupby(["Year", "Week", route_key])[count_key].agg("sum").reset_index()
     grouped_df[date_key] = pd.to_datetime(
         grouped_df["Year"].astype(str) + grouped_df["Week"].astype(str) + "1", format="%Y%W%w"
     )
-    tmp_path = NamedTemporaryFile().name
-    grouped_df.to_csv(tmp_path, index=False)
-    return tmp_path
+    return grouped_df
 
 
-def format_ridership_csv(
-    path_to_csv_file: str,
+def weekly_peak_averages(df: pd.DataFrame, date_key: str, route_key: str, count_key: str) -> pd.DataFrame:
+    """Average a daily (or weekly) ridership frame over each route's peak days in every ISO week.
+
+    Peak days are weekdays that are not federal holidays. Each week is labelled with the date of its
+    Monday, if the data contains that Monday.
+
+    Args:
+        df: Ridership rows with the date column already parsed to datetime64.
+        date_key: Name of the date column.
+        route_key: Name of the route column.
+        count_key: Name of the count column.
+
+    Returns:
+        DataFrame with route_key, count_key and date_key ('YYYY-MM-DD', NaN for weeks without a
+        Monday) columns, one row per route and week, ordered by year and week.
+    """
+    dates = df[date_key]
+    holidays = USFederalHolidayCalendar().holidays(start=dates.min(), end=dates.max())
+    weekday = dates.dt.dayofweek
+    iso = dates.dt.isocalendar()
+    is_peak = (weekday < 5) & ~dates.dt.normalize().isin(holidays)
+
+    keyed = pd.DataFrame({"year": iso["year"], "week": iso["week"], route_key: df[route_key], count_key: df[count_key]})
+    averages = keyed[is_peak].groupby(["year", "week", route_key])[count_key].mean().round().reset_index()
+
+    is_monday = weekday == 0
+    mondays = pd.DataFrame(
+        {
+            date_key: dates[is_monday].dt.strftime("%Y-%m-%d"),
+            "week": iso["week"][is_monday],
+            "year": iso["year"][is_monday],
+        }
+    ).drop_duplicates()
+    return averages.merge(mondays, on=["week", "year"], how="left")
+
+
+def group_entries_by_route(
+    df: pd.DataFrame,
     date_key: str,
     route_key: str,
     count_key: str,
-    route_ids_map: Union[None, Dict[str, str]] = None,
-):
-    """Format a ridership CSV into a dict of weekly average peak-day counts by route.
+    route_id_for: Callable[[str], str],
+    missing_counts_as_zero: bool = False,
+) -> Dict[str, List[Dict]]:
+    """Split a ridership frame into {route_id: [{'date', 'count'}]} in a single pass.
 
-    Reads ridership data, filters to weekday non-holiday (peak) days, computes
-    weekly averages per route, and returns the results grouped by route ID.
+    Rows without a date are dropped. Rows without a count are dropped, or counted as 0 (and all
+    counts cast to int) if missing_counts_as_zero is set. Entries keep the frame's row order.
 
     Args:
-        path_to_csv_file: Path to the input CSV file.
-        date_key: Column name containing date values.
-        route_key: Column name containing route identifiers.
-        count_key: Column name containing ridership counts.
-        route_ids_map: Optional mapping from raw route names to canonical route IDs.
+        df: Frame with date, route and count columns.
+        date_key: Name of the date column.
+        route_key: Name of the route column.
+        count_key: Name of the count column.
+        route_id_for: Maps a raw route name to its route ID.
+        missing_counts_as_zero: Whether to keep rows with missing counts as 0.
 
     Returns:
         Dict mapping route IDs to lists of dicts with 'date' and 'count' keys.
     """
-    # read data, convert to datetime
-    df = pd.read_csv(path_to_csv_file)
-    df[date_key] = pd.to_datetime(df[date_key])
-
-    # add holidays
-    cal = USFederalHolidayCalendar()
-    holidays = cal.holidays(start=df[date_key].min(), end=df[date_key].max())
-
-    # mark as holiday and weekday
-    df["holiday"] = df[date_key].dt.date.astype("datetime64[ns]").isin(holidays.date)
-    df["weekday"] = df[date_key].dt.dayofweek
-
-    # define peak, mark weekdays, convert service date back
-    conditions = [(df["holiday"] == False) & (df["weekday"] < 5)]
-    choices = ["peak"]
-    df["peak"] = np.select(conditions, choices, default="offpeak")
-    df["week"] = df[date_key].dt.isocalendar().week
-    df["year"] = df[date_key].dt.isocalendar().year
-    df[date_key] = df[date_key].dt.date.astype(str)
-
-    # select date of the week
-    dates = df[df["weekday"] == 0]
-    dates = dates[[date_key, "week", "year"]].drop_duplicates()
-
-    # limit data to just peak, merge back dates
-    final = df[df["peak"] == "peak"]
+    df = df.dropna(subset=[date_key])
+    if missing_counts_as_zero:
+        counts = df[count_key].fillna(0).astype(int)
+    else:
+        df = df.dropna(subset=[count_key])
+        counts = df[count_key]
+    date_values = df[date_key].tolist()
+    count_values = counts.tolist()
+    output = {}
+    for route, positions in df.groupby(route_key, sort=False).indices.items():
+        output[route_id_for(route)] = [{"date": date_values[i], "count": count_values[i]} for i in positions]
+    return output
 
-    final = final.groupby(["year", "week", route_key])[count_key].mean().round().reset_index()
 
-    final = final.merge(dates, on=["week", "year"], how="left")
+def format_ridership_csv(
+    source: RidershipSource,
+    schema: RidershipCsvSchema,
+    route_ids_map: Union[None, Dict[str, str]] = None,
+):
+    """Format ridership data into a dict of weekly average peak-day counts by route.
 
-    # get list of routes
-    routelist = list(set(final[route_key].tolist()))
+    Reads ridership data, filters to weekday non-holiday (peak) days, computes
+    weekly averages per route, and returns the results grouped by route ID.
 
-    # create dict
-    output = {}
+    Args:
+        source: Path to the input CSV file, an open CSV file, or a DataFrame.
+        schema: Columns, dtypes and date parsing for the source.
+        route_ids_map: Optional mapping from raw route names to canonical route IDs.
 
-    # write out each set of routes to dict
-    for route in routelist:
-        for_route = final[final[route_key] == route]
-        only_date_and_count = for_route[[date_key, count_key]].dropna()
-        dictdata = only_date_and_count.rename(columns={date_key: "date", count_key: "count"}).to_dict(orient="records")
-        route_id = route_ids_map[route] if route_ids_map else route
-        output[route_id] = dictdata
-    return output
+    Returns:
+        Dict mapping route IDs to lists of dicts with 'date' and 'count' keys.
+    """
+    date_key, route_key, count_key = schema.date_key, schema.route_key, schema.count_key
+    df = read_ridership_csv(source, schema)
+    averages = weekly_peak_averages(df, date_key, route_key, count_key)
+    return group_entries_by_route(
+        averages,
+        date_key,
+        route_key,
+        count_key,
+        route_id_for=(lambda route: route_ids_map[route]) if route_ids_map else (lambda route: route),
+    )
 
 
-def format_subway_data(path_to_csv_file: str):
+def format_subway_data(path_to_csv_file: RidershipSource):
     """Format subway gated station validation data into weekly peak-day averages.
 
     Reads the subway CSV, filters to peak weekdays, computes weekly average
     validations per route/line, and maps route names to canonical IDs.
 
     Args:
-        path_to_csv_file: Path to the subway ridership CSV file.
+        path_to_csv_file: Path to the subway ridership CSV file (or an open file or DataFrame).
 
     Returns:
         Dict mapping route IDs to lists of dicts with 'date' and 'count' keys.
     """
-    # read data, convert to datetime
-    df = pd.read_csv(path_to_csv_file)
-    df["servicedate"] = pd.to_datetime(df["servicedate"])
-
-    # add holidays
-    cal = USFederalHolidayCalendar()
-    holidays = cal.holidays(start=df["servicedate"].min(), end=df["servicedate"].max())
-
-    # mark as holiday and weekday
-    df["holiday"] = df["servicedate"].dt.date.astype("datetime64[ns]").isin(holidays.date)
-    df["weekday"] = df["servicedate"].dt.dayofweek
-
-    # define peak, mark weekdays, convert service date back
-    conditions = [(df["holiday"] == False) & (df["weekday"] < 5)]  # noqa: E712
-    choices = ["peak"]
-    df["peak"] = np.select(conditions, choices, default="offpeak")
-    df["week"] = df["servicedate"].dt.isocalendar().week
-    df["year"] = df["servicedate"].dt.isocalendar().year
-    df["servicedate"] = df["servicedate"].dt.date.astype(str)
-
-    # select date of the week
-    dates = df[df["weekday"] == 0]
-    dates = dates[["servicedate", "week", "year"]].drop_duplicates()
-
-    # limit data to just peak, merge back dates
-    final = df[df["peak"] == "peak"]
-    final = final.groupby(["year", "week", "route_or_line"])["validations"].mean().round().reset_index()
-
-    final = final.merge(dates, on=["week", "year"], how="left")
-
-    # get list of bus routes
-    routelist = list(set(final["route_or_line"].tolist()))
-
-    # create dict
-    output = {}
-
-    # write out each set of routes to dict
-    for route in routelist:
-        dftemp = final[final["route_or_line"] == route].fillna(0).astype({"validations": int})
-        dictdata = (
-            dftemp[["servicedate", "validations"]]
-            .rename(columns={"servicedate": "date", "validations": "count"})
-            .to_dict(orient="records")
-        )
-        rewritten_route_id = unofficial_labels_map.get(route) or route
-        output[rewritten_route_id] = dictdata
-
-    return output
+    df = read_ridership_csv(path_to_csv_file, RIDERSHIP_CSV_SCHEMAS["subway"])
+    averages = weekly_peak_averages(df, "servicedate", "route_or_line", "validations")
+    return group_entries_by_route(
+        averages,
+        "servicedate",
+        "route_or_line",
+        "validations",
+        route_id_for=lambda route: unofficial_labels_map.get(route) or route,
+        missing_counts_as_zero=True,
+    )
 
 
 def format_bus_data(path_to_excel_file: str):
@@ -249,6 +289,7 @@ def format_bus_data(path_to_excel_file: str):
     df = pd.read_excel(
         path_to_excel_file,
         sheet_name="Weekly by Route",
+        usecols=lambda column: column in BUS_SHEET_COLUMNS,
         keep_default_na=False,
         na_values=["N/A", "999999", "NULL"],
     )
@@ -267,94 +308,70 @@ def format_bus_data(path_to_excel_file: str):
             format="mixed",
         ).dt.date.astype(str)
 
-    # get list of bus routes
-    routelist = list(set(df["route"].tolist()))
-
-    # create dict
-    output = {}
-
-    # write out each set of routes to dict
-    for route in routelist:
-        dftemp = df[df["route"] == route].fillna(0).astype({"count": int})
-        dictdata = dftemp[["date", "count"]].to_dict(orient="records")
-        rewritten_route_id = unofficial_labels_map.get(route) or route
-        output[rewritten_route_id] = dictdata
-
-    return output
+    return group_entries_by_route(
+        df,
+        "date",
+        "route",
+        "count",
+        route_id_for=lambda route: unofficial_labels_map.get(route) or route,
+        missing_counts_as_zero=True,
+    )
 
 
-def format_cr_data(path_to_ridershp_file: str):
+def format_cr_data(path_to_ridershp_file: RidershipSource):
     """Format commuter rail ridership data into weekly peak-day averages by line.
 
     Args:
-        path_to_ridershp_file: Path to the commuter rail ridership CSV file.
+        path_to_ridershp_file: Path to the commuter rail ridership CSV file (or an open file or DataFrame).
 
     Returns:
         Dict mapping CR route IDs to lists of dicts with 'date' and 'count' keys.
     """
     ridership_by_route = format_ridership_csv(
-        path_to_csv_file=path_to_ridershp_file,
-        date_key="servicedate",
-        route_key="line",
-        count_key="estimated_boardings",
+        path_to_ridershp_file,
+        schema=RIDERSHIP_CSV_SCHEMAS["cr"],
         route_ids_map=unofficial_cr_labels_map,
     )
     return ridership_by_route
 
 
-def format_ferry_data(path_to_ridership_file: str):
+def format_ferry_data(path_to_ridership_file: RidershipSource):
     """Format ferry ridership data into weekly peak-day averages by route.
 
     Pre-processes daily departure data into weekly aggregates, then formats
     into peak-day averages with canonical ferry route IDs.
 
     Args:
-        path_to_ridership_file: Path to the ferry ridership CSV file.
+        path_to_ridership_file: Path to the ferry ridership CSV file (or an open file or DataFrame).
 
     Returns:
         Dict mapping ferry route IDs to lists of dicts with 'date' and 'count' keys.
     """
-    preprocess = pre_process_csv(
-        path_to_csv_file=path_to_ridership_file,
-        date_key="actual_departure",
-        route_key="route_id",
-        count_key="pax_on",
-    )
+    schema = RIDERSHIP_CSV_SCHEMAS["ferry"]
+    weekly = pre_process_csv(path_to_ridership_file, schema=schema)
     ridership_by_route = format_ridership_csv(
-        path_to_csv_file=preprocess,
-        date_key="actual_departure",
-        route_key="route_id",
-        count_key="pax_on",
+        weekly,
+        schema=schema.weekly(),
         route_ids_map=unofficial_ferry_labels_map,
     )
     return ridership_by_route
 
 
-def format_the_ride_data(path_to_ridership_file: str):
+def format_the_ride_data(path_to_ridership_file: RidershipSource):
     """Format The RIDE paratransit ridership data into weekly peak-day averages.
 
     Pre-processes daily completed trip data into weekly aggregates, then
     formats into peak-day averages under a single 'RIDE' route.
 
     Args:
-        path_to_ridership_file: Path to The RIDE ridership CSV file.
+        path_to_ridership_file: Path to The RIDE ridership CSV file (or an open file or DataFrame).
 
     Returns:
         Dict mapping 'RIDE' to a list of dicts with 'date' and 'count' keys.
     """
-    preprocess = pre_process_csv(
-        path_to_csv_file=path_to_ridership_file,
-        date_key="Date",
-        route_key=None,
-        route_name="RIDE",
-        count_key="Completed_Trips",
-    )
-    ridership_by_route = format_ridership_csv(
-        path_to_csv_file=preprocess,
-        date_key="Date",
-        route_key="Route",
-        count_key="Completed_Trips",
-    )
+    schema = RIDERSHIP_CSV_SCHEMAS["ride"]
+    weekly = pre_process_csv(path_to_ridership_file, schema=schema, route_name="RIDE")
+    ridership_by_route = format_ridership_csv(weekly, schema=schema.weekly())
     return ridership_by_route
 
 
@@ -1,12 +1,16 @@
 import requests
+import hashlib
 import json
+import os
 import re
 import logging
 from tempfile import NamedTemporaryFile
 from urllib.parse import quote
 from datetime import date
 from re import Pattern
-from typing import List, Optional
+from typing import Dict, List, Optional
+
+from .download import CHUNK_SIZE, DEFAULT_CACHE_DIR
 
 logger = logging.getLogger(__name__)
 
@@ -16,19 +20,84 @@ SUBWAY_SHARE_URL = "https://mbta.sharepoint.com/:f:/s/PublicData/ElfNM8viGx5Out0
 BUS_SHARE_URL = "https://mbta.sharepoint.com/:f:/s/PublicData/Eh1G_O3dog9Eh_EfCqsJZ9EBb6BIgjP-ovWMwdLpwuDnjw"
 
 
+class ListingCache:
+    def __init__(self, path: str) -> None:
+        """Folder listings of one SharePoint share, persisted to a JSON file between runs.
+
+        Each folder's listing is kept with the ETag/Last-Modified validators of its page, so every folder is
+        still requested, but unchanged folders are answered with a 304 and don't have to be parsed again.
+
+        Args:
+            path: JSON file to keep the cache in.
+        """
+        self.path = path
+        self.folders: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    cached = json.load(f)
+                self.folders = cached.get("folders", {})
+            except (OSError, ValueError):
+                logger.warning(f"Ignoring unreadable SharePoint listing cache {path}")
+
+    @classmethod
+    def for_share(cls, share_url: str, cache_dir: str = DEFAULT_CACHE_DIR) -> "ListingCache":
+        """Open the cache for a share URL. Each share has its own file, so shares can be listed concurrently."""
+        os.makedirs(cache_dir, exist_ok=True)
+        share_hash = hashlib.sha1(share_url.encode("utf8")).hexdigest()[:12]
+        return cls(os.path.join(cache_dir, f"sharepoint-{share_hash}.json"))
+
+    def conditional_headers(self, folder_key: str) -> dict:
+        cached = self.folders.get(folder_key)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def get_files(self, folder_key: str) -> Optional[List[dict]]:
+        """Cached listing of a folder, if there is one."""
+        cached = self.folders.get(folder_key)
+        return cached["files"] if cached is not None else None
+
+    def store(self, folder_key: str, files: List[dict], response: requests.Response) -> None:
+        self.folders[folder_key] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "files": files,
+        }
+
+    def save(self) -> None:
+        partial_path = f"{self.path}.part"
+        with open(partial_path, "w") as f:
+            json.dump({"folders": self.folders}, f)
+        os.replace(partial_path, self.path)
+
+
 class SharepointConnection:
-    def __init__(self, user_agent: str = DEFAULT_USER_AGENT, base_url=BASE_URL, prefix="mbta") -> None:
+    def __init__(
+        self,
+        user_agent: str = DEFAULT_USER_AGENT,
+        base_url=BASE_URL,
+        prefix="mbta",
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    ) -> None:
         """Initialize a SharePoint connection with session and configuration.
 
         Args:
             user_agent: User-Agent string for HTTP requests.
             base_url: Base SharePoint URL for folder browsing.
             prefix: SharePoint tenant prefix used in download URLs.
+            cache_dir: Directory to keep folder listing caches in, or None to always list every folder.
         """
         self.session = self.setup_session(user_agent)
         self.base_url = base_url
         self.all_files = []
         self.prefix = prefix
+        self.cache_dir = cache_dir
 
     def setup_session(self, user_agent: str) -> requests.Session:
         """Create and configure an HTTP session with the given User-Agent.
@@ -43,27 +112,46 @@ class SharepointConnection:
         session.headers.update({"User-Agent": user_agent})
         return session
 
-    def get_sharepoint_folder_contents_anonymous(self, share_url):
-        """Get contents of a SharePoint folder using anonymous access via sharing link.
+    def get_listing(self, url: str, folder_key: str, listing_cache: Optional[ListingCache] = None):
+        """Get and parse a folder page, revalidating a cached listing of it if there is one.
+
+        A folder's Modified time in its parent's listing doesn't change when something deeper in it does, so
+        every folder is requested, conditionally on the validators of its cached listing.
 
         Args:
-            share_url: The SharePoint 'anyone with the link' URL.
+            url: URL of the folder page.
+            folder_key: Key of the folder in the listing cache.
+            listing_cache: Optional cache of folder listings.
 
         Returns:
-            List of dictionaries containing file information, or None on error.
+            List of file info dictionaries, or None on error.
         """
-        # Follow the sharing link
-        response = self.session.get(share_url, allow_redirects=True)
-
+        headers = listing_cache.conditional_headers(folder_key) if listing_cache is not None else {}
+        response = self.session.get(url, headers=headers, allow_redirects=True)
+        if response.status_code == 304 and listing_cache is not None:
+            return listing_cache.get_files(folder_key)
         if response.status_code != 200:
-            logger.error(f"Error accessing share URL: {response.status_code}")
+            logger.error(f"Error accessing folder {folder_key}: {response.status_code}")
             return None
 
-        html = response.text
-        files = self.parse_g_data(html)
-
+        files = self.parse_g_data(response.text)
+        if files is not None and listing_cache is not None:
+            listing_cache.store(folder_key, files, response)
         return files
 
+    def get_sharepoint_folder_contents_anonymous(self, share_url, listing_cache: Optional[ListingCache] = None):
+        """Get contents of a SharePoint folder using anonymous access via sharing link.
+
+        Args:
+            share_url: The SharePoint 'anyone with the link' URL.
+            listing_cache: Optional cache of folder listings.
+
+        Returns:
+            List of dictionaries containing file information, or None on error.
+        """
+        # Follow the sharing link
+        return self.get_listing(share_url, share_url, listing_cache)
+
     def parse_g_data(self, html: str):
         """Parse the g_listData JavaScript variable from a SharePoint HTML page.
 
@@ -77,7 +165,6 @@ class SharepointConnection:
             List of file info dictionaries, or None if parsing fails.
         """
         # Extract g_listData which contains the file list
-        # Find the start of g_listData
         start_marker = "g_listData = "
         start_pos = html.find(start_marker)
 
@@ -85,41 +172,9 @@ class SharepointConnection:
             logger.error("Could not find g_listData in page")
             return None
 
-        # Find the JSON object - look for matching braces
-        json_start = start_pos + len(start_marker)
-        brace_count = 0
-        in_string = False
-        escape_next = False
-        json_end = json_start
-
-        for i in range(json_start, len(html)):
-            char = html[i]
-
-            if escape_next:
-                escape_next = False
-                continue
-
-            if char == "\\":
-                escape_next = True
-                continue
-
-            if char == '"':
-                in_string = not in_string
-                continue
-
-            if not in_string:
-                if char == "{":
-                    brace_count += 1
-                elif char == "}":
-                    brace_count -= 1
-                    if brace_count == 0:
-                        json_end = i + 1
-                        break
-
-        json_str = html[json_start:json_end]
-
         try:
-            list_data = json.loads(json_str)
+            # Decode the JSON object starting at the marker, ignoring whatever script follows it
+            list_data, _ = json.JSONDecoder().raw_decode(html, start_pos + len(start_marker))
 
             if "ListData" not in list_data or "Row" not in list_data["ListData"]:
                 logger.error("Unexpected g_listData structure")
@@ -142,38 +197,31 @@ class SharepointConnection:
             logger.error(f"Error parsing JSON: {e}")
             return None
 
-    def get_folder_by_path(self, folder_path):
+    def get_folder_by_path(self, folder_path, listing_cache: Optional[ListingCache] = None):
         """Get contents of a specific folder by its server-relative path.
 
         Args:
             folder_path: Server-relative path like '/sites/PublicData/Shared Documents/...'.
+            listing_cache: Optional cache of folder listings.
 
         Returns:
             List of file info dictionaries, or None on error.
         """
         # Construct the URL to view that specific folder
-
         folder_url = f"{self.base_url}?id={quote(folder_path)}&p=true&ga=1"
+        return self.get_listing(folder_url, folder_path, listing_cache)
 
-        response = self.session.get(folder_url)
-        if response.status_code != 200:
-            logger.error(f"Error accessing folder: {response.status_code}")
-            return None
-
-        html = response.text
-        files = self.parse_g_data(html)
-        return files
-
-    def list_all_files_recursive(self, folder_path):
+    def list_all_files_recursive(self, folder_path, listing_cache: Optional[ListingCache] = None):
         """Recursively list all files in a folder and its subfolders.
 
         Args:
             folder_path: Server-relative path to start from.
+            listing_cache: Optional cache of folder listings.
 
         Returns:
             List of all file info dictionaries (not folders) found.
         """
-        files = self.get_folder_by_path(folder_path)
+        files = self.get_folder_by_path(folder_path, listing_cache)
         if not files:
             return []
         all_files = []
@@ -192,15 +240,42 @@ class SharepointConnection:
 
             if file["is_folder"]:
                 # Recursively explore subfolder
-                subfiles = self.list_all_files_recursive(file["url"])
+                subfiles = self.list_all_files_recursive(file["url"], listing_cache)
                 all_files.extend(subfiles)
             else:
                 all_files.append(file)
 
         return all_files
 
+    def list_share_files(self, share_url, listing_cache: Optional[ListingCache] = None):
+        """List every file (not folder) in a share, including its subfolders.
+
+        Args:
+            share_url: SharePoint sharing URL to list.
+            listing_cache: Optional cache of folder listings.
+
+        Returns:
+            List of file info dictionaries, or None if the share couldn't be listed.
+        """
+        files = self.get_sharepoint_folder_contents_anonymous(share_url, listing_cache)
+        if not files:
+            return None
+
+        all_files = []
+        for file in files:
+            if file["is_folder"]:
+                subfiles = self.list_all_files_recursive(file["url"], listing_cache)
+                all_files.extend(subfiles)
+            else:
+                all_files.append(file)
+        return all_files
+
+    def download_url(self, file_ref: str) -> str:
+        """Build the anonymous download URL for a FileRef path from the file list."""
+        return f"https://{self.prefix}.sharepoint.com{file_ref}?download=1"
+
     def download_sharepoint_file_anonymous(self, file_ref, output_path):
-        """Download a file from SharePoint using an existing session.
+        """Download a file from SharePoint using an existing session, streaming it to disk.
 
         Args:
             file_ref: The FileRef path from the file list.
@@ -209,37 +284,32 @@ class SharepointConnection:
         Returns:
             True if successful, False otherwise.
         """
-        # Construct download URL
-        download_url = f"https://{self.prefix}.sharepoint.com{file_ref}?download=1"
-
-        response = self.session.get(download_url)
-
-        if response.status_code == 200:
+        with self.session.get(self.download_url(file_ref), stream=True) as response:
+            if response.status_code != 200:
+                logger.error(f"Error downloading {file_ref}: Status code {response.status_code}")
+                return False
             with open(output_path, "wb") as f:
-                f.write(response.content)
-            logger.info(f"Downloaded: {output_path}")
-            return True
-        else:
-            logger.error(f"Error downloading {file_ref}: Status code {response.status_code}")
-            return False
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+        logger.info(f"Downloaded: {output_path}")
+        return True
 
-    def fetch_sharepoint_file(self, file_regex=None, share_url=None, target_date=None, bus_data=True):
-        """Download files from SharePoint matching a regex pattern.
+    def find_sharepoint_file(self, file_regex=None, share_url=None, target_date=None, bus_data=True):
+        """Find the file in a SharePoint share matching a regex pattern, without downloading it.
 
         Args:
             file_regex: Regular expression pattern (str or compiled Pattern) to match
                 against filenames. If None, uses default patterns based on bus_data.
-            share_url: SharePoint sharing URL to download from. If None, uses default
+            share_url: SharePoint sharing URL to search. If None, uses default
                 URLs based on bus_data.
-            target_date: Date object specifying which file to download. Used for default
+            target_date: Date object specifying which file to find. Used for default
                 subway data pattern matching. Optional for bus data, required for subway
                 data when file_regex is None.
-            bus_data: Whether to download bus data (True) or subway data (False). Only
+            bus_data: Whether to find bus data (True) or subway data (False). Only
                 used when file_regex is None.
 
         Returns:
-            Path to a named temporary file containing the downloaded data, or None
-            if no matching file is found.
+            File info dictionary of the matching file, or None if no matching file is found.
         """
         # Determine share URL
         if share_url is None:
@@ -260,59 +330,71 @@ class SharepointConnection:
         elif isinstance(file_regex, str):
             file_regex = re.compile(file_regex)
 
-        files = self.get_sharepoint_folder_contents_anonymous(share_url)
-
-        if files:
-            # Recursively list all files
-            all_files = []
-            for file in files:
-                size = file.get("size") or 0
-                if isinstance(size, str):
-                    try:
-                        size = int(size)
-                    except (ValueError, TypeError):
-                        size = 0
-
-                if file["is_folder"]:
-                    subfiles = self.list_all_files_recursive(file["url"])
-                    all_files.extend(subfiles)
-                else:
-                    all_files.append(file)
-
-            if all_files:
-                output_path = NamedTemporaryFile().name
-
-                # If we have a pattern with capture groups (date pattern), use date matching
-                if isinstance(file_regex, Pattern) and file_regex.groups >= 3:
-                    result = get_file_matching_date_pattern(all_files, file_regex, target_date)
-                    if result:
-                        file, file_date = result
-                        logger.info(f"Downloading {file['name']} (date: {file_date}) to {output_path}...")
-                        self.download_sharepoint_file_anonymous(file["url"], output_path)
-                        return output_path
-                    else:
-                        if target_date:
-                            logger.warning(f"No files found matching pattern with target date: {target_date}")
-                        else:
-                            logger.warning(f"No files found matching date pattern: {file_regex}")
-                        return None
-                else:
-                    # Find files matching the regex (original behavior)
-                    matching_files = [file for file in all_files if file_regex.search(file["name"])]
-
-                    if matching_files:
-                        file = matching_files[0]  # Take the first match
-                        logger.info(f"Downloading {file['name']} to {output_path}...")
-                        self.download_sharepoint_file_anonymous(file["url"], output_path)
-                        return output_path
-                    else:
-                        logger.warning(f"No files found matching pattern: {file_regex}")
-                        return None
-
-        else:
+        is_date_pattern = isinstance(file_regex, Pattern) and file_regex.groups >= 3
+        listing_cache = ListingCache.for_share(share_url, self.cache_dir) if self.cache_dir else None
+
+        # Recursively list all files
+        all_files = self.list_share_files(share_url, listing_cache)
+
+        if all_files is None:
             logger.error("No files found or error occurred")
             return None
 
+        if listing_cache is not None:
+            listing_cache.save()
+
+        if not all_files:
+            return None
+
+        # If we have a pattern with capture groups (date pattern), use date matching
+        if is_date_pattern:
+            result = get_file_matching_date_pattern(all_files, file_regex, target_date)
+            if result:
+                file, file_date = result
+                logger.info(f"Found {file['name']} (date: {file_date})")
+                return file
+            if target_date:
+                logger.warning(f"No files found matching pattern with target date: {target_date}")
+            else:
+                logger.warning(f"No files found matching date pattern: {file_regex}")
+            return None
+
+        # Find files matching the regex (original behavior)
+        matching_files = [file for file in all_files if file_regex.search(file["name"])]
+        if matching_files:
+            file = matching_files[0]  # Take the first match
+            logger.info(f"Found {file['name']}")
+            return file
+        logger.warning(f"No files found matching pattern: {file_regex}")
+        return None
+
+    def fetch_sharepoint_file(self, file_regex=None, share_url=None, target_date=None, bus_data=True):
+        """Download files from SharePoint matching a regex pattern.
+
+        Args:
+            file_regex: Regular expression pattern (str or compiled Pattern) to match
+                against filenames. If None, uses default patterns based on bus_data.
+            share_url: SharePoint sharing URL to download from. If None, uses default
+                URLs based on bus_data.
+            target_date: Date object specifying which file to download. Used for default
+                subway data pattern matching. Optional for bus data, required for subway
+                data when file_regex is None.
+            bus_data: Whether to download bus data (True) or subway data (False). Only
+                used when file_regex is None.
+
+        Returns:
+            Path to a named temporary file containing the downloaded data, or None
+            if no matching file is found.
+        """
+        file = self.find_sharepoint_file(file_regex, share_url, target_date, bus_data)
+        if file is None:
+            return None
+        output_path = NamedTemporaryFile().name
+        logger.info(f"Downloading {file['name']} to {output_path}...")
+        if not self.download_sharepoint_file_anonymous(file["url"], output_path):
+            return None
+        return output_path
+
 
 def get_file_matching_date_pattern(files: List[dict], pattern: Pattern, target_date: Optional[date] = None):
     """Find a file matching a date pattern and extract the date from its name.
@@ -1,63 +1,388 @@
+import contextvars
+import csv
+import gzip
 import io
+import json
 import time
 import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import cache
+from itertools import islice
 
 import boto3
-import pandas as pd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-s3 = boto3.client("s3")
-cloudfront = boto3.client("cloudfront")
+from . import instrumentation
+
+# On dashboard JSON, level 6 output is within about 10% of level 9, in a quarter of the time
+GZIP_LEVEL = 6
+
+# Streams are read, and decompressed, this much at a time
+CHUNK_SIZE = 1024 * 1024
+# Multipart parts must be at least 5 MiB (except the last). Payloads smaller than one part are uploaded in one go.
+PART_SIZE = 8 * 1024 * 1024
+
+# Concurrent listings and reads (ls(shard=True), get_many)
+THREAD_COUNT = 16
+
+# Several jobs fan S3 calls out over thread pools of 10-16 workers, more than botocore's default pool of 10
+CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    tcp_keepalive=True,
+)
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=PART_SIZE, multipart_chunksize=PART_SIZE)
+
+
+# Clients are created on first use rather than at import, so handlers that never touch S3 don't pay for them.
+@cache
+def get_client():
+    return boto3.client("s3", config=CLIENT_CONFIG)
+
+
+@cache
+def get_cloudfront_client():
+    return boto3.client("cloudfront")
+
+
+class _DecompressingReader(io.RawIOBase):
+    """Reads a streaming body chunk by chunk, decompressing zlib or gzip as it goes if compressed is set.
+
+    Decompressed output is also produced at most CHUNK_SIZE at a time, so memory stays bounded however well the
+    object compresses.
+    """
+
+    def __init__(self, body, compressed):
+        self._body = body
+        self._chunks = body.iter_chunks(CHUNK_SIZE)
+        # 32 should detect zlib vs gzip
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32) if compressed else None
+        self._block = b""
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def _next_block(self):
+        if self._decompressor is None:
+            return next(self._chunks, b"")
+        while True:
+            if self._decompressor.unconsumed_tail:
+                block = self._decompressor.decompress(self._decompressor.unconsumed_tail, CHUNK_SIZE)
+            else:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    return self._decompressor.flush()
+                block = self._decompressor.decompress(chunk, CHUNK_SIZE)
+            if block:
+                return block
+
+    def readinto(self, buffer):
+        if self._offset == len(self._block):
+            self._block, self._offset = self._next_block(), 0
+        size = min(len(buffer), len(self._block) - self._offset)
+        buffer[:size] = self._block[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self):
+        self._body.close()
+        super().close()
+
+
+def open_stream(bucket, key, compressed=True):
+    """Open an object as a buffered binary stream, decompressed as it is read. Use it as a context manager."""
+    response = get_client().get_object(Bucket=bucket, Key=key)
+    instrumentation.record_response(response, bytes=response.get("ContentLength", 0))
+    return io.BufferedReader(_DecompressingReader(response["Body"], compressed), buffer_size=CHUNK_SIZE)
+
+
+def open_text_stream(bucket, key, encoding="utf8", compressed=True):
+    """Like open_stream, but decoded to text, for json.load, csv readers or pandas."""
+    return io.TextIOWrapper(open_stream(bucket, key, compressed), encoding=encoding, newline="")
+
+
+class _CompressingWriter(io.RawIOBase):
+    """Compresses written bytes (if compress is set) and uploads them.
+
+    Output that fits in one part is sent with a single put_object when the writer is closed. Anything larger
+    becomes a multipart upload, sent a part at a time as it is written.
+    """
+
+    def __init__(self, bucket, key, compress, extra_args):
+        self._bucket = bucket
+        self._key = key
+        self._extra_args = extra_args
+        self._compressor = zlib.compressobj() if compress else None
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self._aborted = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._aborted:
+            return len(data)
+        self._buffer += self._compressor.compress(data) if self._compressor else data
+        if len(self._buffer) >= PART_SIZE:
+            self._upload_part()
+        return len(data)
+
+    def _upload_part(self):
+        client = get_client()
+        if self._upload_id is None:
+            response = client.create_multipart_upload(Bucket=self._bucket, Key=self._key, **self._extra_args)
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = client.upload_part(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer),
+        )
+        instrumentation.record_response(response, bytes=len(self._buffer))
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._buffer.clear()
+
+    def abort(self):
+        """Discard everything written so far, and the multipart upload if one was started."""
+        self._aborted = True
+        self._buffer.clear()
+        if self._upload_id is not None:
+            get_client().abort_multipart_upload(Bucket=self._bucket, Key=self._key, UploadId=self._upload_id)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if not self._aborted:
+                self._finish()
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            super().close()
+
+    def _finish(self):
+        if self._compressor:
+            self._buffer += self._compressor.flush()
+        if self._upload_id is None:
+            response = get_client().put_object(
+                Bucket=self._bucket, Key=self._key, Body=bytes(self._buffer), **self._extra_args
+            )
+            instrumentation.record_response(response, bytes=len(self._buffer))
+            return
+        if self._buffer:
+            self._upload_part()
+        get_client().complete_multipart_upload(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+
+@contextmanager
+def open_upload_stream(bucket, key, compress=True, encoding=None, **extra_args):
+    """Open a stream that compresses (zlib, like upload) and uploads whatever is written to it.
+
+    The object is only created when the block exits without an exception; otherwise the upload is aborted.
+
+    Args:
+        bucket: Bucket to upload to.
+        key: Key to upload to.
+        compress: Whether to zlib-compress the data.
+        encoding: If set, the stream accepts text in this encoding instead of bytes.
+        extra_args: Extra put_object arguments, e.g. ContentType.
+
+    Yields:
+        A writable binary (or text, if encoding is set) stream.
+    """
+    writer = _CompressingWriter(bucket, key, compress, extra_args)
+    stream = io.BufferedWriter(writer, buffer_size=CHUNK_SIZE)
+    if encoding:
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        yield stream
+    except BaseException:
+        writer.abort()
+        stream.close()
+        raise
+    stream.close()
 
 
 # General downloading/uploading
 def download(bucket, key, encoding="utf8", compressed=True):
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    s3_data = obj["Body"].read()
-    if not compressed:
-        return s3_data.decode(encoding)
-    # 32 should detect zlib vs gzip
-    decompressed = zlib.decompress(s3_data, zlib.MAX_WBITS | 32).decode(encoding)
-    return decompressed
+    with open_text_stream(bucket, key, encoding=encoding, compressed=compressed) as stream:
+        return stream.read()
+
+
+def download_json(bucket, key, compressed=True):
+    with open_text_stream(bucket, key, compressed=compressed) as stream:
+        return json.load(stream)
+
+
+def download_manifest(bucket, key, default):
+    """Read the JSON manifest a job keeps of what it has already written, or default before its first run."""
+    try:
+        return download_json(bucket, key, compressed=True)
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return default
+
+
+def upload_manifest(bucket, key, manifest):
+    upload(bucket, key, json.dumps(manifest, separators=(",", ":")).encode("utf8"), compress=True)
 
 
 # TODO: confirm if we want zlib or gzip compression
 # note: alerts are zlib, but dashboard download code can handle either (in theory)
 def upload(bucket, key, bytes, compress=True):
-    if compress:
-        bytes = zlib.compress(bytes)
-    s3.put_object(Bucket=bucket, Key=key, Body=bytes)
+    # Callers may pass text (shuttle positions do); sizes and parts are counted in encoded bytes
+    if isinstance(bytes, str):
+        bytes = bytes.encode("utf8")
+    if len(bytes) < PART_SIZE:
+        if compress:
+            bytes = zlib.compress(bytes)
+        response = get_client().put_object(Bucket=bucket, Key=key, Body=bytes)
+        instrumentation.record_response(response, bytes=len(bytes))
+        return
+    # Large payloads are compressed and sent a part at a time, rather than compressed into a second full copy
+    with open_upload_stream(bucket, key, compress=compress) as stream:
+        view = memoryview(bytes)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            stream.write(view[offset : offset + CHUNK_SIZE])
+
+
+def upload_gzip(bucket, key, bytes, content_type="application/json", cache_control=None):
+    """Upload gzip-compressed bytes with Content-Encoding: gzip, so browsers (and CloudFront) decompress them
+    transparently, while download(compressed=True) still reads them."""
+    extra_args = {"CacheControl": cache_control} if cache_control else {}
+    body = gzip.compress(bytes, compresslevel=GZIP_LEVEL)
+    response = get_client().put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType=content_type,
+        ContentEncoding="gzip",
+        **extra_args,
+    )
+    instrumentation.record_response(response, bytes=len(body))
+
+
+def copy(source_bucket, source_key, bucket, key):
+    """Copy an object server-side, keeping its content type, encoding and cache headers."""
+    response = get_client().copy_object(CopySource={"Bucket": source_bucket, "Key": source_key}, Bucket=bucket, Key=key)
+    instrumentation.record_response(response)
 
 
 def upload_df_as_csv(bucket, key, df):
     key = str(key)
 
-    buffer = io.BytesIO()
-    df.to_csv(buffer, compression=None, encoding="utf-8", index=False)
-    buffer.seek(0)
+    # Written straight into the upload stream, without rendering the whole CSV in memory first
+    with open_upload_stream(bucket, key, compress=False, encoding="utf-8", ContentType="text/csv") as stream:
+        df.to_csv(stream, index=False)
 
-    s3.upload_fileobj(buffer, bucket, Key=key, ExtraArgs={"ContentType": "text/csv"})
 
+def upload_rows_as_csv(bucket, key, rows, fieldnames):
+    """Upload a list of dicts as CSV, for callers that don't otherwise need pandas."""
+    key = str(key)
+
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    buffer = io.BytesIO(text.getvalue().encode("utf-8"))
+
+    get_client().upload_fileobj(buffer, bucket, Key=key, ExtraArgs={"ContentType": "text/csv"}, Config=TRANSFER_CONFIG)
+    instrumentation.record(bytes=buffer.getbuffer().nbytes)
+
+
+def download_csv_as_df(bucket, key, compressed=False):
+    import pandas as pd
 
-def download_csv_as_df(bucket, key):
     key = str(key)
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    return pd.read_csv(obj["Body"])
+    with open_stream(bucket, key, compressed=compressed) as stream:
+        return pd.read_csv(stream)
 
 
-def ls(bucket, prefix):
-    paginator = s3.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
+def _list(bucket, prefix, delimiter=None):
+    """Page through a listing, returning its keys and (with a delimiter) its common prefixes."""
+    paginator = get_client().get_paginator("list_objects_v2")
+    pages = paginator.paginate(Bucket=bucket, Prefix=prefix, **({"Delimiter": delimiter} if delimiter else {}))
 
-    all_keys = []
+    keys, common_prefixes = [], []
     for page in pages:
-        keys = [x["Key"] for x in page["Contents"]]
-        all_keys.extend(keys)
+        # Pages of an empty listing have no Contents at all
+        keys.extend(x["Key"] for x in page.get("Contents", []))
+        common_prefixes.extend(x["Prefix"] for x in page.get("CommonPrefixes", []))
+    return keys, common_prefixes
+
+
+def ls(bucket, prefix, shard=False):
+    """List every key under a prefix, in S3's (lexicographic) order.
+
+    Args:
+        bucket: Bucket to list.
+        prefix: Prefix to list.
+        shard: List each of the prefix's immediate sub-prefixes ("/"-delimited) concurrently, each paginated on
+            its own thread. Only worth it when there are many sub-prefixes with many keys each, since it costs one
+            extra listing up front.
+
+    Returns:
+        List of keys.
+    """
+    if not shard:
+        keys, _ = _list(bucket, prefix)
+        return keys
+
+    keys, sub_prefixes = _list(bucket, prefix, delimiter="/")
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        for sub_keys, _ in executor.map(lambda sub_prefix: _list(bucket, sub_prefix), sub_prefixes):
+            keys.extend(sub_keys)
+    return sorted(keys)
+
+
+def get_many(bucket, keys, read=download, max_workers=THREAD_COUNT):
+    """Read many objects concurrently, yielding (key, result) pairs as each read completes.
+
+    At most twice max_workers reads are in flight, so results don't pile up ahead of a slow consumer.
+
+    Args:
+        bucket: Bucket to read from.
+        keys: Keys to read.
+        read: Function called as read(bucket, key) to read each object, e.g. download or download_csv_as_df.
+        max_workers: Number of concurrent reads.
+
+    Yields:
+        (key, result) tuples, in completion order.
+    """
+    keys = iter(keys)
+    # Reads run in the caller's context, so what they move is counted into the caller's instrumentation stage
+    context = contextvars.copy_context()
+
+    def submit(executor, key):
+        return executor.submit(context.copy().run, read, bucket, key)
 
-    return all_keys
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {submit(executor, key): key for key in islice(keys, max_workers * 2)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+            for key in islice(keys, len(done)):
+                pending[submit(executor, key)] = key
 
 
 def clear_cf_cache(distribution: str, keys: list[str]):
-    cloudfront.create_invalidation(
+    get_cloudfront_client().create_invalidation(
         DistributionId=distribution,
         InvalidationBatch={
             "Paths": {"Quantity": len(keys), "Items": keys},
@@ -5,19 +5,29 @@ from typing import Optional, cast
 
 import click
 
+from .. import instrumentation
 from .config import (
     PRE_COVID_DATE,
     START_DATE,
     TIME_ZONE,
 )
 from .gtfs import get_routes_by_line
-from .ridership import RidershipEntry, ridership_by_line_id
+from .line_cache import (
+    CompletedWeeks,
+    get_completed_weeks_fingerprint,
+    read_cached_completed_weeks,
+    read_manifest,
+    write_cached_completed_weeks,
+    write_manifest,
+)
+from .loader import load_entries_by_line_id
+from .ridership import RidershipEntry
 from .s3 import put_dashboard_json_to_s3
-from .service_levels import ServiceLevelsByDate, ServiceLevelsEntry, get_service_level_entries_by_line_id
+from .service_levels import ServiceLevels
 from .service_summaries import summarize_weekly_service_around_date
 from .summary import get_summary_data, get_summary_data_by_mode
-from .time_series import get_weekly_median_time_series
-from .types import DashJSON, LineData, LineKind, ServiceRegimes
+from .time_series import get_weekly_median_time_series, get_weekly_median_time_series_for_days
+from .types import DashJSON, LineData, LineKind, ServiceRegimes, ServiceSummary
 from .util import date_from_string, date_to_string
 
 parent_dir = PurePath(__file__).parent
@@ -45,15 +55,22 @@ def get_line_kind(route_ids: list[str], line_id: str) -> LineKind:
     return "bus"
 
 
+def get_current_week_start(end_date: date) -> date:
+    """The Monday of the week containing the dashboard's end date. Weeks before it are completed."""
+    return end_date - timedelta(days=end_date.weekday())
+
+
 def create_service_regimes(
-    service_levels: ServiceLevelsByDate,
+    service_levels: ServiceLevels,
     date: date,
+    baseline: ServiceSummary,
 ) -> ServiceRegimes:
     """Create service regime summaries for current, one year ago, and baseline periods.
 
     Args:
-        service_levels: A dictionary mapping dates to service level entries.
+        service_levels: The line's service levels.
         date: The reference date for computing service regimes.
+        baseline: The line's pre-COVID service summary, from its completed weeks.
 
     Returns:
         A ServiceRegimes dict with current, oneYearAgo, and baseline summaries.
@@ -67,7 +84,44 @@ def create_service_regimes(
             date=date - timedelta(days=365),
             service_levels=service_levels,
         ),
-        "baseline": summarize_weekly_service_around_date(
+        "baseline": baseline,
+    }
+
+
+def create_completed_weeks(
+    start_date: date,
+    current_week_start: date,
+    service_levels: ServiceLevels,
+    ridership: dict[date, RidershipEntry],
+) -> CompletedWeeks:
+    """Build the part of a line's data that only depends on days before the current week.
+
+    Args:
+        start_date: The start date of the data range.
+        current_week_start: The Monday of the week containing the end date.
+        service_levels: The line's service levels.
+        ridership: A dictionary mapping dates to ridership entries for this line.
+
+    Returns:
+        The line's weekly ridership and service histories up to the last completed week, and its baseline regime.
+    """
+    completed_days = service_levels.days_before(current_week_start)
+    last_completed_date = current_week_start - timedelta(days=1)
+    return {
+        "ridershipHistory": get_weekly_median_time_series(
+            entries={day: entry for day, entry in ridership.items() if day < current_week_start},
+            entry_value_getter=lambda entry: entry.ridership,
+            start_date=start_date,
+            max_end_date=last_completed_date,
+        ),
+        "serviceHistory": get_weekly_median_time_series_for_days(
+            values=service_levels.get_total_trips()[:completed_days],
+            values_start_date=service_levels.start_date,
+            start_date=start_date,
+            max_end_date=last_completed_date,
+        ),
+        # Only looks back from PRE_COVID_DATE, which is in a completed week for any end date after it
+        "baselineRegime": summarize_weekly_service_around_date(
             date=PRE_COVID_DATE,
             service_levels=service_levels,
         ),
@@ -77,95 +131,152 @@ def create_service_regimes(
 def create_line_data(
     start_date: date,
     end_date: date,
-    service_levels: dict[date, ServiceLevelsEntry],
+    service_levels: ServiceLevels,
     ridership: dict[date, RidershipEntry],
+    completed_weeks: Optional[CompletedWeeks] = None,
 ) -> LineData:
     """Build a LineData dictionary containing service and ridership history for a line.
 
+    Only the current week and the current and one-year-ago regimes are built from scratch when the line's
+    completed weeks are passed in.
+
     Args:
         start_date: The start date of the data range.
         end_date: The end date of the data range.
-        service_levels: A dictionary mapping dates to service level entries for this line.
+        service_levels: The line's service levels.
         ridership: A dictionary mapping dates to ridership entries for this line.
+        completed_weeks: The line's completed weeks, from create_completed_weeks. Built if not given.
 
     Returns:
         A LineData dict with line metadata, ridership history, service history, and regimes.
     """
-    [latest_service_levels_date, *_] = sorted(service_levels.keys(), reverse=True)
-    service_level_entry = service_levels[latest_service_levels_date]
+    current_week_start = get_current_week_start(end_date)
+    if completed_weeks is None:
+        completed_weeks = create_completed_weeks(start_date, current_week_start, service_levels, ridership)
+    completed_days = service_levels.days_before(current_week_start)
     return {
-        "id": service_level_entry.line_id,
-        "shortName": service_level_entry.line_short_name,
-        "longName": service_level_entry.line_long_name,
-        "routeIds": service_level_entry.route_ids,
+        "id": service_levels.line_id,
+        "shortName": service_levels.line_short_name,
+        "longName": service_levels.line_long_name,
+        "routeIds": service_levels.route_ids,
         "startDate": date_to_string(start_date),
         "lineKind": get_line_kind(
-            route_ids=service_level_entry.route_ids,
-            line_id=service_level_entry.line_id,
-        ),
-        "ridershipHistory": get_weekly_median_time_series(
-            entries=ridership,
-            entry_value_getter=lambda entry: entry.ridership,
-            start_date=start_date,
-            max_end_date=end_date,
-        ),
-        "serviceHistory": get_weekly_median_time_series(
-            entries=service_levels,
-            entry_value_getter=lambda entry: round(sum(entry.service_levels)),
-            start_date=start_date,
-            max_end_date=end_date,
+            route_ids=service_levels.route_ids,
+            line_id=service_levels.line_id,
         ),
+        "ridershipHistory": {
+            **completed_weeks["ridershipHistory"],
+            **get_weekly_median_time_series(
+                entries={day: entry for day, entry in ridership.items() if day >= current_week_start},
+                entry_value_getter=lambda entry: entry.ridership,
+                start_date=max(start_date, current_week_start),
+                max_end_date=end_date,
+            ),
+        },
+        "serviceHistory": {
+            **completed_weeks["serviceHistory"],
+            **get_weekly_median_time_series_for_days(
+                values=service_levels.get_total_trips()[completed_days:],
+                values_start_date=service_levels.date_at(completed_days),
+                start_date=max(start_date, current_week_start),
+                max_end_date=end_date,
+            ),
+        },
         "serviceRegimes": create_service_regimes(
             service_levels=service_levels,
-            date=latest_service_levels_date,
+            date=service_levels.end_date,
+            baseline=completed_weeks["baselineRegime"],
         ),
     }
 
 
+@instrumentation.instrumented()
 def create_service_ridership_dash_json(
     start_date: date = START_DATE,
-    end_date: date = datetime.now(TIME_ZONE).date(),
+    end_date: Optional[date] = None,
     write_debug_files: bool = False,
     write_to_s3: bool = True,
     include_only_line_ids: Optional[list[str]] = None,
+    force: bool = False,
 ):
     """Generate the complete service ridership dashboard JSON and optionally upload to S3.
 
+    When writing to S3, the completed weeks of each line are cached there along with a fingerprint of the inputs
+    they were built from. Lines whose inputs before the current week haven't changed since the last run only
+    have their current week and regimes rebuilt. Summary and mode data are reassembled from every line.
+
     Args:
         start_date: The start date for the dashboard data range.
-        end_date: The end date for the dashboard data range.
+        end_date: The end date for the dashboard data range. Defaults to today in Boston.
         write_debug_files: Whether to write a local debug JSON file.
-        write_to_s3: Whether to upload the resulting JSON to S3.
+        write_to_s3: Whether to upload the resulting JSON (and the line cache) to S3.
         include_only_line_ids: If provided, only include these line IDs in the output.
+        force: Rebuild every line from scratch, ignoring the line cache.
     """
+    if end_date is None:
+        end_date = datetime.now(TIME_ZONE).date()
     print(
         f"Creating service ridership dashboard JSON for {start_date} to {end_date} "
         + f"{'for lines ' + ', '.join(include_only_line_ids) if include_only_line_ids else ''}"
     )
-    routes_by_line = get_routes_by_line(include_only_line_ids=include_only_line_ids)
-    service_level_entries = get_service_level_entries_by_line_id(
-        routes_by_line=routes_by_line,
-        start_date=start_date,
-        end_date=end_date,
-    )
-    ridership_entries = ridership_by_line_id(
-        start_date=start_date,
-        end_date=end_date,
-        line_ids=list(service_level_entries.keys()),
-    )
-    line_data_by_line_id = {
-        line_id: create_line_data(
+    with instrumentation.stage("service_ridership_dashboard.load_entries"):
+        routes_by_line = get_routes_by_line(include_only_line_ids=include_only_line_ids)
+        service_level_entries, ridership_entries = load_entries_by_line_id(
+            routes_by_line=routes_by_line,
             start_date=start_date,
             end_date=end_date,
-            service_levels=service_level_entries[line_id],
-            ridership=ridership_entries[line_id],
         )
+    line_ids = [
+        line_id
         for line_id in service_level_entries.keys()
         if service_level_entries[line_id]
         and ridership_entries[line_id]
         and len(service_level_entries[line_id])
         and len(ridership_entries[line_id])
-    }
+    ]
+    current_week_start = get_current_week_start(end_date)
+    with instrumentation.stage("service_ridership_dashboard.read_line_cache"):
+        fingerprints = {
+            line_id: get_completed_weeks_fingerprint(
+                service_levels=service_level_entries[line_id],
+                ridership=ridership_entries[line_id],
+                start_date=start_date,
+                current_week_start=current_week_start,
+            )
+            for line_id in line_ids
+        }
+        previous_fingerprints = read_manifest() if write_to_s3 else {}
+        unchanged_line_ids = [
+            line_id for line_id in line_ids if not force and previous_fingerprints.get(line_id) == fingerprints[line_id]
+        ]
+        cached_completed_weeks = read_cached_completed_weeks(unchanged_line_ids) if unchanged_line_ids else {}
+    with instrumentation.stage("service_ridership_dashboard.create_line_data") as stage:
+        rebuilt_completed_weeks = {
+            line_id: create_completed_weeks(
+                start_date=start_date,
+                current_week_start=current_week_start,
+                service_levels=service_level_entries[line_id],
+                ridership=ridership_entries[line_id],
+            )
+            for line_id in line_ids
+            if line_id not in cached_completed_weeks
+        }
+        line_data_by_line_id = {
+            line_id: create_line_data(
+                start_date=start_date,
+                end_date=end_date,
+                service_levels=service_level_entries[line_id],
+                ridership=ridership_entries[line_id],
+                completed_weeks=(
+                    cached_completed_weeks[line_id]
+                    if line_id in cached_completed_weeks
+                    else rebuilt_completed_weeks[line_id]
+                ),
+            )
+            for line_id in line_ids
+        }
+        stage.record(items=len(line_data_by_line_id))
+    print(f"Rebuilt the completed weeks of {len(rebuilt_completed_weeks)} of {len(line_ids)} lines")
     summary_data = get_summary_data(
         line_data=list(line_data_by_line_id.values()),
         start_date=start_date,
@@ -185,37 +296,45 @@ def create_service_ridership_dash_json(
         with open(debug_file_name, "w") as f:
             json.dump(dash_json, f)
     if write_to_s3:
-        put_dashboard_json_to_s3(today=end_date, dash_json=dash_json)
+        with instrumentation.stage("service_ridership_dashboard.upload"):
+            put_dashboard_json_to_s3(today=end_date, dash_json=dash_json)
+            write_cached_completed_weeks(rebuilt_completed_weeks)
+            # Lines left out of this run (with include_only_line_ids) keep their cache entries
+            write_manifest({**previous_fingerprints, **fingerprints} if include_only_line_ids else fingerprints)
 
 
 @click.command()
 @click.option("--start", default=START_DATE, help="Start date for the dashboard")
-@click.option("--end", default=datetime.now(TIME_ZONE).date(), help="End date for the dashboard")
+@click.option("--end", default=None, help="End date for the dashboard (defaults to today)")
 @click.option("--debug", default=False, help="Write debug file", is_flag=True)
 @click.option("--s3", default=False, help="Write to S3", is_flag=True)
 @click.option("--lines", default=None, help="Include only these line IDs")
+@click.option("--force", default=False, help="Rebuild every line, ignoring the line cache", is_flag=True)
 def create_service_ridership_dash_json_command(
     start: str,
-    end: str,
+    end: Optional[str],
     debug: bool = False,
     s3: bool = False,
     lines: Optional[str] = None,
+    force: bool = False,
 ):
     """CLI command to create the service ridership dashboard JSON.
 
     Args:
         start: Start date string for the dashboard.
-        end: End date string for the dashboard.
+        end: End date string for the dashboard, or None for today.
         debug: Whether to write a local debug JSON file.
         s3: Whether to upload the resulting JSON to S3.
         lines: Comma-separated list of line names to include (without "line-" prefix).
+        force: Whether to rebuild every line, ignoring the line cache.
     """
     create_service_ridership_dash_json(
         start_date=date_from_string(start),
-        end_date=date_from_string(end),
+        end_date=date_from_string(end) if end else None,
         write_debug_files=debug,
         write_to_s3=s3,
         include_only_line_ids=[f"line-{line}" for line in lines.split(",")] if lines else None,
+        force=force,
     )
 
 
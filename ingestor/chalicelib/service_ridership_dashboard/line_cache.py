@@ -0,0 +1,128 @@
+"""Per-line cache of the completed weeks of each line's LineData between dashboard builds.
+
+The dashboard's end date moves forward every night, but only the current week's medians and the current and
+one-year-ago service regimes depend on it. The rest of a line's data (its weekly histories up to the last
+completed week, and its pre-COVID baseline regime) only depends on inputs dated before the current week. That
+part is stored per line, and a manifest records the fingerprint of the inputs it was built from.
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Optional, TypedDict
+
+from botocore.exceptions import ClientError
+
+from .. import s3
+from .ridership import RidershipByDate
+from .service_levels import ServiceLevels
+from .types import ServiceSummary, WeeklyMedianTimeSeries
+
+BUCKET = "tm-service-ridership-dashboard"
+CACHE_PREFIX = "cache"
+MANIFEST_KEY = f"{CACHE_PREFIX}/manifest.json"
+# Bump whenever what's cached for a line changes, so every line is rebuilt
+LINE_CACHE_VERSION = 1
+THREAD_COUNT = 16
+
+
+class CompletedWeeks(TypedDict):
+    ridershipHistory: WeeklyMedianTimeSeries
+    serviceHistory: WeeklyMedianTimeSeries
+    baselineRegime: ServiceSummary
+
+
+def _line_key(line_id: str) -> str:
+    return f"{CACHE_PREFIX}/lines/{line_id}.json"
+
+
+def get_completed_weeks_fingerprint(
+    service_levels: ServiceLevels,
+    ridership: RidershipByDate,
+    start_date: date,
+    current_week_start: date,
+) -> str:
+    """Hash everything a line's completed weeks are built from: its inputs dated before the current week.
+
+    Args:
+        service_levels: The line's service levels.
+        ridership: The line's ridership entries by date.
+        start_date: The start date of the dashboard.
+        current_week_start: The Monday of the week containing the dashboard's end date.
+
+    Returns:
+        A hex digest that changes whenever any of those inputs do.
+    """
+    completed_days = service_levels.days_before(current_week_start)
+    digest = hashlib.sha1()
+    metadata = {
+        "version": LINE_CACHE_VERSION,
+        "startDate": start_date.isoformat(),
+        "currentWeekStart": current_week_start.isoformat(),
+        "lineId": service_levels.line_id,
+        "shortName": service_levels.line_short_name,
+        "longName": service_levels.line_long_name,
+        "routeIds": service_levels.route_ids,
+        "serviceStartDate": service_levels.start_date.isoformat(),
+    }
+    digest.update(json.dumps(metadata, sort_keys=True).encode("utf8"))
+    for array in (
+        service_levels.trips_by_hour,
+        service_levels.has_service_exceptions,
+        service_levels.has_scheduled_service,
+    ):
+        digest.update(array[:completed_days].tobytes())
+    ridership_items = [
+        [day.isoformat(), entry.ridership] for day, entry in sorted(ridership.items()) if day < current_week_start
+    ]
+    digest.update(json.dumps(ridership_items).encode("utf8"))
+    return digest.hexdigest()
+
+
+def read_manifest() -> dict[str, str]:
+    """Fingerprints of the cached lines, by line ID."""
+    return s3.download_manifest(BUCKET, MANIFEST_KEY, {})
+
+
+def write_manifest(fingerprints: dict[str, str]) -> None:
+    s3.upload_manifest(BUCKET, MANIFEST_KEY, fingerprints)
+
+
+def _read_completed_weeks(line_id: str) -> Optional[CompletedWeeks]:
+    try:
+        return s3.download_json(BUCKET, _line_key(line_id), compressed=True)
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return None
+
+
+def read_cached_completed_weeks(line_ids: list[str]) -> dict[str, CompletedWeeks]:
+    """Download the cached completed weeks of several lines concurrently.
+
+    Args:
+        line_ids: The lines to read.
+
+    Returns:
+        Completed weeks by line ID, leaving out any line whose object is missing.
+    """
+    cached: dict[str, CompletedWeeks] = {}
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        futures = {executor.submit(_read_completed_weeks, line_id): line_id for line_id in line_ids}
+        for future in as_completed(futures):
+            completed_weeks = future.result()
+            if completed_weeks is not None:
+                cached[futures[future]] = completed_weeks
+    return cached
+
+
+def write_cached_completed_weeks(completed_weeks_by_line_id: dict[str, CompletedWeeks]) -> None:
+    """Upload the completed weeks of several lines concurrently."""
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        futures = [
+            executor.submit(s3.upload, BUCKET, _line_key(line_id), json.dumps(completed_weeks).encode("utf8"))
+            for line_id, completed_weeks in completed_weeks_by_line_id.items()
+        ]
+        for future in as_completed(futures):
+            future.result()
@@ -0,0 +1,60 @@
+from datetime import date
+from functools import partial
+
+from tqdm import tqdm
+
+from .gtfs import RoutesByLine
+from .queries import ScheduledServiceRow, query_ridership, query_scheduled_service, run_queries
+from .ridership import RidershipByLineId, get_ridership_by_date
+from .service_levels import ServiceLevelsByLineId, get_service_level_entries_for_line
+
+
+def load_entries_by_line_id(
+    routes_by_line: RoutesByLine,
+    start_date: date,
+    end_date: date,
+) -> tuple[ServiceLevelsByLineId, RidershipByLineId]:
+    """Load the service levels and ridership of every line, with all queries sharing one bounded thread pool.
+
+    Scheduled service is queried per route and ridership per line, all at once. Each line's entries are
+    assembled as soon as the last of its queries finishes.
+
+    Args:
+        routes_by_line: A dictionary mapping Line objects to their associated routes.
+        start_date: The start date of the query range.
+        end_date: The end date of the query range.
+
+    Returns:
+        Service levels by line ID and date, and ridership by line ID and date, both in routes_by_line order.
+    """
+    queries = {}
+    for line, routes in routes_by_line.items():
+        for route in routes:
+            queries[("service", line, route.route_id)] = partial(
+                query_scheduled_service, start_date=start_date, end_date=end_date, route_id=route.route_id
+            )
+        queries[("ridership", line, None)] = partial(
+            query_ridership, start_date=start_date, end_date=end_date, line_id=line.line_id
+        )
+
+    service_rows_by_line: dict = {line: [] for line in routes_by_line}
+    pending_routes_by_line = {line: len(routes) for line, routes in routes_by_line.items()}
+    service_levels: ServiceLevelsByLineId = {}
+    ridership: RidershipByLineId = {}
+    for (kind, line, _), rows in tqdm(run_queries(queries), total=len(queries), desc="Loading service and ridership"):
+        if kind == "ridership":
+            ridership[line.line_id] = get_ridership_by_date(rows)
+            continue
+        line_rows: list[ScheduledServiceRow] = service_rows_by_line[line]
+        line_rows.extend(rows)
+        pending_routes_by_line[line] -= 1
+        if pending_routes_by_line[line] == 0:
+            service_levels[line.line_id] = get_service_level_entries_for_line(
+                line, routes_by_line[line], service_rows_by_line.pop(line), start_date, end_date
+            )
+
+    line_ids = [line.line_id for line in routes_by_line]
+    return (
+        {line_id: service_levels[line_id] for line_id in line_ids},
+        {line_id: ridership[line_id] for line_id in line_ids},
+    )
@@ -1,12 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
-from typing import TypedDict
+from typing import Callable, Hashable, Iterator, TypedDict
 
-import boto3
-from boto3.dynamodb.conditions import Key
 from dynamodb_json import json_util as ddb_json
 
-# Create a DynamoDB resource
-dynamodb = boto3.resource("dynamodb")
+from .. import dynamo
+
+# Queries in flight at once. With this many, loading the dashboard is bound by table read throughput, not latency.
+QUERY_THREAD_COUNT = 16
 
 
 class ByHour(TypedDict):
@@ -31,6 +32,41 @@ class RidershipRow(TypedDict):
     timestamp: int
 
 
+def _query_date_range(
+    table_name: str,
+    partition_key: str,
+    partition_value: str,
+    start_date: date,
+    end_date: date,
+) -> list[dict]:
+    """Query one partition of a table between two dates, following every page of results.
+
+    Uses the DynamoDB client (rather than a Table resource) so that queries can run on many threads at once.
+
+    Args:
+        table_name: Name of the DynamoDB table.
+        partition_key: Name of the table's partition key.
+        partition_value: Partition to query.
+        start_date: The start date of the query range.
+        end_date: The end date of the query range.
+
+    Returns:
+        All items in the range, as plain dicts.
+    """
+    paginator = dynamo.get_resource().meta.client.get_paginator("query")
+    pages = paginator.paginate(
+        TableName=table_name,
+        KeyConditionExpression="#partition = :partition AND #date BETWEEN :start AND :end",
+        ExpressionAttributeNames={"#partition": partition_key, "#date": "date"},
+        ExpressionAttributeValues={
+            ":partition": {"S": partition_value},
+            ":start": {"S": start_date.isoformat()},
+            ":end": {"S": end_date.isoformat()},
+        },
+    )
+    return [row for page in pages for row in ddb_json.loads(page["Items"])]
+
+
 def query_scheduled_service(start_date: date, end_date: date, route_id: str) -> list[ScheduledServiceRow]:
     """Query the ScheduledServiceDaily DynamoDB table for a route within a date range.
 
@@ -42,12 +78,7 @@ def query_scheduled_service(start_date: date, end_date: date, route_id: str) ->
     Returns:
         A list of ScheduledServiceRow dicts from DynamoDB.
     """
-    table = dynamodb.Table("ScheduledServiceDaily")
-    date_condition = Key("date").between(start_date.isoformat(), end_date.isoformat())
-    route_condition = Key("routeId").eq(route_id)
-    condition = date_condition & route_condition
-    response = table.query(KeyConditionExpression=condition)
-    return ddb_json.loads(response["Items"])
+    return _query_date_range("ScheduledServiceDaily", "routeId", route_id, start_date, end_date)
 
 
 def query_ridership(start_date: date, end_date: date, line_id: str) -> list[RidershipRow]:
@@ -61,9 +92,23 @@ def query_ridership(start_date: date, end_date: date, line_id: str) -> list[Ride
     Returns:
         A list of RidershipRow dicts from DynamoDB.
     """
-    table = dynamodb.Table("Ridership")
-    date_condition = Key("date").between(start_date.isoformat(), end_date.isoformat())
-    line_condition = Key("lineId").eq(line_id)
-    condition = date_condition & line_condition
-    response = table.query(KeyConditionExpression=condition)
-    return ddb_json.loads(response["Items"])
+    return _query_date_range("Ridership", "lineId", line_id, start_date, end_date)
+
+
+def run_queries(
+    queries: dict[Hashable, Callable[[], list]],
+    max_workers: int = QUERY_THREAD_COUNT,
+) -> Iterator[tuple[Hashable, list]]:
+    """Run queries on a bounded pool of threads, yielding each one's results as soon as it finishes.
+
+    Args:
+        queries: Mapping of keys to functions that run one query.
+        max_workers: Number of queries in flight at once.
+
+    Yields:
+        (key, rows) for each query, in order of completion.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(query): key for key, query in queries.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -1,22 +1,81 @@
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
 
-import boto3
-
+from .. import s3
 from .types import DashJSON
 from .util import date_to_string
 
-bucket = boto3.resource("s3").Bucket("tm-service-ridership-dashboard")
+BUCKET = "tm-service-ridership-dashboard"
+LATEST_KEY = "latest.json"
+SUMMARY_KEY = "summary.json"
+# The latest objects are replaced every night
+CACHE_CONTROL = "public, max-age=3600"
+
+# Line objects uploaded at once
+THREAD_COUNT = 16
+
+# Per-line fields small enough to list every line in the summary object
+LINE_SUMMARY_FIELDS = ["id", "shortName", "longName", "routeIds", "startDate", "lineKind"]
+
+
+def get_line_key(line_id: str) -> str:
+    return f"lines/{line_id}.json"
+
+
+def get_summary_json(dash_json: DashJSON) -> dict:
+    """The dashboard without the per-line histories and regimes, which live in their own objects.
+
+    Args:
+        dash_json: The complete dashboard JSON.
+
+    Returns:
+        The summary and mode data, and each line's metadata with the key of its full object.
+    """
+    return {
+        "summaryData": dash_json["summaryData"],
+        "modeData": dash_json["modeData"],
+        "lines": {
+            line_id: {
+                **{field: line_data[field] for field in LINE_SUMMARY_FIELDS},
+                "key": get_line_key(line_id),
+            }
+            for line_id, line_data in dash_json["lineData"].items()
+        },
+    }
+
+
+def put_line_json_to_s3(dash_json: DashJSON) -> None:
+    """Upload each line's LineData as its own object, concurrently."""
+    with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        futures = [
+            executor.submit(
+                s3.upload_gzip,
+                BUCKET,
+                get_line_key(line_id),
+                json.dumps(line_data).encode("utf8"),
+                cache_control=CACHE_CONTROL,
+            )
+            for line_id, line_data in dash_json["lineData"].items()
+        ]
+        for future in as_completed(futures):
+            future.result()
 
 
 def put_dashboard_json_to_s3(today: date, dash_json: DashJSON) -> None:
-    """Upload dashboard JSON data to S3 as both a dated file and latest.json.
+    """Upload dashboard JSON data to S3: the per-line objects, then latest.json, a dated copy of it, and the summary.
+
+    Objects are gzip-encoded. The line objects go first, so the summary never points at lines that haven't been
+    written yet. The dated file is a server-side copy of latest.json rather than a second upload.
 
     Args:
         today: The date used to name the dated JSON file.
         dash_json: The dashboard JSON data to upload.
     """
     print("Uploading dashboard JSON to S3")
-    contents = json.dumps(dash_json)
-    bucket.put_object(Key=f"{date_to_string(today)}.json", Body=contents)
-    bucket.put_object(Key="latest.json", Body=contents)
+    put_line_json_to_s3(dash_json)
+    s3.upload_gzip(BUCKET, LATEST_KEY, json.dumps(dash_json).encode("utf8"), cache_control=CACHE_CONTROL)
+    s3.copy(BUCKET, LATEST_KEY, BUCKET, f"{date_to_string(today)}.json")
+    s3.upload_gzip(
+        BUCKET, SUMMARY_KEY, json.dumps(get_summary_json(dash_json)).encode("utf8"), cache_control=CACHE_CONTROL
+    )
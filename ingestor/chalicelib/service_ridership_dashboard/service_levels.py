@@ -1,108 +1,117 @@
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, timedelta
+from functools import cached_property
 
-from tqdm import tqdm
+import numpy as np
+from mbta_gtfs_sqlite.models import Line, Route
 
-from .gtfs import RoutesByLine
-from .queries import ScheduledServiceRow, query_scheduled_service
-from .util import bucket_by, date_range, date_to_string, index_by
+from .queries import ScheduledServiceRow
+from .util import SortedDateIndex
+
+HOURS_PER_DAY = 24
 
 
 @dataclass
-class ServiceLevelsEntry:
+class ServiceLevels:
+    """A line's scheduled service on every day of a contiguous date range, one row per day.
+
+    Days are stored as arrays rather than one object per day: trips_by_hour[i] holds the unidirectional
+    trips per hour on start_date + i days.
+    """
+
     line_id: str
     line_short_name: str
     line_long_name: str
     route_ids: list[str]
-    service_levels: list[int]
-    has_service_exceptions: bool
-    date: date
+    start_date: date
+    # (days x 24) unidirectional trip counts
+    trips_by_hour: np.ndarray
+    # Days on which any of the line's routes had service exceptions
+    has_service_exceptions: np.ndarray
+    # Days on which any of the line's routes had scheduled service rows at all
+    has_scheduled_service: np.ndarray
 
+    def __len__(self) -> int:
+        return len(self.trips_by_hour)
 
-ServiceLevelsByDate = dict[date, ServiceLevelsEntry]
-ServiceLevelsByLineId = dict[str, ServiceLevelsByDate]
-
-
-def _divide_by_two_to_get_unidirectional_trip_counts(trip_counts: list[int]):
-    """Halve bidirectional trip counts to get unidirectional counts.
-
-    Args:
-        trip_counts: A list of bidirectional trip counts.
+    @property
+    def end_date(self) -> date:
+        return self.date_at(len(self) - 1)
 
-    Returns:
-        A list of trip counts divided by two.
-    """
-    return [count / 2 for count in trip_counts]
+    def date_at(self, index: int) -> date:
+        return self.start_date + timedelta(days=int(index))
 
+    def index_of(self, date: date) -> int:
+        """Index of a date, which may fall outside the range (negative, or past the last day)."""
+        return (date - self.start_date).days
 
-def _get_trip_count_by_hour_totals_for_day(rows_for_day: list[ScheduledServiceRow]) -> list[int]:
-    """Aggregate hourly trip counts across all routes for a single day.
+    def days_before(self, date: date) -> int:
+        """Number of days in the range before a date."""
+        return min(max(self.index_of(date), 0), len(self))
 
-    Args:
-        rows_for_day: A list of scheduled service rows for a single day.
+    @cached_property
+    def date_index(self) -> SortedDateIndex:
+        """Every day in the range, for lookback queries."""
+        return SortedDateIndex(self.date_at(index) for index in range(len(self)))
 
-    Returns:
-        A list of unidirectional trip counts per hour for the day.
-    """
-    by_hour_counts_for_day: list[list[int]] = [item["byHour"]["totals"] for item in rows_for_day]
-    bidirectional_trip_counts = [sum(hour_values) for hour_values in zip(*by_hour_counts_for_day)]
-    return _divide_by_two_to_get_unidirectional_trip_counts(bidirectional_trip_counts)
+    @cached_property
+    def typical_service_date_index(self) -> SortedDateIndex:
+        """Days without service exceptions, for lookback queries."""
+        [typical_indices] = np.nonzero(~self.has_service_exceptions)
+        return SortedDateIndex(self.date_at(index) for index in typical_indices)
 
+    def get_trips_per_hour(self, index: int) -> list[float]:
+        """Trips per hour on a day, or an empty list if nothing was scheduled for it."""
+        if not self.has_scheduled_service[index]:
+            return []
+        return self.trips_by_hour[index].tolist()
 
-def _get_has_service_exception(rows_for_day: list[ScheduledServiceRow]) -> bool:
-    """Check whether any scheduled service row for a day has service exceptions.
+    def get_total_trips(self) -> np.ndarray:
+        """Total trips on each day, rounded to an integer."""
+        return np.round(self.trips_by_hour.sum(axis=1)).astype(int)
 
-    Args:
-        rows_for_day: A list of scheduled service rows for a single day.
 
-    Returns:
-        True if any row has service exceptions, False otherwise.
-    """
-    return any(item.get("hasServiceExceptions") for item in rows_for_day)
+ServiceLevelsByLineId = dict[str, ServiceLevels]
 
 
-def get_service_level_entries_by_line_id(
-    routes_by_line: RoutesByLine,
+def get_service_level_entries_for_line(
+    line: Line,
+    routes: list[Route],
+    rows: list[ScheduledServiceRow],
     start_date: date,
     end_date: date,
-) -> ServiceLevelsByLineId:
-    """Query and aggregate service level data for all lines, organized by line ID and date.
+) -> ServiceLevels:
+    """Aggregate the scheduled service rows of a line's routes into one row per day.
 
     Args:
-        routes_by_line: A dictionary mapping Line objects to their associated routes.
-        start_date: The start date of the query range.
-        end_date: The end date of the query range.
+        line: The line the routes belong to.
+        routes: The line's routes.
+        rows: Scheduled service rows for all of the line's routes.
+        start_date: The first date to include.
+        end_date: The last date to include.
 
     Returns:
-        A dictionary mapping line IDs to dictionaries of date-to-ServiceLevelsEntry mappings.
+        The line's ServiceLevels over the date range.
     """
-    entries: dict[str, list[ServiceLevelsEntry]] = {}
-    for line, routes in (progress := tqdm(routes_by_line.items())):
-        entries.setdefault(line.line_id, [])
-        progress.set_description(f"Loading service levels for {line.line_id}")
-        results_by_date_str: dict[str, list[ScheduledServiceRow]] = bucket_by(
-            [
-                row
-                for route in routes
-                for row in query_scheduled_service(
-                    start_date=start_date,
-                    end_date=end_date,
-                    route_id=route.route_id,
-                )
-            ],
-            lambda row: row["date"],
-        )
-        for today in date_range(start_date, end_date):
-            today_str = date_to_string(today)
-            all_service_levels_today = results_by_date_str.get(today_str, [])
-            entry = ServiceLevelsEntry(
-                date=today,
-                line_id=line.line_id,
-                line_short_name=line.line_short_name,
-                line_long_name=line.line_long_name,
-                route_ids=[route.route_id for route in routes],
-                service_levels=_get_trip_count_by_hour_totals_for_day(all_service_levels_today),
-                has_service_exceptions=_get_has_service_exception(all_service_levels_today),
-            )
-            entries[line.line_id].append(entry)
-    return {line_id: index_by(entries, lambda e: e.date) for line_id, entries in entries.items()}
+    days = (end_date - start_date).days + 1
+    bidirectional_trips_by_hour = np.zeros((days, HOURS_PER_DAY))
+    has_service_exceptions = np.zeros(days, dtype=bool)
+    has_scheduled_service = np.zeros(days, dtype=bool)
+    for row in rows:
+        index = (date.fromisoformat(row["date"]) - start_date).days
+        if not 0 <= index < days:
+            continue
+        bidirectional_trips_by_hour[index] += row["byHour"]["totals"]
+        has_scheduled_service[index] = True
+        if row.get("hasServiceExceptions"):
+            has_service_exceptions[index] = True
+    return ServiceLevels(
+        line_id=line.line_id,
+        line_short_name=line.line_short_name,
+        line_long_name=line.line_long_name,
+        route_ids=[route.route_id for route in routes],
+        start_date=start_date,
+        trips_by_hour=bidirectional_trips_by_hour / 2,
+        has_service_exceptions=has_service_exceptions,
+        has_scheduled_service=has_scheduled_service,
+    )
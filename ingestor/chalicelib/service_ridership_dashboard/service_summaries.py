@@ -1,75 +1,45 @@
 from datetime import date, timedelta
 from typing import Optional
 
-from .service_levels import ServiceLevelsByDate, ServiceLevelsEntry
+from .service_levels import ServiceLevels
 from .types import ServiceSummary, ServiceSummaryForDay
 
 
-def _is_matching_service_levels_entry(
-    entry: ServiceLevelsEntry,
-    valid_date_range_inclusive: tuple[date, date],
-    matching_days_of_week: list[int],
-    require_typical_service: bool,
-) -> bool:
-    """Check whether a service levels entry matches the given date range, day-of-week, and service criteria.
-
-    Args:
-        entry: The service levels entry to check.
-        valid_date_range_inclusive: A tuple of (start_date, end_date) defining the valid range.
-        matching_days_of_week: A list of weekday integers (0=Monday, 6=Sunday) to match.
-        require_typical_service: If True, exclude entries with service exceptions.
-
-    Returns:
-        True if the entry matches all criteria.
-    """
-    valid_start_date, valid_end_date = valid_date_range_inclusive
-    return (
-        valid_start_date <= entry.date <= valid_end_date
-        and entry.date.weekday() in matching_days_of_week
-        and (not require_typical_service or not entry.has_service_exceptions)
-    )
-
-
-def _get_matching_service_levels_entry(
-    service_levels: ServiceLevelsByDate,
+def _get_matching_service_levels_index(
+    service_levels: ServiceLevels,
     start_lookback_date: date,
     max_lookback_days: int,
     matching_days_of_week: list[int],
     require_typical_service: bool,
-) -> Optional[ServiceLevelsEntry]:
-    """Find the most recent service levels entry matching the given criteria within a lookback window.
+) -> Optional[int]:
+    """Find the most recent day matching the given criteria within a lookback window.
 
     Args:
-        service_levels: A dictionary mapping dates to service level entries.
+        service_levels: The line's service levels.
         start_lookback_date: The date to start looking back from.
         max_lookback_days: The maximum number of days to look back.
         matching_days_of_week: A list of weekday integers (0=Monday, 6=Sunday) to match.
-        require_typical_service: If True, only match entries without service exceptions.
+        require_typical_service: If True, only match days without service exceptions.
 
     Returns:
-        The most recent matching ServiceLevelsEntry, or None if no match is found.
+        The index of the most recent matching day in service_levels, or None if no day matches.
     """
-    end_lookback_date = start_lookback_date - timedelta(days=max_lookback_days)
-    for lookback_date in sorted(service_levels.keys(), reverse=True):
-        if _is_matching_service_levels_entry(
-            service_levels[lookback_date],
-            (end_lookback_date, start_lookback_date),
-            matching_days_of_week,
-            require_typical_service,
-        ):
-            return service_levels[lookback_date]
-    return None
+    date_index = service_levels.typical_service_date_index if require_typical_service else service_levels.date_index
+    matching_date = date_index.latest_on_or_before(start_lookback_date, matching_days_of_week)
+    if matching_date is None or matching_date < start_lookback_date - timedelta(days=max_lookback_days):
+        return None
+    return service_levels.index_of(matching_date)
 
 
 def _is_service_cancelled_on_date(
-    service_levels: ServiceLevelsByDate,
+    service_levels: ServiceLevels,
     start_lookback_date: date,
     matching_days_of_week: list[int],
 ) -> bool:
     """Determine whether service is cancelled for the given days of week near the lookback date.
 
     Args:
-        service_levels: A dictionary mapping dates to service level entries.
+        service_levels: The line's service levels.
         start_lookback_date: The date to check around.
         matching_days_of_week: A list of weekday integers (0=Monday, 6=Sunday) to check.
 
@@ -77,7 +47,7 @@ def _is_service_cancelled_on_date(
         True if no matching service entry is found within the past 7 days.
     """
     return (
-        _get_matching_service_levels_entry(
+        _get_matching_service_levels_index(
             service_levels=service_levels,
             start_lookback_date=start_lookback_date,
             matching_days_of_week=matching_days_of_week,
@@ -90,14 +60,14 @@ def _is_service_cancelled_on_date(
 
 def _get_service_levels_summary_dict(
     start_lookback_date: date,
-    service_levels: ServiceLevelsByDate,
+    service_levels: ServiceLevels,
     matching_days_of_week: list[int],
 ) -> ServiceSummaryForDay:
     """Build a service summary for a specific day type (weekday, Saturday, or Sunday).
 
     Args:
         start_lookback_date: The date to look back from when finding service data.
-        service_levels: A dictionary mapping dates to service level entries.
+        service_levels: The line's service levels.
         matching_days_of_week: A list of weekday integers (0=Monday, 6=Sunday) to match.
 
     Returns:
@@ -113,27 +83,28 @@ def _get_service_levels_summary_dict(
             "tripsPerHour": None,
             "totalTrips": 0,
         }
-    service_levels_entry = _get_matching_service_levels_entry(
+    index = _get_matching_service_levels_index(
         start_lookback_date=start_lookback_date,
         service_levels=service_levels,
         matching_days_of_week=matching_days_of_week,
         require_typical_service=True,
         max_lookback_days=(1000 * 365),
     )
-    assert service_levels_entry is not None
+    assert index is not None
+    trips_per_hour = service_levels.get_trips_per_hour(index)
     return {
         "cancelled": False,
-        "tripsPerHour": service_levels_entry.service_levels,
-        "totalTrips": round(sum(service_levels_entry.service_levels)),
+        "tripsPerHour": trips_per_hour,
+        "totalTrips": round(sum(trips_per_hour)),
     }
 
 
-def summarize_weekly_service_around_date(date: date, service_levels: ServiceLevelsByDate) -> ServiceSummary:
+def summarize_weekly_service_around_date(date: date, service_levels: ServiceLevels) -> ServiceSummary:
     """Create a weekly service summary with breakdowns for weekday, Saturday, and Sunday.
 
     Args:
         date: The reference date to summarize service around.
-        service_levels: A dictionary mapping dates to service level entries.
+        service_levels: The line's service levels.
 
     Returns:
         A ServiceSummary dict with weekday, Saturday, and Sunday service summaries.
@@ -1,40 +1,24 @@
 from datetime import date, timedelta
+from itertools import chain
 from typing import Callable, Optional, TypeVar
 
+import numpy as np
+
 from .config import FILL_DATE_RANGES
 from .types import WeeklyMedianTimeSeries
-from .util import date_range, date_to_string
+from .util import SortedDateIndex, date_to_string
 
 Entry = TypeVar("Entry")
 EntryDict = dict[date, Entry]
 
-
-def _iterate_mondays(
-    entries: EntryDict,
-    start_date: date,
-    max_end_date: date,
-):
-    """Yield date-entry pairs for each date present in entries within the given range.
-
-    Args:
-        entries: A dictionary mapping dates to entry values.
-        start_date: The start date of the iteration range.
-        max_end_date: The maximum end date; iteration stops at the earlier of this or the max entry date.
-
-    Yields:
-        Tuples of (date, entry) for each date found in entries within the range.
-    """
-    max_found_date = max(entries.keys())
-    end_date = min(max_end_date, max_found_date)
-    for today in date_range(start_date, end_date):
-        if today in entries:
-            yield today, entries[today]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 
 def _get_entry_value_for_date(
     entries: EntryDict,
     date: date,
     entry_value_getter: Callable[[Entry], float],
+    date_index: Optional[SortedDateIndex] = None,
 ) -> Optional[float]:
     """Get the entry value for a specific date, falling back to the most recent prior date.
 
@@ -42,16 +26,18 @@ def _get_entry_value_for_date(
         entries: A dictionary mapping dates to entry values.
         date: The target date to look up.
         entry_value_getter: A callable that extracts a float value from an entry.
+        date_index: A SortedDateIndex of the entries' dates. Callers looking up many dates should build one
+            up front; otherwise the dates are sorted on a miss.
 
     Returns:
         The float value for the date, the most recent prior date's value, or None if no prior entry exists.
     """
     if date in entries:
         return entry_value_getter(entries[date])
-    for previous_date in sorted(entries.keys(), reverse=True):
-        if previous_date < date:
-            return entry_value_getter(entries[previous_date])
-    return None
+    previous_date = (date_index or SortedDateIndex(entries.keys())).latest_on_or_before(date)
+    if previous_date is None:
+        return None
+    return entry_value_getter(entries[previous_date])
 
 
 def _choose_between_previous_and_current_value(
@@ -102,19 +88,12 @@ def _find_zero_ranges_in_time_series(time_series: list[float]) -> list[tuple[int
     Returns:
         A list of (start_index, end_index) tuples for each contiguous range of zeros.
     """
-    zero_ranges = []
-    current_range_start = None
-    for i, value in enumerate(time_series):
-        if value == 0:
-            if current_range_start is None:
-                current_range_start = i
-        else:
-            if current_range_start is not None:
-                zero_ranges.append((current_range_start, i - 1))
-                current_range_start = None
-    if current_range_start is not None:
-        zero_ranges.append((current_range_start, len(time_series) - 1))
-    return zero_ranges
+    is_zero = np.asarray(time_series) == 0
+    # +1 where a run of zeros starts, -1 just past where one ends
+    edges = np.diff(np.concatenate(([False], is_zero, [False])).astype(np.int8))
+    [range_starts] = np.nonzero(edges == 1)
+    [range_ends] = np.nonzero(edges == -1)
+    return list(zip(range_starts.tolist(), (range_ends - 1).tolist()))
 
 
 def _fill_zero_ranges_in_time_series(time_series: list[float], start_date: date) -> list[float]:
@@ -141,8 +120,9 @@ def _fill_zero_ranges_in_time_series(time_series: list[float], start_date: date)
         should_fill_small_range = range_end_idx - range_start_idx <= 5
         should_fill = should_fill_special_range or should_fill_small_range
         if should_fill:
-            for i in range(range_start_idx, range_end_idx + 1):
-                altered_time_series[i] = last_non_zero_value
+            altered_time_series[range_start_idx : range_end_idx + 1] = [last_non_zero_value] * (
+                range_end_idx - range_start_idx + 1
+            )
     return altered_time_series
 
 
@@ -158,21 +138,40 @@ def _get_monday_of_week_containing_date(date: date) -> date:
     return date - timedelta(days=date.weekday())
 
 
-def _bucket_by_week(entries: dict[date, Entry]) -> dict[date, list[Entry]]:
-    """Group entries by the Monday of the week they belong to.
+def _get_weekly_medians(dates: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Find the median of the values in each Monday-to-Sunday week.
+
+    The median of a week is the value at index n // 2 of its sorted values, so weeks with an even number of
+    values take the upper of the two middle values.
 
     Args:
-        entries: A dictionary mapping dates to entry values.
+        dates: The date of each value, as datetime64[D].
+        values: The values.
 
     Returns:
-        A dictionary mapping Monday dates to lists of entries from that week.
+        The Monday of each week with values, in ascending order (as datetime64[D]), and the position of each
+        week's median in values.
     """
-    buckets: dict[date, list[Entry]] = {}
-    for today, entry in entries.items():
-        week_start = _get_monday_of_week_containing_date(today)
-        buckets.setdefault(week_start, [])
-        buckets[week_start].append(entry)
-    return buckets
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    # Day 0 of the epoch (1970-01-01) is a Thursday
+    mondays = days - (days + 3) % 7
+    order = np.lexsort((values, mondays))
+    mondays = mondays[order]
+    [week_starts] = np.nonzero(np.concatenate(([True], mondays[1:] != mondays[:-1])))
+    days_per_week = np.diff(np.append(week_starts, len(mondays)))
+    return mondays[week_starts].astype("datetime64[D]"), order[week_starts + days_per_week // 2]
+
+
+def _to_weekly_median_time_series(
+    mondays: np.ndarray,
+    medians: np.ndarray,
+    start_date: date,
+    max_end_date: date,
+) -> WeeklyMedianTimeSeries:
+    """Emit the weeks starting between start_date and max_end_date as a WeeklyMedianTimeSeries."""
+    in_range = (mondays >= np.datetime64(start_date)) & (mondays <= np.datetime64(max_end_date))
+    week_starts = np.datetime_as_string(mondays[in_range], unit="D")
+    return dict(zip(week_starts.tolist(), medians[in_range].tolist()))
 
 
 def get_weekly_median_time_series(
@@ -183,6 +182,9 @@ def get_weekly_median_time_series(
 ) -> WeeklyMedianTimeSeries:
     """Compute a weekly median time series from daily entries.
 
+    Every entry counts towards the median of its week, but only weeks starting between start_date and
+    max_end_date are included.
+
     Args:
         entries: A dictionary mapping dates to entry values.
         entry_value_getter: A callable that extracts a float value from an entry.
@@ -192,30 +194,70 @@ def get_weekly_median_time_series(
     Returns:
         A dictionary mapping date strings (yyyy-mm-dd) to weekly median values.
     """
-    weekly_buckets = _bucket_by_week(entries)
-    weekly_medians: dict[str, float] = {}
-    for week_start, week_entries in _iterate_mondays(weekly_buckets, start_date, max_end_date):
-        week_values = [entry_value_getter(entry) for entry in week_entries]
-        week_values.sort()
-        weekly_medians[date_to_string(week_start)] = week_values[len(week_values) // 2]
-    return weekly_medians
+    if not entries:
+        return {}
+    # date.toordinal is much faster than numpy's conversion of date objects
+    ordinals = np.fromiter(
+        (entry_date.toordinal() for entry_date in entries.keys()), dtype=np.int64, count=len(entries)
+    )
+    dates = (ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+    # Kept as Python objects too, so a series mixing ints and floats keeps each median's own type
+    values = np.array([entry_value_getter(entry) for entry in entries.values()], dtype=object)
+    mondays, median_positions = _get_weekly_medians(dates, values.astype(float))
+    return _to_weekly_median_time_series(mondays, values[median_positions], start_date, max_end_date)
+
+
+def get_weekly_median_time_series_for_days(
+    values: np.ndarray,
+    values_start_date: date,
+    start_date: date,
+    max_end_date: date,
+) -> WeeklyMedianTimeSeries:
+    """Compute a weekly median time series from one value per day over a contiguous date range.
+
+    Equivalent to get_weekly_median_time_series on a dict with an entry for every day.
+
+    Args:
+        values: One value per day, starting on values_start_date.
+        values_start_date: The date of the first value.
+        start_date: The start date of the time series.
+        max_end_date: The maximum end date of the time series.
+
+    Returns:
+        A dictionary mapping date strings (yyyy-mm-dd) to weekly median values.
+    """
+    if len(values) == 0:
+        return {}
+    dates = np.datetime64(values_start_date, "D") + np.arange(len(values))
+    mondays, median_positions = _get_weekly_medians(dates, values)
+    return _to_weekly_median_time_series(mondays, values[median_positions], start_date, max_end_date)
 
 
 def merge_weekly_median_time_series(many_series: list[WeeklyMedianTimeSeries]) -> WeeklyMedianTimeSeries:
     """Merge multiple weekly median time series by summing values for each week.
 
+    The weeks of all series are aligned into one array (in the order they are first seen), and each series is
+    added into it at its weeks' positions. Integer series are summed as int64. If any series has a non-integer
+    value, the array holds Python numbers instead, so each week keeps the type it would get from summing with +
+    (an int unless one of its own values is a float) and floats are added in the same order.
+
     Args:
         many_series: A list of WeeklyMedianTimeSeries dictionaries to merge.
 
     Returns:
         A single WeeklyMedianTimeSeries with summed values for each week.
     """
-    merged_series: dict[str, float] = {}
-    for series in many_series:
-        for week_start, value in series.items():
-            merged_series.setdefault(week_start, 0)
-            merged_series[week_start] += value
-    return merged_series
+    many_series = [series for series in many_series if series]
+    weeks = dict.fromkeys(chain.from_iterable(many_series))
+    week_positions = {week: position for position, week in enumerate(weeks)}
+    values_by_series = [np.array(list(series.values())) for series in many_series]
+    if not all(values.dtype.kind in "iu" for values in values_by_series):
+        values_by_series = [np.array(list(series.values()), dtype=object) for series in many_series]
+    totals = np.zeros(len(week_positions), dtype=values_by_series[0].dtype if values_by_series else np.int64)
+    for series, values in zip(many_series, values_by_series):
+        # Weeks are unique within a series, so fancy-indexed addition doesn't drop repeats
+        totals[[week_positions[week] for week in series]] += values
+    return dict(zip(week_positions, totals.tolist()))
 
 
 def get_weekly_median_time_series_entry_for_date(series: WeeklyMedianTimeSeries, date: date) -> Optional[float]:
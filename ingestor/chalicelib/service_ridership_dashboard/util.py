@@ -1,5 +1,6 @@
+from bisect import bisect_right
 from datetime import date, datetime, timedelta
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 
 from .types import LineKind, ModeKind
 
@@ -65,6 +66,44 @@ def date_range(start_date: date, end_date: date):
         now = now + timedelta(days=1)
 
 
+class SortedDateIndex:
+    """Dates sorted once, with binary-search lookups for the latest date on or before a given date.
+
+    The dates falling on each day of the week are kept as their own sorted subsequence, so lookups restricted to
+    some days of the week are also O(log n).
+    """
+
+    def __init__(self, dates: Iterable[date]):
+        self.dates = sorted(dates)
+        self._dates_by_weekday: list[list[date]] = [[] for _ in range(7)]
+        for day in self.dates:
+            self._dates_by_weekday[day.weekday()].append(day)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def latest_on_or_before(self, date: date, days_of_week: Optional[Iterable[int]] = None) -> Optional[date]:
+        """Find the latest date on or before the given date, optionally only among some days of the week.
+
+        Args:
+            date: The date to look back from.
+            days_of_week: Weekday integers (0=Monday, 6=Sunday) to restrict the lookup to, or None for all dates.
+
+        Returns:
+            The latest matching date, or None if there is none.
+        """
+        if days_of_week is None:
+            candidates = [self.dates]
+        else:
+            candidates = [self._dates_by_weekday[weekday] for weekday in days_of_week]
+        latest = None
+        for dates in candidates:
+            index = bisect_right(dates, date)
+            if index and (latest is None or dates[index - 1] > latest):
+                latest = dates[index - 1]
+        return latest
+
+
 def date_range_contains(containing: Tuple[date, date], contained: Tuple[date, date]):
     (containing_from, containing_to) = containing
     (contained_from, contained_to) = contained
@@ -1,20 +1,45 @@
-import csv
+import hashlib
+import json
 import zipfile
 from dataclasses import dataclass
 from datetime import date, datetime
-from io import BytesIO, TextIOWrapper
 from pathlib import PurePath
+from tempfile import NamedTemporaryFile
 from typing import Dict, Iterator, List, Tuple, Union
 
 import boto3
+import pandas as pd
 import requests
 
+from chalicelib import instrumentation, s3
+
 CSV_ZIP_URL = "https://www.arcgis.com/sharing/rest/content/items/d73ed67e4cc84a84b818ea2c5caef696/data"
 
+# Remembers which monthly CSVs and (line, date) buckets were already written, so unchanged ones are skipped.
+MANIFEST_BUCKET = "tm-mbta-performance"
+MANIFEST_KEY = "SpeedRestrictions/manifest.json.gz"
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 EntryKey = Tuple[str, date]
 
 DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y"]
 
+CSV_COLUMNS = [
+    "ID",
+    "Line",
+    "Branch",
+    "Calendar_Date",
+    "Date_Restriction_Reported",
+    "Loc_GTFS_Stop_ID",
+    "Location_Description",
+    "Track_Direction",
+    "Restriction_Reason",
+    "Restriction_Speed_MPH",
+    "Restriction_Distance_Feet",
+    "Restriction_Status",
+]
+
 
 def parse_date(date_string: str) -> date:
     """Parse a date string, trying multiple formats."""
@@ -26,6 +51,24 @@ def parse_date(date_string: str) -> date:
     raise ValueError(f"Unable to parse date: {date_string}")
 
 
+def parse_date_series(values: pd.Series) -> pd.Series:
+    """Vectorized parse_date.
+
+    Each format is tried once against the whole column, and only values it couldn't parse fall through to the
+    next format. A column in a single format (the usual case) is parsed in one pass.
+    """
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors="coerce")
+    unparsed = parsed.isna()
+    if unparsed.any():
+        raise ValueError(f"Unable to parse date: {values[unparsed].iloc[0]}")
+    return parsed.dt.date
+
+
 @dataclass
 class SpeedRestrictionEntry:
     id: str
@@ -59,36 +102,36 @@ class SpeedRestrictionEntry:
         return (self.line_id, self.date)
 
 
-def parse_restriction_row_to_entry(row: Dict[str, str]) -> Union[None, SpeedRestrictionEntry]:
-    try:
-        [from_stop_id, to_stop_id] = [s.strip() for s in row["Loc_GTFS_Stop_ID"].split("|")]
-    except ValueError:
-        from_stop_id = row["Loc_GTFS_Stop_ID"].strip()
-        to_stop_id = None
-    branch = row["Branch"].strip()
-    line_raw = row["Line"].replace("Line", "").strip()
-    if "Mattapan" in branch:
-        line_raw = "Mattapan"
-    date = parse_date(row["Calendar_Date"])
-    reported = parse_date(row["Date_Restriction_Reported"])
-    speed_mph = int(row["Restriction_Speed_MPH"].replace("mph", "").strip())
-    track_feet = int(float(row["Restriction_Distance_Feet"]))
-    status = row["Restriction_Status"].lower()
-    if "clear" in status:
-        return None
-    return SpeedRestrictionEntry(
-        id=row["ID"],
-        line_id=f"line-{line_raw}",
-        reported=reported,
-        date=date,
-        speed_mph=speed_mph,
-        track_feet=track_feet,
-        from_stop_id=from_stop_id,
-        to_stop_id=to_stop_id,
-        description=row["Location_Description"],
-        direction=row["Track_Direction"],
-        reason=row["Restriction_Reason"],
+def parse_restriction_frame_to_entries(df: pd.DataFrame) -> Iterator[SpeedRestrictionEntry]:
+    """Parse a frame of raw CSV rows (all columns as strings). Cleared restrictions are dropped."""
+    if df.empty:
+        return
+    stop_parts = df["Loc_GTFS_Stop_ID"].str.split("|")
+    is_pair = stop_parts.str.len() == 2
+    from_stop_id = df["Loc_GTFS_Stop_ID"].str.strip().where(~is_pair, stop_parts.str[0].str.strip())
+    to_stop_id = stop_parts.str[1].str.strip().where(is_pair, None)
+
+    line_raw = df["Line"].str.replace("Line", "").str.strip()
+    line_raw = line_raw.where(~df["Branch"].str.strip().str.contains("Mattapan"), "Mattapan")
+
+    parsed = pd.DataFrame(
+        {
+            "id": df["ID"],
+            "date": parse_date_series(df["Calendar_Date"]),
+            "line_id": "line-" + line_raw,
+            "description": df["Location_Description"],
+            "direction": df["Track_Direction"],
+            "reason": df["Restriction_Reason"],
+            "from_stop_id": from_stop_id,
+            "to_stop_id": to_stop_id,
+            "reported": parse_date_series(df["Date_Restriction_Reported"]),
+            "speed_mph": df["Restriction_Speed_MPH"].str.replace("mph", "").str.strip().astype(int),
+            "track_feet": df["Restriction_Distance_Feet"].astype(float).astype(int),
+        }
     )
+    parsed = parsed[~df["Restriction_Status"].str.lower().str.contains("clear")]
+    for record in parsed.to_dict(orient="records"):
+        yield SpeedRestrictionEntry(**record)
 
 
 def bucket_entries_by_key(entries: Iterator[SpeedRestrictionEntry]) -> Dict[EntryKey, List[SpeedRestrictionEntry]]:
@@ -110,29 +153,73 @@ def csv_is_too_old(csv_file_name: str, max_lookback_months: Union[None, int]) ->
     return (date.today() - csv_date).days > (1 + max_lookback_months) * 30
 
 
-def load_speed_restriction_entries(max_lookback_days: Union[None, int]) -> Iterator[SpeedRestrictionEntry]:
-    req = requests.get(CSV_ZIP_URL)
-    zip_file = zipfile.ZipFile(BytesIO(req.content))
-    for csv_file_name in zip_file.namelist():
-        if not csv_file_name.endswith(".csv") or csv_is_too_old(csv_file_name, max_lookback_days):
-            continue
-        print(csv_file_name)
-        csv_file = zip_file.open(csv_file_name)
-        rows = csv.DictReader(TextIOWrapper(csv_file), delimiter=",")
-        for row in rows:
-            entry = parse_restriction_row_to_entry(row)
-            if entry:
-                yield entry
-
-
-def update_speed_restrictions(max_lookback_months: Union[None, int]):
-    entries = load_speed_restriction_entries(max_lookback_months)
+def csv_content_hash(info: zipfile.ZipInfo) -> str:
+    """Content fingerprint of a zip member, read from the zip directory without decompressing it."""
+    return f"{info.CRC:08x}-{info.file_size}"
+
+
+def zones_hash(zones: List[dict]) -> str:
+    return hashlib.sha1(json.dumps(zones, sort_keys=True).encode("utf8")).hexdigest()
+
+
+def download_speed_restrictions_zip(zip_file):
+    """Stream the ArcGIS export into an open binary file, without holding it in memory."""
+    with requests.get(CSV_ZIP_URL, stream=True) as req:
+        req.raise_for_status()
+        for chunk in req.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            zip_file.write(chunk)
+    zip_file.flush()
+
+
+def load_speed_restriction_entries(
+    max_lookback_days: Union[None, int], csv_hashes: Union[None, Dict[str, str]] = None
+) -> Iterator[SpeedRestrictionEntry]:
+    """Yield entries from every recent CSV in the export.
+
+    If csv_hashes is given, CSVs whose content hash matches are skipped, and the dict is updated in place
+    with the hashes of the CSVs that were read.
+    """
+    with NamedTemporaryFile(suffix=".zip") as tmp:
+        download_speed_restrictions_zip(tmp)
+        with zipfile.ZipFile(tmp.name) as zip_file:
+            for info in zip_file.infolist():
+                csv_file_name = info.filename
+                if not csv_file_name.endswith(".csv") or csv_is_too_old(csv_file_name, max_lookback_days):
+                    continue
+                content_hash = csv_content_hash(info)
+                if csv_hashes is not None and csv_hashes.get(csv_file_name) == content_hash:
+                    print(f"{csv_file_name} unchanged, skipping")
+                    continue
+                print(csv_file_name)
+                with zip_file.open(info) as csv_file:
+                    df = pd.read_csv(
+                        csv_file, usecols=CSV_COLUMNS, dtype=str, keep_default_na=False, encoding="utf-8-sig"
+                    )
+                yield from parse_restriction_frame_to_entries(df)
+                if csv_hashes is not None:
+                    csv_hashes[csv_file_name] = content_hash
+
+
+@instrumentation.instrumented()
+def update_speed_restrictions(max_lookback_months: Union[None, int], force: bool = False):
+    """Write (line, date) buckets of speed restrictions to Dynamo.
+
+    Only CSVs and buckets that changed since the last run are processed and written, unless force is set.
+    """
+    empty_manifest = {"csvs": {}, "buckets": {}}
+    manifest = empty_manifest if force else s3.download_manifest(MANIFEST_BUCKET, MANIFEST_KEY, empty_manifest)
+    entries = load_speed_restriction_entries(max_lookback_months, manifest["csvs"])
     buckets = bucket_entries_by_key(entries)
     dynamodb = boto3.resource("dynamodb")
     SpeedRestrictions = dynamodb.Table("SpeedRestrictions")
+    written = 0
     with SpeedRestrictions.batch_writer() as batch:
         for (line_id, current_date), entries in buckets.items():
             zones = [entry.to_json() for entry in entries]
+            bucket_key = f"{line_id}|{current_date.isoformat()}"
+            bucket_hash = zones_hash(zones)
+            if manifest["buckets"].get(bucket_key) == bucket_hash:
+                continue
             batch.put_item(
                 Item={
                     "lineId": line_id,
@@ -140,7 +227,11 @@ def update_speed_restrictions(max_lookback_months: Union[None, int]):
                     "zones": {"zones": zones},
                 }
             )
+            manifest["buckets"][bucket_key] = bucket_hash
+            written += 1
+    print(f"Wrote {written} of {len(buckets)} speed restriction buckets")
+    s3.upload_manifest(MANIFEST_BUCKET, MANIFEST_KEY, manifest)
 
 
 if __name__ == "__main__":
-    update_speed_restrictions(max_lookback_months=None)
+    update_speed_restrictions(max_lookback_months=None, force=True)
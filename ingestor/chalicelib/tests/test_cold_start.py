@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+INGESTOR_DIR = Path(__file__).resolve().parents[2]
+
+# The frequent, small jobs must not pull in heavy dependencies on cold start.
+LIGHT_MODULES = ["chalicelib.alerts", "chalicelib.bluebikes", "chalicelib.weather"]
+HEAVY_MODULES = ["pandas", "numpy", "sqlalchemy", "mbta_gtfs_sqlite"]
+
+
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_light_modules_skip_heavy_imports(module):
+    # Run in a fresh interpreter, since this test process has already imported pandas et al.
+    script = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=INGESTOR_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
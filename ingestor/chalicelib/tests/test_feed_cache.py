@@ -0,0 +1,61 @@
+from mbta_gtfs_sqlite.models import Line, Route, RouteType, Stop
+from mbta_gtfs_sqlite.session import create_sqlalchemy_session
+
+from ..gtfs import feed_cache
+
+
+def _row(model, **values):
+    # Fill in the required columns these tests don't care about
+    for column in model.__table__.columns:
+        if not column.nullable and not column.primary_key and column.key not in values:
+            values[column.key] = 1 if column.key == "feed_info_id" else column.type.python_type()
+    return model(**values)
+
+
+def _make_session(path):
+    session = create_sqlalchemy_session(str(path))
+    session.add_all(
+        [
+            _row(Line, line_id="line-Red", line_long_name="Red Line"),
+            _row(Route, route_id="Red", line_id="line-Red", route_type=RouteType.METRO),
+            _row(Stop, stop_id="1", platform_name="Shuttle Bus", stop_lat=42.1, stop_lon=-71.1),
+            _row(Stop, stop_id="2", platform_name="Alewife", stop_lat=42.2, stop_lon=-71.2),
+        ]
+    )
+    session.commit()
+    return session
+
+
+def test_feed_index_is_built_once_then_read_from_tmp(tmp_path, monkeypatch):
+    session = _make_session(tmp_path / "gtfs.sqlite3")
+    built = []
+    monkeypatch.setattr(feed_cache, "LOCAL_ARCHIVE_PATH", str(tmp_path / "archive"))
+    monkeypatch.setattr(feed_cache, "_used_feed_keys", set())
+    monkeypatch.setattr(feed_cache, "_download_feed_index", lambda feed_key: None)
+    monkeypatch.setattr(feed_cache, "get_session", lambda feed_key, compact: built.append(feed_key) or session)
+
+    for _ in range(2):
+        feed_cache.get_feed_index.cache_clear()
+        index = feed_cache.get_feed_index("20240101")
+        assert [(route.route_id, route.line_id, route.route_type) for route in index.routes] == [
+            ("Red", "line-Red", RouteType.METRO)
+        ]
+        assert [line.line_long_name for line in index.lines] == ["Red Line"]
+        assert [(stop.stop_id, stop.stop_lat) for stop in index.shuttle_stops] == [("1", 42.1)]
+    assert built == ["20240101"]
+    feed_cache.get_feed_index.cache_clear()
+
+
+def test_feeds_not_used_by_this_process_are_removed(tmp_path, monkeypatch):
+    archive = tmp_path / "archive"
+    for feed_key in ("20231201", "20240101"):
+        (archive / feed_key).mkdir(parents=True)
+        (archive / feed_key / "gtfs.sqlite3").touch()
+    monkeypatch.setattr(feed_cache, "LOCAL_ARCHIVE_PATH", str(archive))
+    monkeypatch.setattr(feed_cache, "_used_feed_keys", set())
+
+    feed_cache._use_feed("20240101")
+    assert sorted(path.name for path in archive.iterdir()) == ["20240101"]
+    (archive / "20240201").mkdir()
+    feed_cache._use_feed("20240201")
+    assert sorted(path.name for path in archive.iterdir()) == ["20240101", "20240201"]
@@ -0,0 +1,102 @@
+import json
+import logging
+
+import pytest
+
+from .. import instrumentation, s3
+
+
+def get_logged_stages(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records if record.name == instrumentation.__name__]
+
+
+def test_stage_logs_duration_and_counts(caplog):
+    caplog.set_level(logging.INFO, logger=instrumentation.__name__)
+    with instrumentation.stage("test.outer", line="line-red") as outer:
+        outer.record(items=2)
+        with instrumentation.stage("test.inner"):
+            # Counted into the innermost stage only
+            instrumentation.record(items=3, bytes=100, retries=1)
+        instrumentation.record(bytes=10)
+
+    inner, logged_outer = get_logged_stages(caplog)
+    assert inner["stage"] == "test.inner"
+    assert (inner["items"], inner["bytes"], inner["retries"]) == (3, 100, 1)
+    assert logged_outer["stage"] == "test.outer"
+    assert (logged_outer["items"], logged_outer["bytes"], logged_outer["retries"]) == (2, 10, 0)
+    assert logged_outer["line"] == "line-red"
+    assert logged_outer["status"] == "ok"
+    assert outer.duration is not None and logged_outer["duration_ms"] >= inner["duration_ms"]
+
+
+def test_stage_logs_errors_and_reraises(caplog):
+    caplog.set_level(logging.INFO, logger=instrumentation.__name__)
+    with pytest.raises(ValueError):
+        with instrumentation.stage("test.failing"):
+            raise ValueError("boom")
+    [logged] = get_logged_stages(caplog)
+    assert logged["status"] == "error"
+    assert logged["error"] == "ValueError"
+
+
+def test_timed_parts_accumulate_across_passes(caplog, monkeypatch):
+    caplog.set_level(logging.INFO, logger=instrumentation.__name__)
+    clock = iter(range(100))
+    monkeypatch.setattr(instrumentation.time, "perf_counter", lambda: next(clock))
+    with instrumentation.stage("test.loop") as stage:
+        for _ in range(3):
+            with stage.timed("compute"):
+                pass
+            with stage.timed("write"):
+                next(clock)
+    [logged] = get_logged_stages(caplog)
+    assert stage.timings == {"compute": 3, "write": 6}
+    assert logged["timings_ms"] == {"compute": 3000, "write": 6000}
+
+
+def test_record_outside_a_stage_is_a_no_op():
+    assert instrumentation.current_stage() is None
+    instrumentation.record(items=1)
+
+
+def test_instrumented_names_stages_after_the_function(caplog):
+    caplog.set_level(logging.INFO, logger=instrumentation.__name__)
+
+    @instrumentation.instrumented()
+    def add(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    [logged] = get_logged_stages(caplog)
+    assert logged["stage"] == f"{__name__.removeprefix('chalicelib.')}.{add.__qualname__}"
+
+
+def test_get_many_counts_reads_into_the_callers_stage():
+    def read(bucket, key):
+        instrumentation.record(items=1, bytes=len(key))
+        return key
+
+    with instrumentation.stage("test.get_many") as stage:
+        results = dict(s3.get_many("bucket", ["a", "bb", "ccc"], read=read, max_workers=2))
+    assert results == {"a": "a", "bb": "bb", "ccc": "ccc"}
+    assert (stage.items, stage.bytes) == (3, 6)
+
+
+@pytest.mark.parametrize(
+    "environ,backend",
+    [
+        ({}, instrumentation.NoopBackend),
+        ({"AWS_LAMBDA_FUNCTION_NAME": "ingestor-prod"}, instrumentation.DatadogBackend),
+        ({"AWS_LAMBDA_FUNCTION_NAME": "ingestor-prod", "DD_TRACE_ENABLED": "false"}, instrumentation.NoopBackend),
+    ],
+)
+def test_backend_is_datadog_only_in_lambda(monkeypatch, environ, backend):
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_NAME", raising=False)
+    monkeypatch.delenv("DD_TRACE_ENABLED", raising=False)
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+    instrumentation.get_backend.cache_clear()
+    try:
+        assert isinstance(instrumentation.get_backend(), backend)
+    finally:
+        instrumentation.get_backend.cache_clear()
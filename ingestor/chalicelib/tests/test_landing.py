@@ -0,0 +1,68 @@
+import gzip
+
+from botocore.stub import ANY, Stubber
+
+from .. import constants, dynamo, landing, s3
+
+
+def test_landing_queries_use_the_low_level_client():
+    client = dynamo.get_resource().meta.client
+    with Stubber(client) as stubber:
+        stubber.add_response(
+            "query",
+            {"Items": [{"lineId": {"S": "line-red"}, "date": {"S": "2024-01-01"}, "count": {"N": "12"}}]},
+            {
+                "TableName": "Ridership",
+                "KeyConditionExpression": ANY,
+                "ExpressionAttributeNames": {"#partition": "lineId", "#date": "date"},
+                "ExpressionAttributeValues": {
+                    ":partition": {"S": "line-red"},
+                    ":start": {"S": constants.ninety_days_ago_string()},
+                    ":end": {"S": constants.one_week_ago_string()},
+                },
+            },
+        )
+        assert landing.query_landing_ridership_data("line-red") == [
+            {"lineId": "line-red", "date": "2024-01-01", "count": 12}
+        ]
+        stubber.assert_no_pending_responses()
+
+
+def test_upload_to_s3_uploads_once_and_copies_to_other_buckets(monkeypatch):
+    # One worker keeps the stubbed responses in order
+    monkeypatch.setattr(landing, "THREAD_COUNT", 1)
+    [source_bucket, copy_bucket] = landing.BUCKETS
+    bodies = {}
+    client = s3.get_client()
+
+    def record_body(params, **kwargs):
+        if "Body" in params:
+            bodies[params["Key"]] = gzip.decompress(params["Body"]).decode("utf8")
+
+    client.meta.events.register("provide-client-params.s3.PutObject", record_body)
+    try:
+        with Stubber(client) as stubber:
+            for key in (landing.RIDERSHIP_KEY_JSON, landing.TRIP_METRICS_KEY_JSON):
+                stubber.add_response(
+                    "put_object",
+                    {},
+                    {
+                        "Bucket": source_bucket,
+                        "Key": key,
+                        "Body": ANY,
+                        "ContentType": ANY,
+                        "ContentEncoding": "gzip",
+                        "CacheControl": ANY,
+                    },
+                )
+            for key in (landing.RIDERSHIP_KEY_JSON, landing.TRIP_METRICS_KEY_JSON):
+                stubber.add_response(
+                    "copy_object",
+                    {},
+                    {"CopySource": {"Bucket": source_bucket, "Key": key}, "Bucket": copy_bucket, "Key": key},
+                )
+            landing.upload_to_s3('{"trip": 1}', '{"ridership": 2}')
+            stubber.assert_no_pending_responses()
+    finally:
+        client.meta.events.unregister("provide-client-params.s3.PutObject", record_body)
+    assert bodies == {landing.RIDERSHIP_KEY_JSON: '{"ridership": 2}', landing.TRIP_METRICS_KEY_JSON: '{"trip": 1}'}
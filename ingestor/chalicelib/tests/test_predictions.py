@@ -0,0 +1,80 @@
+import io
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from .. import predictions, s3
+
+HEADER = "weekly,mode,route_id,bin,arrival_departure,num_predictions,num_accurate_predictions"
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        data = self.objects[(Bucket, Key)]
+        return {"Body": StreamingBody(io.BytesIO(data), len(data))}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+        return {}
+
+
+class FakeTable:
+    def __init__(self):
+        self.items = []
+
+    @contextmanager
+    def batch_writer(self):
+        yield self
+
+    def put_item(self, Item):
+        self.items.append(Item)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        # The export starts with a UTF-8 BOM
+        self.raw = io.BytesIO(("﻿" + text).encode("utf8"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+
+def _csv(red_accurate):
+    rows = [
+        f"2024-01-01 00:00:00,subway,Red,0-3 min,arrival,100,{red_accurate}",
+        "2024-01-01 00:00:00,subway,Orange,0-3 min,arrival,100,80",
+        "2024-01-08 00:00:00,subway,Orange,0-3 min,arrival,100,85",
+    ]
+    return "\n".join([HEADER, *rows]) + "\n"
+
+
+def test_unchanged_buckets_are_skipped_and_changed_ones_rewritten(monkeypatch):
+    client = FakeS3Client()
+    table = FakeTable()
+    monkeypatch.setattr(s3, "get_client", lambda: client)
+    monkeypatch.setattr(predictions.boto3, "resource", lambda name: SimpleNamespace(Table=lambda name: table))
+
+    def update(csv_text):
+        table.items.clear()
+        monkeypatch.setattr(predictions.requests, "get", lambda url, stream: FakeResponse(csv_text))
+        predictions.update_predictions()
+        return sorted((item["routeId"], item["week"]) for item in table.items)
+
+    assert update(_csv(90)) == [("Orange", "2024-01-01"), ("Orange", "2024-01-08"), ("Red", "2024-01-01")]
+    # The same export again: nothing is rewritten
+    assert update(_csv(90)) == []
+    # One row changed: only its bucket is rewritten
+    assert update(_csv(91)) == [("Red", "2024-01-01")]
@@ -0,0 +1,115 @@
+import random
+from types import SimpleNamespace
+
+from ..ridership.dynamo import get_changed_entries
+from ..ridership.ingest import get_ridership_by_line_id
+
+
+def _route(route_id):
+    return SimpleNamespace(route_id=route_id)
+
+
+def test_get_ridership_by_line_id():
+    ridership_by_route_id = {
+        "Green": [{"date": "2024-01-08", "count": 2}, {"date": "2024-01-01", "count": 10}],
+        "Mattapan": [{"date": "2024-01-01", "count": 1}],
+        "CR-Lowell": [{"date": "2024-01-01", "count": 5.0}],
+        "Boat-F1": [{"date": "2024-01-08", "count": 3.0}, {"date": "2024-01-01", "count": 4.0}],
+        "Boat-F4": [{"date": "2024-01-01", "count": 6.0}],
+        "RIDE": [{"date": "2024-01-08", "count": 7.0}, {"date": "2024-01-01", "count": 8.0}],
+        "1": [{"date": "2024-01-01", "count": 100}],
+        "741": [{"date": "2024-01-01", "count": 20}],
+    }
+    routes_by_line_id = {
+        "line-Green": [_route("Green-B"), _route("Green-C")],
+        "line-commuter-rail": [_route("CR-Lowell")],
+        "line-1": [_route("1")],
+        "line-Orange": [_route("Orange")],
+    }
+    by_line_id = get_ridership_by_line_id(ridership_by_route_id, routes_by_line_id)
+    assert by_line_id == {
+        "line-Green": [{"date": "2024-01-01", "count": 10}, {"date": "2024-01-08", "count": 2}],
+        "line-commuter-rail": [{"date": "2024-01-01", "count": 5.0}],
+        "line-1": [{"date": "2024-01-01", "count": 100}],
+        "line-Orange": [],
+        "line-RIDE": [{"date": "2024-01-01", "count": 8.0}, {"date": "2024-01-08", "count": 7.0}],
+        "line-ferry": [{"date": "2024-01-01", "count": 10.0}, {"date": "2024-01-08", "count": 3.0}],
+        "line-bus": [{"date": "2024-01-01", "count": 120}],
+    }
+    assert type(by_line_id["line-bus"][0]["count"]) is int
+    assert type(by_line_id["line-ferry"][0]["count"]) is float
+
+
+def _sum_by_date(entries):
+    """Sum counts per date with plain Python addition, in entry order."""
+    sums = {}
+    for entry in entries:
+        sums[entry["date"]] = sums.get(entry["date"], 0) + entry["count"]
+    return [{"date": date, "count": sums[date]} for date in sorted(sums)]
+
+
+def test_get_ridership_by_line_id_matches_python_sums():
+    rng = random.Random(0)
+    weeks = [f"2024-{month:02}-{day:02}" for month in range(1, 13) for day in (1, 8, 15, 22)]
+
+    def entries(as_float):
+        # CR and ferry counts are rounded floats, subway and bus counts are ints
+        return [
+            {"date": week, "count": float(rng.randrange(20_000)) if as_float else rng.randrange(20_000)}
+            for week in weeks
+        ]
+
+    ridership_by_route_id = {route_id: entries(False) for route_id in ["Red", "Green", "Mattapan", "1", "2", "741"]}
+    ridership_by_route_id.update(
+        {route_id: entries(True) for route_id in ["CR-Lowell", "CR-Needham", "Boat-F1", "Boat-F4"]}
+    )
+    ridership_by_route_id["RIDE"] = entries(True)
+    routes_by_line_id = {
+        "line-Red": [_route("Red")],
+        "line-Green": [_route("Green-B")],
+        "line-commuter-rail": [_route("CR-Lowell"), _route("CR-Needham")],
+        "line-1": [_route("1")],
+        "line-SLWaterfront": [_route("741")],
+    }
+    by_line_id = get_ridership_by_line_id(ridership_by_route_id, routes_by_line_id)
+
+    def summed(*route_ids):
+        return _sum_by_date([entry for route_id in route_ids for entry in ridership_by_route_id[route_id]])
+
+    expected = {
+        "line-Red": summed("Red"),
+        "line-Green": summed("Green"),
+        "line-commuter-rail": summed("CR-Lowell", "CR-Needham"),
+        "line-1": summed("1"),
+        "line-SLWaterfront": summed("741"),
+        "line-RIDE": ridership_by_route_id["RIDE"],
+        "line-ferry": summed("Boat-F1", "Boat-F4"),
+        "line-bus": summed("1", "2", "741"),
+    }
+    assert by_line_id == expected
+    assert list(by_line_id) == list(expected)
+    for line_id, line_entries in expected.items():
+        assert [type(entry["count"]) for entry in by_line_id[line_id]] == [
+            type(entry["count"]) for entry in line_entries
+        ]
+
+
+def test_get_ridership_by_line_id_without_ridership():
+    assert get_ridership_by_line_id({}, {"line-Red": [_route("Red")]}) == {"line-Red": []}
+
+
+def test_only_new_or_changed_entries_are_written():
+    snapshot = {"line-Red": {"2024-01-01": 10, "2024-01-08": 20}}
+    entries_by_line_id = {
+        "line-Red": [
+            {"date": "2024-01-01", "count": 10.0},
+            {"date": "2024-01-08", "count": 21},
+            {"date": "2024-01-15", "count": 30},
+        ],
+        "line-Blue": [{"date": "2024-01-01", "count": 5}],
+        "line-Orange": [],
+    }
+    assert get_changed_entries(entries_by_line_id, snapshot) == {
+        "line-Red": [{"date": "2024-01-08", "count": 21}, {"date": "2024-01-15", "count": 30}],
+        "line-Blue": [{"date": "2024-01-01", "count": 5}],
+    }
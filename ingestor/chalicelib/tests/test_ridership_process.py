@@ -0,0 +1,83 @@
+import pandas as pd
+
+from ..ridership import process
+from ..ridership.config import RIDERSHIP_CSV_SCHEMAS
+
+
+def _write_cr_csv(path, boardings_by_date=None):
+    dates = pd.date_range("2024-01-01", "2024-01-21")
+    boardings_by_date = boardings_by_date or {}
+    rows = [
+        {
+            "servicedate": d.strftime("%Y-%m-%d"),
+            "line": line,
+            "estimated_boardings": boardings_by_date.get(d.strftime("%Y-%m-%d"), i),
+            "trip_name": f"trip-{i}",
+        }
+        for i, d in enumerate(dates)
+        for line in ["Fitchburg", "Lowell"]
+    ]
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def test_read_ridership_csv_prunes_and_types_columns(tmp_path):
+    path = tmp_path / "cr.csv"
+    _write_cr_csv(path)
+    df = process.read_ridership_csv(path, RIDERSHIP_CSV_SCHEMAS["cr"])
+    assert list(df.columns) == ["servicedate", "line", "estimated_boardings"]
+    assert df["servicedate"].dtype == "datetime64[ns]"
+    assert df["estimated_boardings"].dtype == "float64"
+
+
+def test_chunked_read_matches_full_read(tmp_path, monkeypatch):
+    path = tmp_path / "cr.csv"
+    _write_cr_csv(path)
+    full = process.format_cr_data(path)
+    monkeypatch.setattr(process, "CHUNKED_READ_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(process, "CHUNKED_READ_ROWS", 5)
+    assert process.format_cr_data(path) == full
+
+
+def test_format_cr_data_weekly_peak_average(tmp_path):
+    path = tmp_path / "cr.csv"
+    # A busy MLK Day would pull the week's average up to 33 if the holiday counted as a peak day
+    _write_cr_csv(path, {"2024-01-15": 100})
+    by_route = process.format_cr_data(path)
+    assert set(by_route.keys()) == {"CR-Fitchburg", "CR-Lowell"}
+    # Week of 2024-01-15: MLK Day (the 15th) is a holiday, so peak days are the 16th-19th (values 15-18)
+    week = next(entry for entry in by_route["CR-Lowell"] if entry["date"] == "2024-01-15")
+    assert week["count"] == 16.0
+
+
+def test_weeks_without_a_monday_are_dropped():
+    # Starts on a Tuesday, so the first week has no Monday to label it with
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-02", "2024-01-12"),
+            "route": "1",
+            "count": [10.0, None, 20.0, 30.0, 0.0, 0.0, 40.0, 40.0, 40.0, 40.0, 40.0],
+        }
+    )
+    averages = process.weekly_peak_averages(df, "date", "route", "count")
+    by_route = process.group_entries_by_route(
+        averages, "date", "route", "count", route_id_for=lambda route: f"route-{route}", missing_counts_as_zero=True
+    )
+    assert by_route == {"route-1": [{"date": "2024-01-08", "count": 40}]}
+
+
+def test_sources_can_be_paths_files_or_frames(tmp_path):
+    path = tmp_path / "ferry.csv"
+    departures = pd.date_range("2024-01-01 07:00", "2024-01-28 07:00", freq="12h")
+    raw = pd.DataFrame(
+        {
+            "actual_departure": departures.strftime("%Y-%m-%d %H:%M:%S"),
+            "route_id": "F1",
+            "pax_on": range(len(departures)),
+        }
+    )
+    raw.to_csv(path, index=False)
+    from_path = process.format_ferry_data(path)
+    with open(path) as f:
+        assert process.format_ferry_data(f) == from_path
+    assert process.format_ferry_data(raw) == from_path
+    assert set(from_path.keys()) == {"Boat-F1"}
@@ -0,0 +1,173 @@
+import gzip
+import io
+import json
+import random
+import threading
+import time
+import zlib
+
+import pandas as pd
+import pytest
+from botocore.response import StreamingBody
+
+from .. import s3
+
+
+class FakeClient:
+    """Records calls and keeps objects in memory, for the handful of S3 operations the stream helpers use."""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+        self.parts = {}
+
+    def get_object(self, Bucket, Key):
+        data = self.objects[(Bucket, Key)]
+        return {"Body": StreamingBody(io.BytesIO(data), len(data))}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append(("put_object", kwargs))
+        self.objects[(Bucket, Key)] = Body
+        return {"ETag": "etag"}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.calls.append(("create_multipart_upload", kwargs))
+        self.parts[Key] = []
+        return {"UploadId": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append(("upload_part", PartNumber))
+        self.parts[UploadId].append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append(("complete_multipart_upload", MultipartUpload))
+        self.objects[(Bucket, Key)] = b"".join(self.parts.pop(UploadId))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append(("abort_multipart_upload", UploadId))
+        self.parts.pop(UploadId)
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix, Delimiter=None, page_size=2):
+        """Pages of list_objects_v2, with empty listings missing Contents like the real thing."""
+        self.calls.append(("list_objects_v2", Prefix))
+        keys, prefixes = [], []
+        for bucket, key in sorted(self.objects):
+            if bucket != Bucket or not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix) :]
+            if Delimiter and Delimiter in rest:
+                prefix = Prefix + rest.split(Delimiter)[0] + Delimiter
+                if prefix not in prefixes:
+                    prefixes.append(prefix)
+            else:
+                keys.append(key)
+        if not keys and not prefixes:
+            yield {"KeyCount": 0}
+        for start in range(0, max(len(keys), len(prefixes)), page_size):
+            page = {"Contents": [{"Key": key} for key in keys[start : start + page_size]]}
+            page["CommonPrefixes"] = [{"Prefix": prefix} for prefix in prefixes[start : start + page_size]]
+            yield page
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(s3, "get_client", lambda: client)
+    # Small chunks and parts, so a few KB exercise the chunked and multipart paths
+    monkeypatch.setattr(s3, "CHUNK_SIZE", 64)
+    monkeypatch.setattr(s3, "PART_SIZE", 1024)
+    return client
+
+
+# Random bytes barely compress, so (past what zlib buffers internally) they span several of the patched parts
+INCOMPRESSIBLE = random.Random(0).randbytes(200_000)
+PAYLOAD = json.dumps({str(i): {"value": i, "label": f"item {i}"} for i in range(500)}).encode("utf8")
+
+
+@pytest.mark.parametrize("compress", [zlib.compress, gzip.compress, None])
+def test_download_streams_and_decompresses(client, compress):
+    client.objects[("bucket", "key")] = compress(PAYLOAD) if compress else PAYLOAD
+    assert s3.download("bucket", "key", compressed=compress is not None) == PAYLOAD.decode("utf8")
+    assert s3.download_json("bucket", "key", compressed=compress is not None) == json.loads(PAYLOAD)
+
+
+def test_download_csv_as_df(client):
+    client.objects[("bucket", "data.csv")] = b"a,b\n1,x\n2,y\n"
+    df = s3.download_csv_as_df("bucket", "data.csv")
+    assert df.to_dict(orient="list") == {"a": [1, 2], "b": ["x", "y"]}
+
+
+def test_small_upload_is_a_single_put(client):
+    s3.upload("bucket", "small", b"hello", compress=True)
+    assert [name for name, _ in client.calls] == ["put_object"]
+    assert client.objects[("bucket", "small")] == zlib.compress(b"hello")
+
+
+def test_large_upload_is_compressed_in_parts(client):
+    s3.upload("bucket", "large", INCOMPRESSIBLE, compress=True)
+    names = [name for name, _ in client.calls]
+    assert names[0] == "create_multipart_upload" and names[-1] == "complete_multipart_upload"
+    assert names.count("upload_part") > 1
+    assert zlib.decompress(client.objects[("bucket", "large")]) == INCOMPRESSIBLE
+
+
+@pytest.mark.parametrize("text", ["hello", "é" * 1000])
+def test_upload_encodes_text(client, text):
+    # 1000 two-byte characters are past the (patched) part size in bytes, though not in characters
+    s3.upload("bucket", "text", text, compress=False)
+    assert client.objects[("bucket", "text")] == text.encode("utf8")
+
+
+def test_upload_df_as_csv_streams_text(client):
+    df = pd.DataFrame({"a": range(300), "b": ["x"] * 300})
+    s3.upload_df_as_csv("bucket", "data.csv", df)
+    assert client.calls[0] == ("create_multipart_upload", {"ContentType": "text/csv"})
+    assert client.objects[("bucket", "data.csv")] == df.to_csv(index=False).encode("utf8")
+
+
+def test_failed_upload_stream_is_aborted(client):
+    with pytest.raises(RuntimeError):
+        with s3.open_upload_stream("bucket", "failed") as stream:
+            stream.write(INCOMPRESSIBLE)
+            raise RuntimeError("boom")
+    assert client.calls[-1] == ("abort_multipart_upload", "failed")
+    assert ("bucket", "failed") not in client.objects
+
+
+def test_ls_handles_empty_listings_and_shards(client):
+    assert s3.ls("bucket", "nothing/") == []
+    assert s3.ls("bucket", "nothing/", shard=True) == []
+
+    keys = [f"status/2024-01-0{day}/{hour:02d}/data.csv" for day in range(1, 4) for hour in range(5)]
+    keys.append("status/top-level.csv")
+    for key in keys:
+        client.objects[("bucket", key)] = b""
+    assert s3.ls("bucket", "status/") == sorted(keys)
+    client.calls.clear()
+    assert s3.ls("bucket", "status/", shard=True) == sorted(keys)
+    listed_prefixes = sorted(prefix for name, prefix in client.calls if name == "list_objects_v2")
+    assert listed_prefixes == ["status/", "status/2024-01-01/", "status/2024-01-02/", "status/2024-01-03/"]
+
+
+def test_get_many_reads_every_key_with_bounded_parallelism(client):
+    in_flight, max_in_flight = 0, 0
+    lock = threading.Lock()
+
+    def read(bucket, key):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.001)
+        with lock:
+            in_flight -= 1
+        return key.upper()
+
+    results = dict(s3.get_many("bucket", (f"key-{i}" for i in range(50)), read=read, max_workers=4))
+    assert results == {f"key-{i}": f"KEY-{i}" for i in range(50)}
+    assert max_in_flight <= 4
@@ -0,0 +1,277 @@
+import json
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from botocore.stub import ANY, Stubber
+
+from .. import s3
+from ..service_ridership_dashboard import ingest
+from ..service_ridership_dashboard import s3 as dashboard_s3
+from ..service_ridership_dashboard.config import PRE_COVID_DATE
+from ..service_ridership_dashboard.line_cache import get_completed_weeks_fingerprint
+from ..service_ridership_dashboard.ridership import RidershipEntry
+from ..service_ridership_dashboard.service_levels import get_service_level_entries_for_line
+from ..service_ridership_dashboard.service_summaries import summarize_weekly_service_around_date
+from ..service_ridership_dashboard.time_series import (
+    _fill_zero_ranges_in_time_series,
+    _get_entry_value_for_date,
+    get_weekly_median_time_series,
+    get_weekly_median_time_series_for_days,
+    merge_weekly_median_time_series,
+)
+from ..service_ridership_dashboard.util import SortedDateIndex
+
+LINE = SimpleNamespace(line_id="line-1", line_short_name="1", line_long_name="Line 1")
+ROUTES = [SimpleNamespace(route_id="1")]
+
+
+def _row(day: date, trips: int, has_service_exceptions: bool = False):
+    return {"date": day.isoformat(), "byHour": {"totals": [trips] * 24}, "hasServiceExceptions": has_service_exceptions}
+
+
+def test_weekly_median_for_days_matches_dict_version():
+    rng = np.random.default_rng(0)
+    values_start_date = date(2024, 1, 3)  # A Wednesday, so the first week is partial
+    values = rng.integers(0, 100, size=60)
+    entries = {values_start_date + timedelta(days=i): int(value) for i, value in enumerate(values)}
+    for start_date, max_end_date in [(date(2024, 1, 1), date(2024, 12, 31)), (date(2024, 1, 8), date(2024, 2, 5))]:
+        expected = get_weekly_median_time_series(entries, lambda value: value, start_date, max_end_date)
+        assert get_weekly_median_time_series_for_days(values, values_start_date, start_date, max_end_date) == expected
+
+
+def test_weekly_median_takes_value_at_half_of_each_sorted_week():
+    entries = {
+        date(2024, 1, 1): 4,
+        date(2024, 1, 2): 1,
+        date(2024, 1, 3): 3,
+        date(2024, 1, 4): 2,
+        date(2024, 1, 9): 2.5,
+    }
+    assert get_weekly_median_time_series(entries, lambda value: value, date(2024, 1, 1), date(2024, 1, 31)) == {
+        "2024-01-01": 3,
+        "2024-01-08": 2.5,
+    }
+    assert get_weekly_median_time_series(entries, lambda value: value, date(2024, 1, 2), date(2024, 1, 8)) == {
+        "2024-01-08": 2.5
+    }
+
+
+def test_merge_weekly_median_time_series_aligns_weeks():
+    merged = merge_weekly_median_time_series(
+        [{"2024-01-08": 1, "2024-01-15": 2}, {}, {"2024-01-01": 5, "2024-01-08": 3}]
+    )
+    assert merged == {"2024-01-08": 4, "2024-01-15": 2, "2024-01-01": 5}
+    assert list(merged) == ["2024-01-08", "2024-01-15", "2024-01-01"]
+    assert all(isinstance(value, int) for value in merged.values())
+    assert merge_weekly_median_time_series([]) == {}
+
+
+def test_merge_weekly_median_time_series_keeps_each_weeks_type():
+    merged = merge_weekly_median_time_series([{"2024-01-01": 1, "2024-01-08": 2}, {"2024-01-08": 2.5}])
+    assert merged == {"2024-01-01": 1, "2024-01-08": 4.5}
+    assert type(merged["2024-01-01"]) is int and type(merged["2024-01-08"]) is float
+    # Floats are summed in series order, as with +
+    assert merge_weekly_median_time_series([{"w": 0.1}, {"w": 0.2}, {"w": 0.3}]) == {"w": 0.1 + 0.2 + 0.3}
+
+
+def test_fill_zero_ranges_fills_short_gaps_only():
+    series = [3, 0, 0, 4] + [0] * 7 + [5]
+    assert _fill_zero_ranges_in_time_series(series, date(2024, 6, 1)) == [3, 3, 3, 4] + [0] * 7 + [5]
+    # Long gaps are filled when they overlap one of FILL_DATE_RANGES (Christmas 2022)
+    assert _fill_zero_ranges_in_time_series(series, date(2022, 12, 10)) == [3, 3, 3, 4] + [4] * 7 + [5]
+
+
+def test_summarize_weekly_service_skips_exceptions_and_missing_days():
+    start_date = date(2024, 1, 1)  # A Monday
+    rows = [_row(start_date + timedelta(days=i), trips=2) for i in range(14)]
+    # The latest Friday has service exceptions, and the latest Sunday has no service at all
+    rows[11] = _row(date(2024, 1, 12), trips=8, has_service_exceptions=True)
+    del rows[13]
+    service_levels = get_service_level_entries_for_line(LINE, ROUTES, rows, start_date, date(2024, 1, 14))
+
+    summary = summarize_weekly_service_around_date(date(2024, 1, 14), service_levels)
+
+    assert summary["weekday"] == {"cancelled": False, "tripsPerHour": [1.0] * 24, "totalTrips": 24}
+    assert summary["saturday"]["totalTrips"] == 24
+    assert summary["sunday"] == {"cancelled": False, "tripsPerHour": [], "totalTrips": 0}
+    assert summarize_weekly_service_around_date(date(2023, 12, 1), service_levels)["weekday"]["cancelled"]
+
+
+def test_sorted_date_index_latest_on_or_before():
+    index = SortedDateIndex([date(2024, 1, 10), date(2024, 1, 1), date(2024, 1, 6), date(2024, 1, 8)])
+    assert index.latest_on_or_before(date(2024, 1, 9)) == date(2024, 1, 8)
+    assert index.latest_on_or_before(date(2024, 1, 10)) == date(2024, 1, 10)
+    assert index.latest_on_or_before(date(2023, 12, 31)) is None
+    # Saturdays and Mondays only
+    assert index.latest_on_or_before(date(2024, 1, 9), days_of_week=[0, 5]) == date(2024, 1, 8)
+    assert index.latest_on_or_before(date(2024, 1, 7), days_of_week=[0, 5]) == date(2024, 1, 6)
+    assert index.latest_on_or_before(date(2024, 1, 31), days_of_week=[6]) is None
+
+
+def test_get_entry_value_for_date_falls_back_to_previous_entry():
+    entries = {date(2024, 1, 1): 5, date(2024, 1, 8): 7}
+    index = SortedDateIndex(entries)
+    for date_index in (None, index):
+        assert _get_entry_value_for_date(entries, date(2024, 1, 8), lambda v: v, date_index) == 7
+        assert _get_entry_value_for_date(entries, date(2024, 1, 7), lambda v: v, date_index) == 5
+        assert _get_entry_value_for_date(entries, date(2023, 12, 31), lambda v: v, date_index) is None
+
+
+def test_put_dashboard_json_to_s3_uploads_lines_before_summary():
+    line_data = {"id": "line-1", "shortName": "1", "longName": "Line 1", "routeIds": ["1"], "startDate": "2024-01-01"}
+    line_data.update(lineKind="bus", ridershipHistory={"2024-01-01": 5}, serviceHistory={}, serviceRegimes={})
+    dash_json = {"summaryData": {"totalTrips": 1}, "modeData": {}, "lineData": {"line-1": line_data}}
+    client = s3.get_client()
+    with Stubber(client) as stubber:
+        put = {"Bucket": dashboard_s3.BUCKET, "Body": ANY, "ContentType": "application/json", "ContentEncoding": "gzip"}
+        put["CacheControl"] = dashboard_s3.CACHE_CONTROL
+        stubber.add_response("put_object", {}, {**put, "Key": "lines/line-1.json"})
+        stubber.add_response("put_object", {}, {**put, "Key": "latest.json"})
+        copy_source = {"Bucket": dashboard_s3.BUCKET, "Key": "latest.json"}
+        stubber.add_response(
+            "copy_object", {}, {"CopySource": copy_source, "Bucket": dashboard_s3.BUCKET, "Key": "2024-01-14.json"}
+        )
+        stubber.add_response("put_object", {}, {**put, "Key": "summary.json"})
+        dashboard_s3.put_dashboard_json_to_s3(date(2024, 1, 14), dash_json)
+        stubber.assert_no_pending_responses()
+
+    summary = dashboard_s3.get_summary_json(dash_json)
+    assert summary["lines"]["line-1"]["key"] == "lines/line-1.json"
+    assert "ridershipHistory" not in summary["lines"]["line-1"]
+
+
+def test_dash_json_end_date_defaults_to_today_at_call_time(monkeypatch):
+    class LaterDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2030, 6, 1, 12, tzinfo=tz)
+
+    end_dates = []
+    monkeypatch.setattr(ingest, "datetime", LaterDatetime)
+    monkeypatch.setattr(ingest, "get_routes_by_line", lambda include_only_line_ids: {})
+    monkeypatch.setattr(ingest, "load_entries_by_line_id", lambda end_date, **_: end_dates.append(end_date) or ({}, {}))
+    monkeypatch.setattr(ingest, "get_summary_data", lambda **_: {})
+    monkeypatch.setattr(ingest, "get_summary_data_by_mode", lambda **_: {})
+    ingest.create_service_ridership_dash_json(write_to_s3=False)
+    assert end_dates == [date(2030, 6, 1)]
+
+
+def _line_inputs(line, start_date: date, end_date: date, seed: int = 0):
+    """Service levels with varying trips and some exceptions, and ridership mixing ints and floats.
+
+    Each day's values only depend on the day (and seed), so a longer date range only adds days.
+    """
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    rows = [
+        _row(day, trips=(day.toordinal() * 7 + seed) % 9 + 1, has_service_exceptions=day.day % 11 == 0) for day in days
+    ]
+    service_levels = get_service_level_entries_for_line(line, ROUTES, rows, start_date, end_date)
+    counts = {day: (day.toordinal() * 37 + seed) % 1000 for day in days}
+    ridership = {day: RidershipEntry(day, float(count) if day.day % 3 else count) for day, count in counts.items()}
+    return service_levels, ridership
+
+
+def test_line_data_from_cached_completed_weeks_matches_full_build():
+    start_date, end_date = date(2020, 1, 8), date(2020, 3, 19)  # A Wednesday to a Thursday
+    service_levels, ridership = _line_inputs(LINE, start_date, end_date)
+    current_week_start = ingest.get_current_week_start(end_date)
+    assert current_week_start == date(2020, 3, 16)
+
+    completed_weeks = ingest.create_completed_weeks(start_date, current_week_start, service_levels, ridership)
+    assert max(completed_weeks["ridershipHistory"]) == "2020-03-09"
+    cached = json.loads(json.dumps(completed_weeks))
+    line_data = ingest.create_line_data(start_date, end_date, service_levels, ridership, completed_weeks=cached)
+
+    assert line_data == ingest.create_line_data(start_date, end_date, service_levels, ridership)
+    assert line_data["ridershipHistory"] == get_weekly_median_time_series(
+        ridership, lambda entry: entry.ridership, start_date, end_date
+    )
+    assert list(line_data["ridershipHistory"]) == sorted(line_data["ridershipHistory"])
+    assert [type(value) for value in line_data["ridershipHistory"].values()] == [
+        type(value)
+        for value in get_weekly_median_time_series(
+            ridership, lambda entry: entry.ridership, start_date, end_date
+        ).values()
+    ]
+    assert line_data["serviceHistory"] == get_weekly_median_time_series_for_days(
+        service_levels.get_total_trips(), start_date, start_date, end_date
+    )
+    assert line_data["serviceRegimes"] == {
+        "current": summarize_weekly_service_around_date(end_date, service_levels),
+        "oneYearAgo": summarize_weekly_service_around_date(end_date - timedelta(days=365), service_levels),
+        "baseline": summarize_weekly_service_around_date(PRE_COVID_DATE, service_levels),
+    }
+
+
+def test_completed_weeks_fingerprint_only_covers_days_before_the_current_week():
+    start_date, end_date = date(2024, 1, 1), date(2024, 1, 17)
+    current_week_start = ingest.get_current_week_start(end_date)
+    service_levels, ridership = _line_inputs(LINE, start_date, end_date)
+    fingerprint = get_completed_weeks_fingerprint(service_levels, ridership, start_date, current_week_start)
+
+    # The next night, in the same week
+    later_service_levels, later_ridership = _line_inputs(LINE, start_date, end_date + timedelta(days=1))
+    later_ridership[end_date] = RidershipEntry(end_date, 12345)
+    assert (
+        get_completed_weeks_fingerprint(later_service_levels, later_ridership, start_date, current_week_start)
+        == fingerprint
+    )
+
+    revised_ridership = {**ridership, date(2024, 1, 3): RidershipEntry(date(2024, 1, 3), 12345)}
+    assert (
+        get_completed_weeks_fingerprint(service_levels, revised_ridership, start_date, current_week_start)
+        != fingerprint
+    )
+    next_week_start = current_week_start + timedelta(days=7)
+    assert get_completed_weeks_fingerprint(service_levels, ridership, start_date, next_week_start) != fingerprint
+
+
+def test_dash_json_rebuilds_completed_weeks_only_for_changed_lines(monkeypatch):
+    start_date = date(2024, 1, 1)
+    lines = [SimpleNamespace(line_id=f"line-{n}", line_short_name=str(n), line_long_name=f"Line {n}") for n in (1, 2)]
+    inputs = {}
+
+    def load_entries_by_line_id(routes_by_line, start_date, end_date):
+        service_levels, ridership = {}, {}
+        for seed, line in enumerate(lines):
+            service_levels[line.line_id], ridership[line.line_id] = _line_inputs(line, start_date, end_date, seed)
+            ridership[line.line_id].update(inputs.get(line.line_id, {}))
+        return service_levels, ridership
+
+    cache, uploads, rebuilt = {}, [], []
+    create_completed_weeks = ingest.create_completed_weeks
+    monkeypatch.setattr(ingest, "get_routes_by_line", lambda include_only_line_ids: {})
+    monkeypatch.setattr(ingest, "load_entries_by_line_id", load_entries_by_line_id)
+    monkeypatch.setattr(ingest, "put_dashboard_json_to_s3", lambda today, dash_json: uploads.append(dash_json))
+    monkeypatch.setattr(ingest, "read_manifest", lambda: dict(cache.get("manifest", {})))
+    monkeypatch.setattr(ingest, "write_manifest", lambda fingerprints: cache.update(manifest=fingerprints))
+    monkeypatch.setattr(ingest, "read_cached_completed_weeks", lambda ids: {i: json.loads(cache[i]) for i in ids})
+    monkeypatch.setattr(
+        ingest, "write_cached_completed_weeks", lambda data: cache.update({i: json.dumps(d) for i, d in data.items()})
+    )
+    monkeypatch.setattr(
+        ingest,
+        "create_completed_weeks",
+        lambda **kwargs: rebuilt.append(kwargs["service_levels"].line_id) or create_completed_weeks(**kwargs),
+    )
+
+    ingest.create_service_ridership_dash_json(start_date, date(2024, 1, 16))
+    assert rebuilt == ["line-1", "line-2"]
+
+    # The next night only the current week and regimes are rebuilt, and the output matches a full rebuild
+    ingest.create_service_ridership_dash_json(start_date, date(2024, 1, 17))
+    assert rebuilt == ["line-1", "line-2"]
+    ingest.create_service_ridership_dash_json(start_date, date(2024, 1, 17), force=True)
+    assert uploads[1] == uploads[2]
+
+    # A revised count in a completed week rebuilds that line
+    inputs["line-2"] = {
+        day: RidershipEntry(day, 99999) for day in (date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4))
+    }
+    del rebuilt[:]
+    ingest.create_service_ridership_dash_json(start_date, date(2024, 1, 17))
+    assert rebuilt == ["line-2"]
+    ingest.create_service_ridership_dash_json(start_date, date(2024, 1, 17), force=True)
+    assert uploads[3] == uploads[4]
+    assert uploads[3]["lineData"]["line-2"]["ridershipHistory"] != uploads[1]["lineData"]["line-2"]["ridershipHistory"]
@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from datetime import date
+from types import SimpleNamespace
+
+from botocore.stub import Stubber
+
+from .. import dynamo
+from ..service_ridership_dashboard import loader, queries
+
+
+def test_query_date_range_follows_every_page():
+    client = dynamo.get_resource().meta.client
+    with Stubber(client) as stubber:
+        stubber.add_response(
+            "query",
+            {"Items": [{"date": {"S": "2024-01-01"}, "count": {"N": "5"}}], "LastEvaluatedKey": {"d": {"S": "x"}}},
+        )
+        stubber.add_response("query", {"Items": [{"date": {"S": "2024-01-02"}, "count": {"N": "6"}}]})
+        rows = queries.query_ridership(date(2024, 1, 1), date(2024, 1, 2), "line-Red")
+    assert rows == [{"date": "2024-01-01", "count": 5}, {"date": "2024-01-02", "count": 6}]
+
+
+@dataclass(eq=False)
+class _Line:
+    # Hashed by identity, like the GTFS Line models used as keys of routes_by_line
+    line_id: str
+    line_short_name: str
+    line_long_name: str
+
+
+def test_load_entries_by_line_id(monkeypatch):
+    def query_scheduled_service(start_date, end_date, route_id):
+        return [{"date": "2024-01-01", "byHour": {"totals": [2] * 24}, "hasServiceExceptions": route_id == "B"}]
+
+    def query_ridership(start_date, end_date, line_id):
+        return [{"date": "2024-01-02", "count": 100 if line_id == "line-1" else 7}]
+
+    monkeypatch.setattr(loader, "query_scheduled_service", query_scheduled_service)
+    monkeypatch.setattr(loader, "query_ridership", query_ridership)
+    line_1 = _Line(line_id="line-1", line_short_name="1", line_long_name="Line 1")
+    line_2 = _Line(line_id="line-2", line_short_name="2", line_long_name="Line 2")
+    routes_by_line = {
+        line_2: [SimpleNamespace(route_id="A"), SimpleNamespace(route_id="B")],
+        line_1: [SimpleNamespace(route_id="C")],
+    }
+
+    service_levels, ridership = loader.load_entries_by_line_id(routes_by_line, date(2024, 1, 1), date(2024, 1, 2))
+
+    assert list(service_levels) == list(ridership) == ["line-2", "line-1"]
+    line_2 = service_levels["line-2"]
+    assert line_2.route_ids == ["A", "B"]
+    assert line_2.get_trips_per_hour(0) == [2.0] * 24
+    assert line_2.has_service_exceptions.tolist() == [True, False]
+    assert service_levels["line-1"].get_trips_per_hour(1) == []
+    assert ridership["line-1"][date(2024, 1, 2)].ridership == 100
@@ -0,0 +1,78 @@
+import json
+
+from ..ridership.sharepoint import SharepointConnection
+
+SHARE_URL = "https://example.sharepoint.com/:f:/s/share"
+
+
+def _page(rows):
+    list_data = {"ListData": {"Row": rows}}
+    return f'<script>var g_listData = {json.dumps(list_data)};var other = {{"a": 1}};</script>'
+
+
+def _row(name, url, modified, is_folder=False):
+    return {"FileLeafRef": name, "FileRef": url, "Modified": modified, "FSObjType": "1" if is_folder else "0"}
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Serves folder pages by URL, honouring If-None-Match, and records each request."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None, allow_redirects=True):
+        self.requests.append(url)
+        etag = f'"{hash(self.pages[url])}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.pages[url], {"ETag": etag})
+
+
+def _connection(tmp_path, pages):
+    connection = SharepointConnection(cache_dir=str(tmp_path))
+    connection.session = FakeSession(pages)
+    return connection
+
+
+def test_parse_g_data_handles_braces_and_quotes_in_strings():
+    rows = [_row('weird {name} with "quotes" \\ and }', "/a", "1/1/2025 1:00 PM")]
+    files = SharepointConnection(cache_dir=None).parse_g_data(_page(rows))
+    assert [file["name"] for file in files] == ['weird {name} with "quotes" \\ and }']
+
+
+def test_listing_cache_revalidates_every_folder(tmp_path):
+    pattern = r"(\d{4})\.(\d{2})\.(\d{2}) data\.csv$"
+    connection = _connection(tmp_path, {})
+    folder_url = f"{connection.base_url}?id=/share/2025&p=true&ga=1"
+    pages = {
+        SHARE_URL: _page([_row("2025", "/share/2025", "1/2/2025 1:00 PM", is_folder=True)]),
+        folder_url: _page([_row("2025.01.01 data.csv", "/share/2025/a.csv", "1/2/2025 1:00 PM")]),
+    }
+
+    connection = _connection(tmp_path, pages)
+    file = connection.find_sharepoint_file(pattern, SHARE_URL)
+    assert file["url"] == "/share/2025/a.csv"
+    assert connection.session.requests == [SHARE_URL, folder_url]
+
+    # Unchanged share: every folder is revalidated, and answered from the cache
+    connection = _connection(tmp_path, pages)
+    assert connection.find_sharepoint_file(pattern, SHARE_URL)["url"] == "/share/2025/a.csv"
+    assert connection.session.requests == [SHARE_URL, folder_url]
+
+    # A file added to the subfolder is found even though the subfolder's Modified time is unchanged
+    pages[folder_url] = _page(
+        [
+            _row("2025.01.01 data.csv", "/share/2025/a.csv", "1/2/2025 1:00 PM"),
+            _row("2025.01.02 data.csv", "/share/2025/b.csv", "1/3/2025 1:00 PM"),
+        ]
+    )
+    connection = _connection(tmp_path, pages)
+    assert connection.find_sharepoint_file(pattern, SHARE_URL)["url"] == "/share/2025/b.csv"
@@ -0,0 +1,58 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from ..speed_restrictions import parse_date, parse_date_series, parse_restriction_frame_to_entries
+
+
+def _row(**overrides):
+    row = {
+        "ID": "1",
+        "Line": "Red Line",
+        "Branch": "Ashmont",
+        "Calendar_Date": "2024-01-05",
+        "Date_Restriction_Reported": "2023-12-01",
+        "Loc_GTFS_Stop_ID": "70061 | 70063",
+        "Location_Description": "JFK/UMass to Savin Hill",
+        "Track_Direction": "Southbound",
+        "Restriction_Reason": "Track condition",
+        "Restriction_Speed_MPH": "10 mph",
+        "Restriction_Distance_Feet": "120.5",
+        "Restriction_Status": "Active",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_parse_date_series_matches_parse_date():
+    values = pd.Series(["2024-01-05", "1/5/24", "01/05/2024", "12/31/23"])
+    assert list(parse_date_series(values)) == [parse_date(v) for v in values]
+
+
+def test_parse_date_series_raises_on_bad_value():
+    with pytest.raises(ValueError):
+        parse_date_series(pd.Series(["2024-01-05", "not a date"]))
+
+
+def test_parse_restriction_frame():
+    df = pd.DataFrame(
+        [
+            _row(),
+            _row(ID="2", Branch="Mattapan Trolley", Loc_GTFS_Stop_ID="70261", Calendar_Date="1/6/24"),
+            _row(ID="3", Restriction_Status="Cleared"),
+        ]
+    )
+    entries = list(parse_restriction_frame_to_entries(df))
+    assert [entry.id for entry in entries] == ["1", "2"]
+
+    first, second = entries
+    assert first.line_id == "line-Red"
+    assert (first.from_stop_id, first.to_stop_id) == ("70061", "70063")
+    assert first.speed_mph == 10
+    assert first.track_feet == 120
+    assert first.reported == date(2023, 12, 1)
+
+    assert second.line_id == "line-Mattapan"
+    assert (second.from_stop_id, second.to_stop_id) == ("70261", None)
+    assert second.entry_key() == ("line-Mattapan", date(2024, 1, 6))
@@ -1,5 +1,9 @@
-from ..weather.constants import WEATHER_CODE_TO_CONDITION, key
-from ..weather.ingest import _parse_hourly
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from ..weather import ingest
+from ..weather.constants import ARCHIVE_COLUMNS, WEATHER_CODE_TO_CONDITION, key, yearly_key
+from ..weather.ingest import _covers_full_day, _diff_entries, _from_columns, _parse_hourly, _to_columns
 
 
 HOURLY_FIXTURE = {
@@ -80,3 +84,70 @@ def test_merge_preserves_other_hours_and_overwrites_same_hour():
 
 def test_key_format():
     assert key("2026-04-22") == "Weather/hourly/2026-04-22.json.gz"
+    assert yearly_key("2026") == "Weather/yearly/2026.json.gz"
+
+
+def test_columns_round_trip_sorted_by_time():
+    by_date = _parse_hourly(HOURLY_FIXTURE)
+    records = {**by_date["2026-04-23"], **by_date["2026-04-22"]}
+    columns = _to_columns(records)
+    assert list(columns.keys()) == ARCHIVE_COLUMNS
+    assert columns["time"] == ["2026-04-22T00:00", "2026-04-22T01:00", "2026-04-23T00:00"]
+    assert columns["temperature_f"] == [45.2, 44.1, 50.0]
+    assert columns["condition"] == ["clear", "rain", "snow"]
+    assert _from_columns(columns) == records
+
+
+def _full_day(day, hours):
+    return {f"{day}T{h:02d}:00": {"temperature_f": 50.0, "condition": "clear"} for h in range(hours)}
+
+
+def test_covers_full_day():
+    assert _covers_full_day("2026-04-22", _full_day("2026-04-22", 24))
+    assert not _covers_full_day("2026-04-22", _full_day("2026-04-22", 23))
+
+
+def test_covers_full_day_requires_observations():
+    entries = _full_day("2026-04-22", 24)
+    entries["2026-04-22T05:00"]["temperature_f"] = None
+    assert not _covers_full_day("2026-04-22", entries)
+
+
+def test_diff_entries():
+    existing = {
+        "2026-04-22T00:00": {"temperature_f": 40.0, "condition": "clear"},
+        "2026-04-22T01:00": {"temperature_f": 39.0, "condition": "clear"},
+    }
+    entries = {
+        "2026-04-22T00:00": {"temperature_f": 40.0, "condition": "clear"},
+        "2026-04-22T01:00": {"temperature_f": 41.0, "condition": "rain"},
+        "2026-04-22T02:00": {"temperature_f": 42.0, "condition": "cloudy"},
+    }
+    assert _diff_entries(existing, entries) == (1, 1)
+    assert _diff_entries({}, entries) == (3, 0)
+
+
+def test_backfill_writes_each_year_of_the_archive_once_it_is_complete(monkeypatch):
+    events = []
+
+    def get(url, params, timeout):
+        events.append(("fetch", params["start_date"]))
+        start, end = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        hourly = {"time": [f"{day}T00:00" for day in days], "temperature_2m": [50.0] * len(days)}
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {"hourly": hourly})
+
+    monkeypatch.setattr(ingest.requests, "get", get)
+    monkeypatch.setattr(ingest, "_backfill_day", lambda day, entries, dry_run: True)
+    monkeypatch.setattr(
+        ingest, "_update_yearly_archive", lambda by_date: by_date and events.append(("archive", sorted(by_date)))
+    )
+
+    assert ingest.backfill_weather("2024-12-01", "2025-02-15") == 77
+    archived = [event for event in events if event[0] == "archive"]
+    assert [(days[0], days[-1]) for _, days in archived] == [
+        ("2024-12-01", "2024-12-31"),
+        ("2025-01-01", "2025-02-15"),
+    ]
+    # 2024 is written as soon as the first 2025 chunk is fetched, not at the end
+    assert events.index(archived[0]) == events.index(("fetch", "2025-01-01")) + 1
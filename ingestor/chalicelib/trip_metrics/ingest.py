@@ -8,7 +8,7 @@ from urllib.parse import urlencode
 import pandas as pd
 import requests
 
-from .. import constants, dynamo
+from .. import constants, dynamo, instrumentation
 from .types import AggTravelTimesRequest, AggTravelTimesResponse, DirectionType, PeakType
 
 KEYS_TO_KEEP = ["25%", "50%", "75%", "count", "max", "mean", "min", "std"]
@@ -102,11 +102,13 @@ def generate_requests(
     return reqs
 
 
+@instrumentation.instrumented()
 def load_travel_time_dataframe(
     start_date: date,
     end_date: date,
 ) -> pd.DataFrame:
     reqs = generate_requests(start_date, end_date)
+    instrumentation.record(items=len(reqs))
     df_dicts = []
     with ThreadPoolExecutor(max_workers=4) as executor:
         futures = {executor.submit(request_agg_travel_time, req): req for req in reqs}
@@ -149,6 +151,7 @@ def prepare_dict_for_dynamo(row_dict):
     return res
 
 
+@instrumentation.instrumented()
 def ingest_trip_metrics(start_date: date, end_date: date):
     df = load_travel_time_dataframe(start_date, end_date)
     df = df[df["peak"] == "all"]
@@ -156,25 +159,27 @@ def ingest_trip_metrics(start_date: date, end_date: date):
     dates = df["service_date"].unique()
     route_ids = df["route_id"].unique()
     row_dicts = []
-    for route_id in route_ids:
-        for date_str in sorted(dates):
-            date_data = df[(df["service_date"] == date_str) & (df["route_id"] == route_id)]
-            sb_exclusive = get_df_entry_for_direction_and_exclusivity(date_data, "0", False)
-            nb_exclusive = get_df_entry_for_direction_and_exclusivity(date_data, "1", False)
-            sb_inclusive = get_df_entry_for_direction_and_exclusivity(date_data, "0", True)
-            nb_inclusive = get_df_entry_for_direction_and_exclusivity(date_data, "1", True)
-            if sb_exclusive and nb_exclusive and sb_inclusive and nb_inclusive:
-                row_dict = prepare_dict_for_dynamo(
-                    {
-                        "date": date_str,
-                        "route": route_id,
-                        **sb_exclusive,
-                        **nb_exclusive,
-                        **sb_inclusive,
-                        **nb_inclusive,
-                    }
-                )
-                row_dicts.append(row_dict)
+    with instrumentation.stage("trip_metrics.pivot") as stage:
+        for route_id in route_ids:
+            for date_str in sorted(dates):
+                date_data = df[(df["service_date"] == date_str) & (df["route_id"] == route_id)]
+                sb_exclusive = get_df_entry_for_direction_and_exclusivity(date_data, "0", False)
+                nb_exclusive = get_df_entry_for_direction_and_exclusivity(date_data, "1", False)
+                sb_inclusive = get_df_entry_for_direction_and_exclusivity(date_data, "0", True)
+                nb_inclusive = get_df_entry_for_direction_and_exclusivity(date_data, "1", True)
+                if sb_exclusive and nb_exclusive and sb_inclusive and nb_inclusive:
+                    row_dict = prepare_dict_for_dynamo(
+                        {
+                            "date": date_str,
+                            "route": route_id,
+                            **sb_exclusive,
+                            **nb_exclusive,
+                            **sb_inclusive,
+                            **nb_inclusive,
+                        }
+                    )
+                    row_dicts.append(row_dict)
+        stage.record(items=len(row_dicts))
     dynamo.dynamo_batch_write(row_dicts, "DeliveredTripMetricsExtended")
 
 
@@ -1,3 +1,3 @@
-from chalicelib.weather.ingest import backfill_weather, ingest_hourly_weather
+from chalicelib.weather.ingest import backfill_weather, ingest_hourly_weather, read_year, update_weather_archive
 
-__all__ = ["backfill_weather", "ingest_hourly_weather"]
+__all__ = ["backfill_weather", "ingest_hourly_weather", "read_year", "update_weather_archive"]
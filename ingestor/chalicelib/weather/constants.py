@@ -46,3 +46,19 @@ WEATHER_CODE_TO_CONDITION = {
 
 def key(day):
     return f"Weather/hourly/{str(day)}.json.gz"
+
+
+# Columns of the yearly archive, in the order they're stored. "time" is the sorted hourly index.
+ARCHIVE_COLUMNS = [
+    "time",
+    "temperature_f",
+    "weather_code",
+    "condition",
+    "precipitation_in",
+    "humidity_pct",
+    "wind_mph",
+]
+
+
+def yearly_key(year):
+    return f"Weather/yearly/{year}.json.gz"
@@ -1,12 +1,14 @@
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timedelta
 
 import requests
 from botocore.exceptions import ClientError
 
-from chalicelib import s3
-from chalicelib.date_utils import get_current_service_date
+from chalicelib import instrumentation, s3
+from chalicelib.date_utils import EASTERN_TIME, get_current_service_date
 from chalicelib.weather.constants import (
+    ARCHIVE_COLUMNS,
     ARCHIVE_URL,
     BUCKET,
     FORECAST_URL,
@@ -15,12 +17,19 @@ from chalicelib.weather.constants import (
     LONGITUDE,
     WEATHER_CODE_TO_CONDITION,
     key,
+    yearly_key,
 )
 
 # Open-Meteo archive lag: observations are typically published with a ~2 day delay.
 ARCHIVE_LAG_DAYS = 2
 # Keep each archive request bounded so timeouts & memory stay predictable.
 BACKFILL_CHUNK_DAYS = 31
+# Day-level S3 reads/writes during a backfill run concurrently, bounded by this many threads.
+# Stays under botocore's default connection pool size (10).
+BACKFILL_THREAD_COUNT = 8
+# The hourly job rewrites yesterday's file as well as today's (past_days=1), so the daily archive update merges both
+# of the last two completed days.
+ARCHIVE_UPDATE_DAYS = 2
 
 
 def _base_params():
@@ -68,8 +77,7 @@ def _parse_hourly(hourly):
 
 def _read_day(day):
     try:
-        existing = s3.download(BUCKET, key(day), encoding="utf8", compressed=True)
-        return json.loads(existing)
+        return s3.download_json(BUCKET, key(day), compressed=True)
     except ClientError as ex:
         if ex.response["Error"]["Code"] != "NoSuchKey":
             raise
@@ -81,6 +89,49 @@ def _write_day(day, entries):
     s3.upload(BUCKET, key(day), payload, compress=True)
 
 
+def _to_columns(records):
+    """Turn {iso_hour: record} into the columnar archive layout: one time-sorted list per field."""
+    times = sorted(records)
+    columns = {"time": times}
+    for column in ARCHIVE_COLUMNS[1:]:
+        columns[column] = [records[ts].get(column) for ts in times]
+    return columns
+
+
+def _from_columns(columns):
+    """Inverse of _to_columns."""
+    fields = [column for column in ARCHIVE_COLUMNS[1:] if column in columns]
+    return {ts: {field: columns[field][i] for field in fields} for i, ts in enumerate(columns.get("time", []))}
+
+
+def read_year(year):
+    """Read a year of hourly weather from the columnar archive, as {column: [values]} sorted by time."""
+    try:
+        return s3.download_json(BUCKET, yearly_key(year), compressed=True)
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return {column: [] for column in ARCHIVE_COLUMNS}
+
+
+def _write_year(year, columns):
+    payload = json.dumps(columns).encode("utf8")
+    s3.upload(BUCKET, yearly_key(year), payload, compress=True)
+
+
+def _update_yearly_archive(by_date):
+    """Merge {date: {iso_hour: record}} into the yearly columnar archive, one read and write per year touched."""
+    by_year = {}
+    for day, entries in by_date.items():
+        by_year.setdefault(day[:4], {}).update(entries)
+
+    for year, entries in by_year.items():
+        records = _from_columns(read_year(year))
+        records.update(entries)
+        _write_year(year, _to_columns(records))
+
+
+@instrumentation.instrumented()
 def ingest_hourly_weather():
     """Fetch the latest hourly weather and merge into today's S3 file.
 
@@ -100,6 +151,23 @@ def ingest_hourly_weather():
     return service_date
 
 
+@instrumentation.instrumented()
+def update_weather_archive(days=ARCHIVE_UPDATE_DAYS):
+    """Merge the day files of the last few completed days into the yearly columnar archive.
+
+    Runs once a day rather than with every hourly fetch, since each update rewrites the whole year's archive.
+    """
+    # Day files are calendar days, which (unlike the service date) have ended by the time this runs
+    today = datetime.now(EASTERN_TIME).date()
+    by_date = {}
+    for offset in range(days, 0, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        entries = _read_day(day)
+        if entries:
+            by_date[day] = entries
+    _update_yearly_archive(by_date)
+
+
 def _parse_date(value):
     if isinstance(value, date):
         return value
@@ -115,8 +183,55 @@ def _chunks(start, end, size):
         cur = chunk_end + timedelta(days=1)
 
 
-def backfill_weather(start_date, end_date):
-    """Pull historical hourly weather from Open-Meteo's archive and write one daily file per covered date."""
+def _covers_full_day(day, entries):
+    """True when entries has an observed temperature for every wall-clock hour (00:00-23:00) of the day.
+
+    Merging such a day into an existing file overwrites every hour, so the existing file doesn't need to be read.
+    """
+    for hour in range(24):
+        record = entries.get(f"{day}T{hour:02d}:00")
+        if record is None or record.get("temperature_f") is None:
+            return False
+    return True
+
+
+def _diff_entries(existing, entries):
+    """Count the hours in entries that would be added to, or would change, the existing day file."""
+    added = 0
+    changed = 0
+    for ts, record in entries.items():
+        if ts not in existing:
+            added += 1
+        elif existing[ts] != record:
+            changed += 1
+    return added, changed
+
+
+def _backfill_day(day, entries, dry_run=False):
+    """Merge one day of archive entries into its S3 file. Returns True if the file was (or would be) changed."""
+    if dry_run:
+        added, changed = _diff_entries(_read_day(day), entries)
+        if added or changed:
+            print(f"{day}: would add {added} and update {changed} hourly records")
+        return bool(added or changed)
+
+    if _covers_full_day(day, entries):
+        merged = entries
+    else:
+        merged = _read_day(day)
+        merged.update(entries)
+    _write_day(day, merged)
+    return True
+
+
+@instrumentation.instrumented()
+def backfill_weather(start_date, end_date, dry_run=False, max_workers=BACKFILL_THREAD_COUNT):
+    """Pull historical hourly weather from Open-Meteo's archive and write one daily file per covered date.
+
+    Day files are read and written concurrently, and the yearly columnar archive is rebuilt once per year, as soon as
+    the chunks have moved past it, so only a year of entries is held at a time. With dry_run, nothing is written and
+    the number of days that would change is returned instead.
+    """
     start = _parse_date(start_date)
     end = _parse_date(end_date)
     latest_available = date.today() - timedelta(days=ARCHIVE_LAG_DAYS)
@@ -126,20 +241,32 @@ def backfill_weather(start_date, end_date):
         return 0
 
     written = 0
-    for chunk_start, chunk_end in _chunks(start, end, BACKFILL_CHUNK_DAYS):
-        params = {
-            **_base_params(),
-            "start_date": chunk_start.isoformat(),
-            "end_date": chunk_end.isoformat(),
-        }
-        response = requests.get(ARCHIVE_URL, params=params, timeout=60)
-        response.raise_for_status()
-        by_date = _parse_hourly(response.json().get("hourly", {}))
+    archive_by_date = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_start, chunk_end in _chunks(start, end, BACKFILL_CHUNK_DAYS):
+            params = {
+                **_base_params(),
+                "start_date": chunk_start.isoformat(),
+                "end_date": chunk_end.isoformat(),
+            }
+            response = requests.get(ARCHIVE_URL, params=params, timeout=60)
+            response.raise_for_status()
+            by_date = _parse_hourly(response.json().get("hourly", {}))
+            if not dry_run:
+                # Chunks are in date order, so years before this chunk's won't get any more entries
+                finished = {day: entries for day, entries in archive_by_date.items() if day[:4] < str(chunk_start.year)}
+                _update_yearly_archive(finished)
+                archive_by_date = {day: entries for day, entries in archive_by_date.items() if day not in finished}
+                archive_by_date.update(by_date)
 
-        for day, entries in by_date.items():
-            existing = _read_day(day)
-            existing.update(entries)
-            _write_day(day, existing)
-            written += 1
+            futures = [
+                executor.submit(_backfill_day, day, entries, dry_run=dry_run) for day, entries in by_date.items()
+            ]
+            for future in as_completed(futures):
+                if future.result():
+                    written += 1
 
+    _update_yearly_archive(archive_by_date)
+    if dry_run:
+        print(f"Dry run: {written} day(s) between {start} and {end} would change")
     return written
@@ -1,19 +1,17 @@
 import json
 from dataclasses import dataclass
 from datetime import datetime
-from tempfile import TemporaryDirectory
 from typing import Dict, List, Optional, Tuple
 
-import boto3
 import requests
 from botocore.exceptions import ClientError
 from ddtrace import tracer
 from geopy import distance
-from mbta_gtfs_sqlite import MbtaGtfsArchive
 from mbta_gtfs_sqlite.models import RoutePattern, RoutePatternTypicality, ShapePoint, Stop, Trip
 from sqlalchemy.orm import Session
 
-from chalicelib import dynamo, s3
+from chalicelib import dynamo, instrumentation, s3
+from chalicelib.gtfs import feed_cache
 
 from .keys import YANKEE_API_KEY
 
@@ -60,8 +58,8 @@ def load_bus_positions() -> Optional[List[Dict]]:
         raise
 
 
-def get_shuttle_stops(session: Session) -> List[Stop]:
-    return session.query(Stop).filter(Stop.platform_name.contains("Shuttle")).all()
+def get_shuttle_stops() -> List[Stop]:
+    return feed_cache.get_latest_feed_index().shuttle_stops
 
 
 def get_shuttle_shapes(
@@ -104,14 +102,8 @@ def get_shuttle_shapes(
 
 
 def get_session_for_latest_feed() -> Session:
-    s3 = boto3.resource("s3")
-    archive = MbtaGtfsArchive(
-        local_archive_path=TemporaryDirectory().name,
-        s3_bucket=s3.Bucket("tm-gtfs"),
-    )
-    latest_feed = archive.get_latest_feed()
-    latest_feed.download_or_build()
-    return latest_feed.create_sqlite_session()
+    # Shapes are only in the full (not compact) database
+    return feed_cache.get_session_for_latest_feed(compact=False)
 
 
 # https://en.wikipedia.org/wiki/Even%E2%80%93odd_rule
@@ -358,6 +350,7 @@ def maybe_create_travel_time(
     return ShuttleTravelTime(SHUTTLE_LINE, route_id, datetime.today(), dist, time_minutes, name)
 
 
+@instrumentation.instrumented()
 def update_shuttles():
     """
     Updates the shuttle travel times table with the travel times, in minutes, of the Yankee
@@ -375,6 +368,6 @@ def update_shuttles():
 
     session = get_session_for_latest_feed()
     shuttle_shapes = get_shuttle_shapes(session)
-    shuttle_stops = get_shuttle_stops(session)
+    shuttle_stops = get_shuttle_stops()
 
     _update_shuttles(last_bus_positions, shuttle_shapes, shuttle_stops)